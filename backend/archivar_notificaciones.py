@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Mover a notificaciones_archivadas las notificaciones leídas antiguas
+
+Pensado para ejecutarse desde cron (p. ej. una vez al día). Trabaja en lotes
+pequeños, cada uno en su propia transacción, así que se puede interrumpir y
+volver a ejecutar sin perder ni duplicar notificaciones.
+
+Uso: python archivar_notificaciones.py [--dias 90] [--lote 1000]
+"""
+
+import argparse
+from dataclasses import asdict
+
+from utils.retencion_notificaciones import NOTIF_ARCHIVO_LOTE, NOTIF_RETENCION_DIAS, archivar
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archivar notificaciones leídas antiguas")
+    parser.add_argument("--dias", type=int, default=NOTIF_RETENCION_DIAS, help="Archivar las leídas con más de estos días")
+    parser.add_argument("--lote", type=int, default=NOTIF_ARCHIVO_LOTE, help="Notificaciones por lote")
+    args = parser.parse_args()
+
+    print(f"🔄 Archivando notificaciones leídas con más de {args.dias} días...")
+    resultado = archivar(args.dias, args.lote)
+
+    for campo, valor in asdict(resultado).items():
+        print(f"   {campo}: {valor}")
+    print("✅ Notificaciones archivadas")
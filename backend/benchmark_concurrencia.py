@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia: routers síncronos vs asíncronos (DB_ASYNC)
+
+Siembra una base SQLite temporal (o la de --url), y para cada modo lanza un
+proceso que sirve la API en memoria y le envía peticiones con concurrencia
+creciente. Cada sentencia SQL espera --latencia-ms para simular el viaje de
+red a MySQL: en modo síncrono la espera bloquea un hilo del threadpool, en
+modo asíncrono cede el event loop. Reporta peticiones/s por nivel y el nivel
+a partir del cual el throughput deja de crecer; las peticiones fallidas
+(p. ej. pool agotado) no cuentan como throughput.
+
+Uso: python benchmark_concurrencia.py [--ruta /dashboard] [--niveles 1,2,4,8,16,32,64,128]
+                                      [--peticiones 400] [--latencia-ms 20] [--pool 100]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Crecimiento mínimo de throughput para considerar que un nivel aún no satura
+MEJORA_MINIMA = 1.10
+
+
+def sembrar(url, transacciones):
+    from sqlalchemy.orm import sessionmaker
+
+    from benchmark_dashboard import sembrar_datos
+    from database import crear_engine
+    from models.BD import Base
+
+    engine = crear_engine(url)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        usuario_id = sembrar_datos(db, transacciones)
+    engine.dispose()
+    return usuario_id
+
+
+def preparar_latencia(engine_sync, latencia, asincrono):
+    """Agregar una espera por sentencia que imita la latencia de red del driver"""
+    from sqlalchemy import event
+
+    if asincrono:
+        from sqlalchemy.util import await_only
+
+        def esperar(*_):
+            await_only(asyncio.sleep(latencia))
+    else:
+        def esperar(*_):
+            time.sleep(latencia)
+
+    event.listen(engine_sync, "before_cursor_execute", esperar)
+
+
+async def medir_nivel(cliente, ruta, headers, concurrencia, peticiones):
+    semaforo = asyncio.Semaphore(concurrencia)
+    tiempos = []
+    errores = 0
+
+    async def una():
+        nonlocal errores
+        async with semaforo:
+            inicio = time.perf_counter()
+            respuesta = await cliente.get(ruta, headers=headers)
+            if respuesta.status_code >= 400:
+                errores += 1
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[una() for _ in range(peticiones)])
+    total = time.perf_counter() - inicio
+    tiempos.sort()
+    return {
+        "concurrencia": concurrencia,
+        "rps": (peticiones - errores) / total,
+        "errores": errores,
+        "p50": statistics.median(tiempos),
+        "p99": tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))],
+    }
+
+
+def medir(args):
+    """Proceso hijo: DATABASE_URL y DB_ASYNC ya vienen en el entorno"""
+    import httpx
+
+    import database
+    import main
+    from utils.jwt import crear_token
+
+    asincrono = database.DB_ASYNC
+    if asincrono:
+        database.configurar_async(database.ASYNC_DATABASE_URL, pool_size=args.pool, max_overflow=0)
+        engine_sync = database.async_engine.sync_engine
+    else:
+        database.engine = database.crear_engine(database.DATABASE_URL, pool_size=args.pool, max_overflow=0)
+        database.SessionLocal.configure(bind=database.engine)
+        engine_sync = database.engine
+    preparar_latencia(engine_sync, args.latencia_ms / 1000, asincrono)
+
+    headers = {"Authorization": f"Bearer {crear_token({'sub': str(args.usuario)})}"}
+
+    async def correr():
+        # Los errores (p. ej. pool agotado) cuentan como respuestas fallidas en lugar de abortar
+        transporte = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+            await medir_nivel(cliente, args.ruta, headers, 1, 5)  # calentamiento
+            for nivel in args.niveles:
+                print(json.dumps(await medir_nivel(cliente, args.ruta, headers, nivel, args.peticiones)), flush=True)
+
+    asyncio.run(correr())
+
+
+def punto_de_saturacion(resultados):
+    """Primer nivel cuyo siguiente no mejora el throughput al menos MEJORA_MINIMA"""
+    for actual, siguiente in zip(resultados, resultados[1:]):
+        if siguiente["rps"] < actual["rps"] * MEJORA_MINIMA:
+            return actual
+    return resultados[-1]
+
+
+def ejecutar_modo(modo, url, args, usuario_id):
+    entorno = dict(os.environ, DATABASE_URL=url, DB_ASYNC="true" if modo == "async" else "false")
+    comando = [
+        sys.executable, os.path.abspath(__file__), "--medir",
+        "--ruta", args.ruta, "--niveles", ",".join(map(str, args.niveles)),
+        "--peticiones", str(args.peticiones), "--latencia-ms", str(args.latencia_ms),
+        "--pool", str(args.pool), "--usuario", str(usuario_id),
+    ]
+    salida = subprocess.run(comando, env=entorno, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if salida.returncode != 0:
+        print(salida.stderr)
+        raise SystemExit(f"❌ Falló la medición en modo {modo}")
+    return [json.loads(linea) for linea in salida.stdout.splitlines() if linea.startswith("{")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia síncrono vs asíncrono")
+    parser.add_argument("--ruta", default="/dashboard")
+    parser.add_argument("--niveles", default="1,2,4,8,16,32,64,128",
+                        type=lambda texto: [int(n) for n in texto.split(",")])
+    parser.add_argument("--peticiones", type=int, default=400, help="Peticiones por nivel")
+    parser.add_argument("--latencia-ms", type=float, default=20, help="Latencia simulada por sentencia SQL")
+    parser.add_argument("--pool", type=int, default=100, help="Conexiones del pool en ambos modos")
+    parser.add_argument("--transacciones", type=int, default=20_000)
+    parser.add_argument("--url", default=None, help="Base a usar en lugar de una SQLite temporal (se siembra)")
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--usuario", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        medir(args)
+        raise SystemExit(0)
+
+    print(f"🚀 Benchmark de concurrencia: GET {args.ruta}")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        usuario_id = sembrar(url, args.transacciones)
+
+        resultados = {}
+        for modo in ("sync", "async"):
+            print(f"\n⏱️ Modo {modo} (latencia {args.latencia_ms} ms por sentencia, pool {args.pool}):")
+            resultados[modo] = ejecutar_modo(modo, url, args, usuario_id)
+            for r in resultados[modo]:
+                print(f"   c={r['concurrencia']:<4} {r['rps']:8.1f} req/s   p50={r['p50']:8.2f} ms   p99={r['p99']:8.2f} ms   errores={r['errores']}")
+
+    print("\n📈 Saturación (el throughput deja de crecer):")
+    for modo, filas in resultados.items():
+        saturacion = punto_de_saturacion(filas)
+        maximo = max(r["rps"] for r in filas)
+        print(f"   {modo:<6} c={saturacion['concurrencia']:<4} máximo {maximo:8.1f} req/s")
+    print("\n" + "=" * 50)
+    print("🏁 Benchmark completado!")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark de GET /dashboard: consultas secuenciales vs motor de agregación
+
+Crea una base SQLite temporal con un usuario de 100k transacciones y mide
+p50/p99 de la implementación anterior (seis consultas) contra
+utils.resumen_dashboard.calcular_dashboard.
+
+Uso: python benchmark_dashboard.py [--transacciones 100000] [--repeticiones 50]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, func, case, insert
+from sqlalchemy.orm import sessionmaker
+
+from models.BD import Base, Usuario, Categoria, Transaccion, Presupuesto, PagoFijo, Notificacion
+from utils.resumen_dashboard import calcular_dashboard
+from utils import alertas_presupuesto, recurrencia
+from utils.resumen_mensual import reconstruir
+
+def sembrar_datos(db, num_transacciones):
+    """Crear un usuario con historial grande y algo de ruido de otros usuarios"""
+    print(f"🌱 Sembrando {num_transacciones} transacciones...")
+    usuarios = [Usuario(nombre=f"Usuario {i}", correo=f"bench{i}@example.com", contrasena="x") for i in range(3)]
+    db.add_all(usuarios)
+    categorias = [Categoria(nombre=f"Ingreso {i}", tipo="ingreso") for i in range(5)]
+    categorias += [Categoria(nombre=f"Gasto {i}", tipo="egreso") for i in range(15)]
+    db.add_all(categorias)
+    db.flush()
+
+    usuario = usuarios[0]
+    egresos = [c for c in categorias if c.tipo == "egreso"]
+    presupuestos = [
+        Presupuesto(usuario_id=usuario.id, categoria_id=c.id, nombre=f"Presupuesto {c.nombre}",
+                    monto_total=5000, fecha_inicio=date(2020, 1, 1), fecha_fin=date(2030, 12, 31))
+        for c in egresos[:8]
+    ]
+    db.add_all(presupuestos)
+    db.flush()
+
+    random.seed(42)
+    hoy = date.today()
+    filas = []
+    for i in range(num_transacciones):
+        categoria = random.choice(categorias)
+        usuario_id = usuario.id if i % 10 else random.choice(usuarios[1:]).id
+        presupuesto = random.choice(presupuestos) if usuario_id == usuario.id and random.random() < 0.2 else None
+        filas.append({
+            "usuario_id": usuario_id,
+            "presupuesto_id": presupuesto.id if presupuesto else None,
+            "categoria_id": categoria.id,
+            "monto": round(random.uniform(10, 2000), 2),
+            "tipo": categoria.tipo,
+            "descripcion": f"Movimiento {i}",
+            "fecha": hoy - timedelta(days=random.randint(0, 5 * 365)),
+            "activo": True
+        })
+    db.execute(insert(Transaccion), filas)
+
+    db.add_all([
+        PagoFijo(usuario_id=usuario.id, nombre=f"Pago {i}", monto=100, categoria="Servicios",
+                 frecuencia="mensual", fecha_inicio=hoy + timedelta(days=i), estado="Pendiente", activo=True)
+        for i in range(20)
+    ])
+    db.add_all([Notificacion(usuario_id=usuario.id, mensaje=f"Aviso {i}", leido=bool(i % 3)) for i in range(200)])
+    db.commit()
+    reconstruir(db)
+    alertas_presupuesto.reconstruir(db)
+    recurrencia.reconstruir(db)
+    return usuario.id
+
+def dashboard_secuencial(db, usuario_id, fecha_inicio, fecha_fin):
+    """Implementación anterior: seis consultas por petición"""
+    filtro_fecha = (Transaccion.fecha >= fecha_inicio) & (Transaccion.fecha <= fecha_fin)
+    db.query(
+        func.coalesce(func.sum(case((Transaccion.tipo == 'ingreso', Transaccion.monto))), 0),
+        func.coalesce(func.sum(case((Transaccion.tipo == 'egreso', Transaccion.monto))), 0)
+    ).filter(Transaccion.usuario_id == usuario_id, filtro_fecha).one()
+    for tipo in ("ingreso", "egreso"):
+        db.query(
+            Categoria.id, Categoria.nombre, Categoria.tipo,
+            func.coalesce(func.sum(Transaccion.monto), 0)
+        ).join(Transaccion, Transaccion.categoria_id == Categoria.id)\
+         .filter(Transaccion.usuario_id == usuario_id, Categoria.tipo == tipo, filtro_fecha)\
+         .group_by(Categoria.id, Categoria.nombre, Categoria.tipo).all()
+    db.query(
+        Presupuesto.id, Presupuesto.categoria_id, Categoria.nombre, Presupuesto.monto_total,
+        func.coalesce(func.sum(Transaccion.monto), 0)
+    ).join(Categoria, Presupuesto.categoria_id == Categoria.id)\
+     .outerjoin(Transaccion, (Transaccion.presupuesto_id == Presupuesto.id) & (Transaccion.usuario_id == usuario_id))\
+     .filter(Presupuesto.usuario_id == usuario_id)\
+     .group_by(Presupuesto.id, Presupuesto.categoria_id, Categoria.nombre, Presupuesto.monto_total).all()
+    db.query(PagoFijo).filter(
+        PagoFijo.usuario_id == usuario_id, PagoFijo.activo == True, PagoFijo.estado == 'Pendiente',
+        PagoFijo.fecha_inicio >= fecha_inicio, PagoFijo.fecha_inicio <= fecha_fin
+    ).order_by(PagoFijo.fecha_inicio.asc()).limit(5).all()
+    db.query(func.count()).select_from(Notificacion)\
+        .filter(Notificacion.usuario_id == usuario_id, Notificacion.leido == False).scalar()
+
+def medir(nombre, funcion, repeticiones):
+    """Ejecutar la función varias veces y reportar p50/p99 en milisegundos"""
+    funcion()  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    p50 = statistics.median(tiempos)
+    p99 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))]
+    print(f"   {nombre:<12} p50={p50:8.2f} ms   p99={p99:8.2f} ms")
+    return p50, p99
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del dashboard")
+    parser.add_argument("--transacciones", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    print("🚀 Benchmark de GET /dashboard")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as db:
+            usuario_id = sembrar_datos(db, args.transacciones)
+            fecha_fin = date.today()
+            fecha_inicio = fecha_fin - timedelta(days=365)
+
+            print("\n⏱️ Resultados:")
+            anterior = medir("secuencial", lambda: dashboard_secuencial(db, usuario_id, fecha_inicio, fecha_fin), args.repeticiones)
+            nuevo = medir("agregado", lambda: calcular_dashboard(db, usuario_id, fecha_inicio, fecha_fin), args.repeticiones)
+
+        engine.dispose()
+
+    print(f"\n📉 Mejora p50: {anterior[0] / nuevo[0]:.2f}x   p99: {anterior[1] / nuevo[1]:.2f}x")
+    print("\n" + "=" * 50)
+    print("🏁 Benchmark completado!")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark de render de correos: f-strings por mensaje vs plantillas precompiladas
+
+Compara, para N destinatarios del correo de cambio de contraseña, la
+implementación anterior (f-string con el CSS completo en cada llamada),
+compilar la plantilla en cada mensaje, la plantilla precompilada de
+utils.plantillas_correo y el render por lotes de renderizar_lote.
+
+Uso: python benchmark_plantillas.py [--destinatarios 10000]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from utils.plantillas_correo import DIRECTORIO_PLANTILLAS, entorno, renderizar, renderizar_lote
+
+def correo_fstring(email, nombre_usuario, fecha_cambio):
+    """Implementación anterior de EmailService.enviar_correo_cambio_contrasena"""
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <title>Cambio de Contraseña - Lana App</title>
+        <style>
+            body {{
+                font-family: Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                max-width: 600px;
+                margin: 0 auto;
+                padding: 20px;
+            }}
+            .header {{
+                background-color: #3498db;
+                color: white;
+                padding: 20px;
+                text-align: center;
+                border-radius: 5px 5px 0 0;
+            }}
+            .content {{
+                background-color: #f9f9f9;
+                padding: 20px;
+                border-radius: 0 0 5px 5px;
+            }}
+            .alert {{
+                background-color: #fff3cd;
+                border: 1px solid #ffeaa7;
+                color: #856404;
+                padding: 15px;
+                border-radius: 5px;
+                margin: 20px 0;
+            }}
+            .footer {{
+                text-align: center;
+                margin-top: 20px;
+                color: #666;
+                font-size: 12px;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>🔐 Cambio de Contraseña</h1>
+            <p>Lana App - Gestión Financiera</p>
+        </div>
+        
+        <div class="content">
+            <h2>Hola {nombre_usuario},</h2>
+            
+            <p>Te informamos que tu contraseña ha sido cambiada exitosamente.</p>
+            
+            <div class="alert">
+                <strong>⚠️ Importante:</strong> Si no realizaste este cambio, 
+                contacta inmediatamente con soporte técnico.
+            </div>
+            
+            <h3>Detalles del cambio:</h3>
+            <ul>
+                <li><strong>Usuario:</strong> {nombre_usuario}</li>
+                <li><strong>Correo:</strong> {email}</li>
+                <li><strong>Fecha y hora:</strong> {fecha_cambio.strftime('%d/%m/%Y %H:%M:%S')}</li>
+            </ul>
+            
+            <p>Si realizaste este cambio, puedes ignorar este correo.</p>
+            
+            <p>Para mayor seguridad, te recomendamos:</p>
+            <ul>
+                <li>Usar contraseñas únicas y seguras</li>
+                <li>No compartir tus credenciales</li>
+                <li>Activar la autenticación de dos factores si está disponible</li>
+            </ul>
+        </div>
+        
+        <div class="footer">
+            <p>Este es un correo automático, por favor no respondas a este mensaje.</p>
+            <p>© 2025 Lana App. Todos los derechos reservados.</p>
+        </div>
+    </body>
+    </html>
+    """
+
+def compilando_cada_vez(email, nombre_usuario, fecha_cambio):
+    """Plantilla Jinja sin caché: se lee y compila en cada mensaje"""
+    with open(f"{DIRECTORIO_PLANTILLAS}/cambio_contrasena.html", encoding="utf-8") as archivo:
+        plantilla = entorno.from_string(archivo.read())
+    return plantilla.render(email=email, nombre_usuario=nombre_usuario, fecha_cambio=fecha_cambio)
+
+def medir(nombre, funcion, total):
+    inicio = time.perf_counter()
+    generados = funcion()
+    duracion = time.perf_counter() - inicio
+    print(f"   {nombre:<28} {duracion * 1e6 / total:9.1f} µs/correo   {total / duracion:10.0f} correos/s   ({generados} bytes)")
+    return duracion
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de plantillas de correo")
+    parser.add_argument("--destinatarios", type=int, default=10_000)
+    args = parser.parse_args()
+
+    fecha = datetime.now()
+    destinatarios = [
+        {"email": f"usuario{i}@example.com", "nombre_usuario": f"Usuario {i}", "fecha_cambio": fecha}
+        for i in range(args.destinatarios)
+    ]
+
+    print(f"🚀 Render de {args.destinatarios} correos de cambio de contraseña")
+    print("=" * 50)
+    print("\n⏱️ Resultados:")
+    anterior = medir("f-string (anterior)", lambda: sum(len(correo_fstring(**d)) for d in destinatarios), len(destinatarios))
+    medir("compilando cada vez", lambda: sum(len(compilando_cada_vez(**d)) for d in destinatarios[:500]), 500)
+    individual = medir("precompilada", lambda: sum(len(renderizar("cambio_contrasena.html", **d)) for d in destinatarios), len(destinatarios))
+    lote = medir("precompilada por lote", lambda: sum(len(html) for html in renderizar_lote("cambio_contrasena.html", destinatarios)), len(destinatarios))
+
+    print(f"\n📊 Lote vs anterior: {anterior / lote:.2f}x   lote vs individual: {individual / lote:.2f}x")
+    print("\n" + "=" * 50)
+    print("🏁 Benchmark completado!")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor de recurrencia de pagos fijos (utils/recurrencia.py)
+
+Con 100k pagos fijos de frecuencias y fechas de inicio variadas (hasta 10
+años atrás) compara:
+  - próxima fecha: avanzar ocurrencia por ocurrencia contra el cálculo
+    directo de utils.recurrencia (y verifica que coincidan)
+  - pagos próximos de un usuario: filtro anterior por fecha_inicio contra
+    proxima_fecha indexada (cuántos pagos encuentra cada uno, tiempo y plan)
+
+Uso: python benchmark_recurrencia.py [--pagos 100000] [--repeticiones 50]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmark_dashboard import medir
+from models.BD import Base, Usuario, PagoFijo
+from utils import recurrencia
+
+def generar_pagos(cantidad, usuarios, hoy):
+    """Filas de pagos fijos con fechas de inicio entre 10 años atrás y 2 meses adelante"""
+    aleatorio = random.Random(42)
+    frecuencias = list(recurrencia.FRECUENCIAS)
+    return [{
+        "usuario_id": usuarios[i % len(usuarios)],
+        "nombre": f"Pago {i}",
+        "monto": 100 + i % 900,
+        "categoria": "Servicios",
+        "frecuencia": frecuencias[i % len(frecuencias)],
+        "fecha_inicio": hoy - timedelta(days=aleatorio.randint(-60, 3650)),
+        "estado": "Pendiente",
+        "activo": True,
+    } for i in range(cantidad)]
+
+def proxima_iterando(fecha_inicio, frecuencia, desde):
+    """Implementación ingenua: avanzar de ocurrencia en ocurrencia hasta alcanzar `desde`"""
+    dias, meses = recurrencia.FRECUENCIAS[frecuencia]
+    fecha, n = fecha_inicio, 0
+    while fecha < desde:
+        n += 1
+        fecha = fecha_inicio + timedelta(days=dias * n) if dias else recurrencia.desplazar_meses(fecha_inicio, meses * n)
+    return fecha
+
+def cronometrar(nombre, funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    print(f"   {nombre:<22} {(time.perf_counter() - inicio) * 1000:10.1f} ms")
+    return resultado
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del motor de recurrencia")
+    parser.add_argument("--pagos", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    print("🚀 Benchmark de recurrencia de pagos fijos")
+    print("=" * 50)
+    hoy = date.today()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as db:
+            print(f"🌱 Sembrando {args.pagos} pagos fijos...")
+            usuarios = [Usuario(nombre=f"Usuario {i}", correo=f"rec{i}@example.com", contrasena="x") for i in range(100)]
+            db.add_all(usuarios)
+            db.flush()
+            filas = generar_pagos(args.pagos, [u.id for u in usuarios], hoy)
+            db.execute(insert(PagoFijo), filas)
+            db.commit()
+
+            print(f"\n⏱️ Próxima fecha de {args.pagos} pagos:")
+            esperado = cronometrar("ocurrencia a ocurrencia", lambda: [
+                proxima_iterando(f["fecha_inicio"], f["frecuencia"], hoy) for f in filas])
+            calculado = cronometrar("aritmético", lambda: [
+                recurrencia.proxima_fecha(f["fecha_inicio"], f["frecuencia"], hoy) for f in filas])
+            assert calculado == esperado, "el cálculo directo no coincide con la iteración"
+            cronometrar("ocurrencias (30 días)", lambda: [
+                list(recurrencia.ocurrencias(f["fecha_inicio"], f["frecuencia"], hoy, hoy + timedelta(days=30))) for f in filas])
+            cronometrar("reconstruir (BD)", lambda: recurrencia.reconstruir(db, hoy=hoy))
+
+            usuario_id, limite = usuarios[0].id, hoy + timedelta(days=30)
+            base = db.query(PagoFijo).filter(
+                PagoFijo.usuario_id == usuario_id, PagoFijo.activo == True, PagoFijo.estado == "Pendiente")
+            anterior_q = lambda: base.filter(PagoFijo.fecha_inicio >= hoy, PagoFijo.fecha_inicio <= limite).all()
+            nuevo_q = lambda: base.filter(PagoFijo.proxima_fecha <= limite).all()
+
+            print(f"\n⏱️ Pagos próximos (30 días) de un usuario con {args.pagos // len(usuarios)} pagos:")
+            medir("fecha_inicio", anterior_q, args.repeticiones)
+            medir("proxima_fecha", nuevo_q, args.repeticiones)
+            print(f"   encontrados: fecha_inicio={len(anterior_q())}   proxima_fecha={len(nuevo_q())}")
+            consulta = base.filter(PagoFijo.proxima_fecha <= limite).statement.compile(
+                engine, compile_kwargs={"literal_binds": True})
+            for fila in db.execute(text(f"EXPLAIN QUERY PLAN {consulta}")):
+                print(f"   plan: {fila[-1]}")
+
+        engine.dispose()
+
+    print("\n" + "=" * 50)
+    print("🏁 Benchmark completado!")
@@ -1,18 +1,167 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import QueuePool
+from dotenv import load_dotenv
 import os
+import threading
+import time
 
-# Usa tus credenciales reales aquí
-DB_USER = "root"
-DB_PASSWORD = "Limones4k"
-DB_HOST = "localhost"
-DB_PORT = "3306"
-DB_NAME = "LanaApp"
+load_dotenv()
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Usa tus credenciales reales aquí (o variables de entorno)
+DB_USER = os.getenv("DB_USER", "root")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "Limones4k")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "3306")
+DB_NAME = os.getenv("DB_NAME", "LanaApp")
 
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+
+# Capa asíncrona opcional: con DB_ASYNC=true los routers de alto tráfico usan AsyncSession
+DB_ASYNC = os.getenv("DB_ASYNC", "False").lower() == "true"
+DRIVERS_ASYNC = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def url_async(url: str) -> str:
+    """Misma URL con el driver asíncrono equivalente (pymysql → aiomysql, sqlite → aiosqlite)"""
+    esquema, resto = url.split("://", 1)
+    return f"{DRIVERS_ASYNC.get(esquema, esquema)}://{resto}"
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", url_async(DATABASE_URL))
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que registra cuántas veces se pide una conexión, cuánto se espera y cuántas veces se agota"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.total_checkouts = 0
+        self.total_timeouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.maximo_overflow_usado = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeoutError:
+            with self._lock_metricas:
+                self.total_timeouts += 1
+            raise
+        espera = time.perf_counter() - inicio
+        with self._lock_metricas:
+            self.total_checkouts += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+            self.maximo_overflow_usado = max(self.maximo_overflow_usado, max(self.overflow(), 0))
+        return conexion
+
+
+def _opciones_pool(url: str, opciones: dict) -> dict:
+    if url.startswith("sqlite"):
+        return opciones
+    configuracion = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    configuracion.update(opciones)
+    return configuracion
+
+
+def crear_engine(url: str = DATABASE_URL, **opciones):
+    """Crear un engine con la configuración de pool tomada del entorno"""
+    if not url.startswith("sqlite"):
+        opciones = {"poolclass": PoolMedido, **opciones}
+    return create_engine(url, **_opciones_pool(url, opciones))
+
+
+def crear_engine_async(url: str = ASYNC_DATABASE_URL, **opciones):
+    """Engine asíncrono (aiomysql / aiosqlite) con la misma configuración de pool"""
+    return create_async_engine(url, **_opciones_pool(url, opciones))
+
+
+def metricas_pool(engine_objetivo=None) -> dict:
+    """Estado actual del pool de conexiones"""
+    pool = (engine_objetivo or engine).pool
+    metricas = {"tipo": type(pool).__name__, "estado": pool.status()}
+    if isinstance(pool, QueuePool):
+        metricas.update({
+            "tamano": pool.size(),
+            "en_uso": pool.checkedout(),
+            "disponibles": pool.checkedin(),
+            "overflow_actual": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    if isinstance(pool, PoolMedido):
+        with pool._lock_metricas:
+            checkouts = pool.total_checkouts
+            metricas.update({
+                "total_checkouts": checkouts,
+                "total_timeouts": pool.total_timeouts,
+                "espera_promedio_ms": (pool.espera_total / checkouts * 1000) if checkouts else 0,
+                "espera_maxima_ms": pool.espera_maxima * 1000,
+                "maximo_overflow_usado": pool.maximo_overflow_usado,
+            })
+    return metricas
+
+
+engine = crear_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# Se crean sólo con DB_ASYNC=true (o llamando a configurar_async) para no exigir el driver asíncrono
+async_engine = None
+AsyncSessionLocal = None
+
+
+def configurar_async(url: str = ASYNC_DATABASE_URL, **opciones):
+    """Crear el engine y la fábrica de sesiones asíncronas"""
+    global async_engine, AsyncSessionLocal
+    async_engine = crear_engine_async(url, **opciones)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    return async_engine
+
+
+if DB_ASYNC:
+    configurar_async()
+
+
+def get_db():
+    """Dependencia compartida: una sesión por request"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Dependencia asíncrona: una AsyncSession por request"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Calcular las tendencias de todos los usuarios (análisis nocturno)
+
+Para cada usuario y métrica (ingresos, gastos, balance) escribe una línea
+JSON con la pendiente de la recta, r2, dirección (sube, baja, estable),
+crecimiento promedio y los últimos valores, sobre las últimas cubetas
+completas. Recorre a los usuarios en lotes: una consulta agrupada y un
+cálculo vectorizado por lote.
+
+Uso: python generar_tendencias.py [--granularidad mes] [--cubetas 12] [--ventana 3]
+                                  [--metrica gastos ...] [--lote 2000] [--salida tendencias.ndjson]
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from datetime import date
+
+from database import SessionLocal
+from utils import series_tiempo
+from utils.tendencias import METRICAS, TENDENCIAS_LOTE, calcular_lote
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calcular las tendencias de todos los usuarios")
+    parser.add_argument("--granularidad", choices=series_tiempo.GRANULARIDADES, default="mes")
+    parser.add_argument("--cubetas", type=int, default=12, help="Cubetas completas a analizar")
+    parser.add_argument("--ventana", type=int, default=3, help="Cubetas del promedio móvil")
+    parser.add_argument("--metrica", choices=METRICAS, action="append", help="Repetible; por defecto todas")
+    parser.add_argument("--lote", type=int, default=TENDENCIAS_LOTE, help="Usuarios por lote")
+    parser.add_argument("--salida", default=f"tendencias_{date.today().isoformat()}.ndjson", help="Archivo NDJSON de salida")
+    args = parser.parse_args()
+
+    desde, hasta = series_tiempo.ultimas_cubetas(date.today(), args.granularidad, args.cubetas)
+    print(f"🔄 Calculando tendencias por {args.granularidad} del {desde} al {hasta}...")
+
+    inicio = time.perf_counter()
+    direcciones = Counter()
+    usuarios = set()
+    with SessionLocal() as db, open(args.salida, "w", encoding="utf-8") as salida:
+        for registro in calcular_lote(db, desde, hasta, args.granularidad, args.metrica or METRICAS,
+                                      args.ventana, args.lote):
+            salida.write(json.dumps({**registro, "desde": desde.isoformat(), "hasta": hasta.isoformat()}) + "\n")
+            usuarios.add(registro["usuario_id"])
+            direcciones[(registro["metrica"], registro["direccion"])] += 1
+
+    print(f"   usuarios: {len(usuarios)}")
+    for (metrica, direccion), cantidad in sorted(direcciones.items()):
+        print(f"   {metrica} {direccion}: {cantidad}")
+    print(f"   segundos: {time.perf_counter() - inicio:.2f}")
+    print(f"✅ Tendencias guardadas en {args.salida}")
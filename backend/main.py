@@ -41,6 +41,8 @@
 #     class Config:
 #         orm_mode = True
 from fastapi.middleware.cors import CORSMiddleware
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes import usuarios
@@ -51,8 +53,34 @@ from routes import presupuestos
 from routes import notificaciones
 from routes import soporte
 from routes import graficas
+from routes import sistema
+from routes import eventos
+from database import DB_ASYNC
+from utils.asincrono import version_asincrona
+from utils.auth import FiltroTokenEnAccesos
+from utils import cache_categorias
+from utils.cache import cache
+from utils.cache_respuestas import MiddlewareCacheRespuestas
+from utils.eventos import bus_eventos
+from utils.procesador_pagos import PAGOS_PROGRAMADOR, programador_pagos
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cache_categorias.precargar()
+    if PAGOS_PROGRAMADOR:
+        programador_pagos.iniciar()
+    yield
+    programador_pagos.detener()
+    bus_eventos.cerrar()
+    cache.cerrar()
+
+app = FastAPI(lifespan=lifespan)
+# GET /eventos recibe un token en la URL: no escribirlo en el log de accesos
+logging.getLogger("uvicorn.access").addFilter(FiltroTokenEnAccesos())
+# Caché compartida (utils.cache): memoria o Redis según CACHE_BACKEND
+app.state.cache = cache
+# Se registra primero para quedar dentro de CORS (las respuestas 304 también llevan sus headers)
+app.add_middleware(MiddlewareCacheRespuestas)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], 
@@ -68,17 +96,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permite todos los métodos HTTP
     allow_headers=["*"],  # Permite todos los headers
+    expose_headers=["X-Siguiente-Cursor", "ETag"],  # Cursor de paginación y GET condicional
 )
 
+def router_de_alto_trafico(router):
+    """Con DB_ASYNC=true se sirve la versión asíncrona del router (AsyncSession)"""
+    return version_asincrona(router) if DB_ASYNC else router
+
 # Rutas
 app.include_router(usuarios.router)
-app.include_router(transacciones.router)
-app.include_router(dashboard.router)
+app.include_router(router_de_alto_trafico(transacciones.router))
+app.include_router(router_de_alto_trafico(dashboard.router))
 app.include_router(pagos_fijos.router)
 app.include_router(presupuestos.router)
-app.include_router(notificaciones.router)
+app.include_router(router_de_alto_trafico(notificaciones.router))
 app.include_router(soporte.router)
-app.include_router(graficas.router)
+app.include_router(router_de_alto_trafico(graficas.router))
+app.include_router(sistema.router)
+# Stream SSE: ya es asíncrono y no usa sesión de base de datos mientras está abierto
+app.include_router(eventos.router)
 
 @app.get("/")
 def read_root():
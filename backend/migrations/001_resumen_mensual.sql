@@ -0,0 +1,15 @@
+-- Resumen mensual materializado de transacciones (usuario x mes x categoría x tipo)
+-- Después de aplicar: python reconstruir_resumen_mensual.py
+
+CREATE TABLE IF NOT EXISTS resumen_mensual_transacciones (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    usuario_id INT NOT NULL,
+    mes DATE NOT NULL,
+    categoria_id INT NOT NULL,
+    tipo ENUM('ingreso', 'egreso') NOT NULL,
+    total DECIMAL(14,2) NOT NULL DEFAULT 0,
+    cantidad INT NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_resumen_mensual (usuario_id, mes, categoria_id, tipo),
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id),
+    FOREIGN KEY (categoria_id) REFERENCES categorias(id)
+);
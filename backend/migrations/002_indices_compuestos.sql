@@ -0,0 +1,20 @@
+-- Índices compuestos para las rutas de acceso más usadas
+-- Verificación: python test_planes_consulta.py
+
+-- Transacciones (usuario primero; monto al final para cubrir los SUM)
+CREATE INDEX idx_transaccion_usuario_tipo_fecha ON transacciones (usuario_id, tipo, fecha, monto);
+CREATE INDEX idx_transaccion_usuario_categoria_fecha ON transacciones (usuario_id, categoria_id, fecha, monto);
+CREATE INDEX idx_transaccion_usuario_fecha_id ON transacciones (usuario_id, fecha, id);
+CREATE INDEX idx_transaccion_presupuesto ON transacciones (presupuesto_id);
+-- Cubierto por los índices compuestos que empiezan con usuario_id
+DROP INDEX idx_usuario_id_transaccion ON transacciones;
+
+CREATE INDEX idx_presupuesto_usuario_categoria ON presupuestos (usuario_id, categoria_id);
+CREATE INDEX idx_alerta_presupuesto ON alertas_presupuesto (presupuesto_id);
+CREATE INDEX idx_pago_fijo_usuario_estado ON pagos_fijos (usuario_id, activo, estado, fecha_inicio);
+CREATE INDEX idx_configuracion_notificacion_usuario ON configuracion_notificaciones (usuario_id);
+CREATE INDEX idx_notificacion_usuario_fecha ON notificaciones (usuario_id, fecha_creacion);
+CREATE INDEX idx_notificacion_usuario_leido ON notificaciones (usuario_id, leido);
+CREATE INDEX idx_soporte_usuario ON soporte (usuario_id);
+CREATE UNIQUE INDEX idx_recuperacion_token ON recuperaciones (token);
+CREATE INDEX idx_sesion_token ON sesiones (token);
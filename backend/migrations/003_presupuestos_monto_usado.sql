@@ -0,0 +1,7 @@
+-- Monto usado y nivel de alerta almacenados en cada presupuesto
+-- (se actualizan de forma incremental al crear/editar/eliminar transacciones)
+-- Después de aplicar: python reconstruir_presupuestos.py
+
+ALTER TABLE presupuestos
+    ADD COLUMN monto_usado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    ADD COLUMN nivel_alerta ENUM('normal', 'proximo_exceder', 'excedido') NOT NULL DEFAULT 'normal';
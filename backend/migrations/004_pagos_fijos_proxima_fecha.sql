@@ -0,0 +1,12 @@
+-- Frecuencias bimestral/trimestral/semestral y próxima fecha de cobro de los pagos fijos
+-- Después de aplicar: python reconstruir_pagos_fijos.py
+
+ALTER TABLE pagos_fijos
+    MODIFY COLUMN frecuencia ENUM('diario', 'semanal', 'quincenal', 'mensual', 'bimestral', 'trimestral', 'semestral', 'anual') NOT NULL,
+    ADD COLUMN proxima_fecha DATE NULL;
+
+CREATE INDEX idx_pago_fijo_usuario_proxima ON pagos_fijos (usuario_id, activo, estado, proxima_fecha);
+
+-- Los pendientes ya se consultan por proxima_fecha: el índice de 002 sólo repetía
+-- las columnas iniciales de idx_pago_fijo_usuario_proxima y encarecía las escrituras
+DROP INDEX idx_pago_fijo_usuario_estado ON pagos_fijos;
@@ -0,0 +1,3 @@
+-- Búsqueda de pagos fijos vencidos de todos los usuarios (procesar_pagos_fijos.py)
+
+CREATE INDEX idx_pago_fijo_vencimiento ON pagos_fijos (activo, estado, proxima_fecha, id);
@@ -0,0 +1,19 @@
+-- Paginación por keyset de notificaciones y archivo de notificaciones leídas antiguas
+-- Después de aplicar: python archivar_notificaciones.py (cron, p. ej. diario)
+
+-- Listado completo y solo_no_leidas en orden (fecha_creacion, id); el segundo
+-- también cubre el contador de no leídas (usuario_id, leido)
+CREATE INDEX idx_notificacion_usuario_fecha_id ON notificaciones (usuario_id, fecha_creacion, id);
+CREATE INDEX idx_notificacion_usuario_leido_fecha ON notificaciones (usuario_id, leido, fecha_creacion, id);
+DROP INDEX idx_notificacion_usuario_fecha ON notificaciones;
+DROP INDEX idx_notificacion_usuario_leido ON notificaciones;
+
+CREATE TABLE notificaciones_archivadas (
+    id INT NOT NULL PRIMARY KEY,
+    usuario_id INT NOT NULL,
+    mensaje TEXT,
+    fecha_creacion DATETIME,
+    fecha_archivo DATETIME,
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+);
+CREATE INDEX idx_notificacion_archivada_usuario_fecha ON notificaciones_archivadas (usuario_id, fecha_creacion, id);
@@ -0,0 +1,7 @@
+-- Estado, prioridad y fecha de resolución de los tickets de soporte
+-- (los usan el listado con filtro por estado, la edición y /cerrar)
+
+ALTER TABLE soporte
+    ADD COLUMN estado ENUM('abierto', 'en_proceso', 'cerrado') NOT NULL DEFAULT 'abierto',
+    ADD COLUMN prioridad ENUM('baja', 'media', 'alta', 'critica') NOT NULL DEFAULT 'media',
+    ADD COLUMN fecha_resolucion DATETIME NULL;
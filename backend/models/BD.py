@@ -27,6 +27,9 @@ class Presupuesto(Base):
     monto_total = Column(DECIMAL(10,2), nullable=False)
     fecha_inicio = Column(Date, nullable=False)
     fecha_fin = Column(Date, nullable=False)
+    # Mantenidos al escribir transacciones por utils/alertas_presupuesto.py
+    monto_usado = Column(DECIMAL(12,2), nullable=False, default=0)
+    nivel_alerta = Column(Enum('normal', 'proximo_exceder', 'excedido', name='nivel_alerta_presupuesto'), nullable=False, default='normal')
 
     usuario = relationship("Usuario", back_populates="presupuestos")
     categoria = relationship("Categoria")
@@ -70,8 +73,11 @@ class PagoFijo(Base):
     nombre = Column(String(100))
     monto = Column(DECIMAL(10,2))
     categoria = Column(String(100))
-    frecuencia = Column(Enum('diario', 'semanal', 'quincenal', 'mensual', 'anual', name='frecuencia_pago'), nullable=False)
+    frecuencia = Column(Enum('diario', 'semanal', 'quincenal', 'mensual', 'bimestral', 'trimestral', 'semestral', 'anual',
+                             name='frecuencia_pago'), nullable=False)
     fecha_inicio = Column(Date)
+    # Próximo cobro, calculado por utils/recurrencia.py
+    proxima_fecha = Column(Date)
     estado = Column(Enum('Pendiente', 'Completado', name='estado_pago'), default='Pendiente')
     activo = Column(Boolean, default=True)
 
@@ -91,6 +97,15 @@ class Notificacion(Base):
     leido = Column(Boolean, default=False)
     fecha_creacion = Column(DateTime, default=datetime.utcnow)
 
+class NotificacionArchivada(Base):
+    """Notificaciones leídas antiguas, movidas por utils/retencion_notificaciones.py (conservan su id)"""
+    __tablename__ = 'notificaciones_archivadas'
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
+    mensaje = Column(Text)
+    fecha_creacion = Column(DateTime)
+    fecha_archivo = Column(DateTime, default=datetime.utcnow)
+
 class Soporte(Base):
     __tablename__ = 'soporte'
     id = Column(Integer, primary_key=True)
@@ -98,6 +113,9 @@ class Soporte(Base):
     asunto = Column(String(100))
     mensaje = Column(Text)
     fecha_envio = Column(DateTime, default=datetime.utcnow)
+    estado = Column(Enum('abierto', 'en_proceso', 'cerrado', name='estado_ticket'), nullable=False, default='abierto')
+    prioridad = Column(Enum('baja', 'media', 'alta', 'critica', name='prioridad_ticket'), nullable=False, default='media')
+    fecha_resolucion = Column(DateTime, nullable=True)
 
 class Recuperacion(Base):
     __tablename__ = 'recuperaciones'
@@ -115,5 +133,33 @@ class Sesion(Base):
     creado_en = Column(DateTime, default=datetime.utcnow)
     valido = Column(Boolean, default=True)
 
-Index('idx_usuario_id_transaccion', Transaccion.usuario_id)
-Index('idx_fecha_transaccion', Transaccion.fecha)
\ No newline at end of file
+class ResumenMensual(Base):
+    # Acumulado mensual por usuario, categoría y tipo (mantenido por utils/resumen_mensual.py)
+    __tablename__ = 'resumen_mensual_transacciones'
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
+    mes = Column(Date, nullable=False)  # Primer día del mes
+    categoria_id = Column(Integer, ForeignKey('categorias.id'), nullable=False)
+    tipo = Column(Enum('ingreso', 'egreso', name='tipo_transaccion'), nullable=False)
+    total = Column(DECIMAL(14,2), nullable=False, default=0)
+    cantidad = Column(Integer, nullable=False, default=0)
+
+# Transacciones: cada consulta filtra primero por usuario; monto al final para cubrir los SUM
+Index('idx_transaccion_usuario_tipo_fecha', Transaccion.usuario_id, Transaccion.tipo, Transaccion.fecha, Transaccion.monto)
+Index('idx_transaccion_usuario_categoria_fecha', Transaccion.usuario_id, Transaccion.categoria_id, Transaccion.fecha, Transaccion.monto)
+Index('idx_transaccion_usuario_fecha_id', Transaccion.usuario_id, Transaccion.fecha, Transaccion.id)
+Index('idx_transaccion_presupuesto', Transaccion.presupuesto_id)
+Index('idx_fecha_transaccion', Transaccion.fecha)
+
+Index('idx_presupuesto_usuario_categoria', Presupuesto.usuario_id, Presupuesto.categoria_id)
+Index('idx_alerta_presupuesto', AlertaPresupuesto.presupuesto_id)
+Index('idx_pago_fijo_usuario_proxima', PagoFijo.usuario_id, PagoFijo.activo, PagoFijo.estado, PagoFijo.proxima_fecha)
+Index('idx_pago_fijo_vencimiento', PagoFijo.activo, PagoFijo.estado, PagoFijo.proxima_fecha, PagoFijo.id)
+Index('idx_configuracion_notificacion_usuario', ConfiguracionNotificacion.usuario_id)
+Index('idx_notificacion_usuario_fecha_id', Notificacion.usuario_id, Notificacion.fecha_creacion, Notificacion.id)
+Index('idx_notificacion_usuario_leido_fecha', Notificacion.usuario_id, Notificacion.leido, Notificacion.fecha_creacion, Notificacion.id)
+Index('idx_notificacion_archivada_usuario_fecha', NotificacionArchivada.usuario_id, NotificacionArchivada.fecha_creacion, NotificacionArchivada.id)
+Index('idx_soporte_usuario', Soporte.usuario_id)
+Index('idx_recuperacion_token', Recuperacion.token, unique=True)
+Index('idx_sesion_token', Sesion.token)
+Index('uq_resumen_mensual', ResumenMensual.usuario_id, ResumenMensual.mes, ResumenMensual.categoria_id, ResumenMensual.tipo, unique=True)
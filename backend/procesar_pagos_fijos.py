@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Registrar como transacciones los cobros vencidos de los pagos fijos
+
+Pensado para ejecutarse desde cron (p. ej. cada hora). Es idempotente: volver
+a ejecutarlo, o ejecutarlo mientras corre otra instancia, no duplica cobros.
+Si el proceso estuvo detenido, pone al día las ocurrencias atrasadas.
+
+Uso: python procesar_pagos_fijos.py [--fecha AAAA-MM-DD] [--lote 500]
+"""
+
+import argparse
+from dataclasses import asdict
+from datetime import date
+
+from utils.procesador_pagos import PAGOS_LOTE, procesar_vencidos
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Procesar pagos fijos vencidos")
+    parser.add_argument("--fecha", type=date.fromisoformat, default=None, help="Procesar como si hoy fuera esta fecha")
+    parser.add_argument("--lote", type=int, default=PAGOS_LOTE, help="Pagos por lote")
+    args = parser.parse_args()
+
+    print(f"🔄 Procesando pagos fijos vencidos al {(args.fecha or date.today()).isoformat()}...")
+    resultado = procesar_vencidos(args.fecha, args.lote)
+
+    for campo, valor in asdict(resultado).items():
+        print(f"   {campo}: {valor}")
+    print("✅ Pagos fijos procesados")
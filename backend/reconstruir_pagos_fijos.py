@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Recalcular la próxima fecha de cobro (proxima_fecha) de los pagos fijos
+
+Las fechas ya vencidas se conservan (cobros pendientes que generará
+procesar_pagos_fijos.py); sólo se recalculan las vacías y las futuras.
+
+Uso: python reconstruir_pagos_fijos.py [--usuario ID]
+"""
+
+import argparse
+
+from database import SessionLocal
+from utils.recurrencia import reconstruir
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcular pagos_fijos.proxima_fecha")
+    parser.add_argument("--usuario", type=int, default=None, help="Recalcular sólo este usuario")
+    args = parser.parse_args()
+
+    objetivo = f"usuario {args.usuario}" if args.usuario else "todos los usuarios"
+    print(f"🔄 Recalculando pagos fijos para {objetivo}...")
+
+    with SessionLocal() as db:
+        filas = reconstruir(db, args.usuario)
+
+    print(f"✅ Pagos fijos recalculados: {filas}")
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Recalcular monto_usado y nivel_alerta de los presupuestos desde la tabla transacciones
+(no genera alertas)
+
+Uso: python reconstruir_presupuestos.py [--usuario ID]
+"""
+
+import argparse
+
+from database import SessionLocal
+from utils.alertas_presupuesto import reconstruir
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcular el monto usado de los presupuestos")
+    parser.add_argument("--usuario", type=int, default=None, help="Recalcular sólo este usuario")
+    args = parser.parse_args()
+
+    objetivo = f"usuario {args.usuario}" if args.usuario else "todos los usuarios"
+    print(f"🔄 Recalculando presupuestos para {objetivo}...")
+
+    with SessionLocal() as db:
+        filas = reconstruir(db, args.usuario)
+
+    print(f"✅ Presupuestos recalculados: {filas}")
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Reconstruir el resumen mensual de transacciones desde la tabla transacciones
+
+Uso: python reconstruir_resumen_mensual.py [--usuario ID]
+"""
+
+import argparse
+
+from database import SessionLocal
+from utils.resumen_mensual import reconstruir
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruir resumen_mensual_transacciones")
+    parser.add_argument("--usuario", type=int, default=None, help="Reconstruir sólo este usuario")
+    args = parser.parse_args()
+
+    objetivo = f"usuario {args.usuario}" if args.usuario else "todos los usuarios"
+    print(f"🔄 Reconstruyendo resumen mensual para {objetivo}...")
+
+    with SessionLocal() as db:
+        filas = reconstruir(db, args.usuario)
+
+    print(f"✅ Resumen reconstruido: {filas} filas")
@@ -1,22 +1,16 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, and_
 from datetime import date, datetime, timedelta
 
-from database import SessionLocal
-from models.BD import Transaccion, PagoFijo, Notificacion, Categoria, Presupuesto
+from database import get_db
+from models.BD import Transaccion
 from utils.auth import obtener_usuario_actual
-from schemas.dashboard import DashboardResponse, CategoriaResumen, PresupuestoResumen, PagoFijoResumen
+from utils import resumen_mensual
+from utils.resumen_dashboard import calcular_dashboard
+from schemas.dashboard import DashboardResponse
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/dashboard/balance")
 def obtener_balance(
     db: Session = Depends(get_db),
@@ -24,15 +18,10 @@ def obtener_balance(
 ):
     """Obtener el balance actual del usuario"""
     try:
-        # Calcular ingresos totales
-        total_ingresos = db.query(func.coalesce(func.sum(Transaccion.monto), 0))\
-            .filter(Transaccion.usuario_id == usuario.id, Transaccion.tipo == 'ingreso')\
-            .scalar()
-        
-        # Calcular egresos totales
-        total_egresos = db.query(func.coalesce(func.sum(Transaccion.monto), 0))\
-            .filter(Transaccion.usuario_id == usuario.id, Transaccion.tipo == 'egreso')\
-            .scalar()
+        # Ingresos y egresos totales desde el resumen mensual
+        totales = resumen_mensual.totales_por_tipo(db, usuario.id)
+        total_ingresos = totales["ingreso"]
+        total_egresos = totales["egreso"]
         
         # Calcular balance
         balance = total_ingresos - total_egresos
@@ -96,25 +85,10 @@ def obtener_resumen_dashboard(
             fecha_inicio = hoy.replace(month=1, day=1)
             fecha_fin = hoy.replace(month=12, day=31)
         
-        # Calcular ingresos del período
-        ingresos = db.query(func.coalesce(func.sum(Transaccion.monto), 0))\
-            .filter(
-                Transaccion.usuario_id == usuario.id,
-                Transaccion.tipo == 'ingreso',
-                Transaccion.fecha >= fecha_inicio,
-                Transaccion.fecha <= fecha_fin
-            )\
-            .scalar()
-        
-        # Calcular egresos del período
-        egresos = db.query(func.coalesce(func.sum(Transaccion.monto), 0))\
-            .filter(
-                Transaccion.usuario_id == usuario.id,
-                Transaccion.tipo == 'egreso',
-                Transaccion.fecha >= fecha_inicio,
-                Transaccion.fecha <= fecha_fin
-            )\
-            .scalar()
+        # Ingresos, egresos y número de transacciones del período
+        totales = resumen_mensual.totales_por_tipo(db, usuario.id, fecha_inicio, fecha_fin)
+        ingresos = totales["ingreso"]
+        egresos = totales["egreso"]
         
         # Calcular ahorros (ingresos - egresos)
         ahorros = ingresos - egresos
@@ -126,13 +100,7 @@ def obtener_resumen_dashboard(
             "ingresos": float(ingresos),
             "gastos": float(egresos),
             "ahorros": float(ahorros),
-            "total_transacciones": db.query(func.count(Transaccion.id))\
-                .filter(
-                    Transaccion.usuario_id == usuario.id,
-                    Transaccion.fecha >= fecha_inicio,
-                    Transaccion.fecha <= fecha_fin
-                )\
-                .scalar()
+            "total_transacciones": totales["cantidad"]
         }
     except Exception as e:
         return {
@@ -150,118 +118,5 @@ def obtener_dashboard(
     db: Session = Depends(get_db),
     usuario = Depends(obtener_usuario_actual)
 ):
-    # Construir filtro para fechas
-    filtro_fecha = True  # Siempre True para evitar complicaciones si no hay filtro
-    if fecha_inicio and fecha_fin:
-        filtro_fecha = and_(Transaccion.fecha >= fecha_inicio, Transaccion.fecha <= fecha_fin)
-    elif fecha_inicio:
-        filtro_fecha = Transaccion.fecha >= fecha_inicio
-    elif fecha_fin:
-        filtro_fecha = Transaccion.fecha <= fecha_fin
-
-    # Totales ingresos y egresos con filtro fecha
-    totales = db.query(
-        func.coalesce(func.sum(case((Transaccion.tipo == 'ingreso', Transaccion.monto))), 0),
-        func.coalesce(func.sum(case((Transaccion.tipo == 'egreso', Transaccion.monto))), 0)
-    ).filter(Transaccion.usuario_id == usuario.id, filtro_fecha).one()
-
-    total_ingresos, total_egresos = totales
-    saldo = total_ingresos - total_egresos
-
-    # Ingresos por categoría con filtro fecha
-    ingresos_cat = db.query(
-        Categoria.id.label("categoria_id"),
-        Categoria.nombre,
-        Categoria.tipo,
-        func.coalesce(func.sum(Transaccion.monto), 0).label("monto_total")
-    ).join(Transaccion, Transaccion.categoria_id == Categoria.id)\
-     .filter(Transaccion.usuario_id == usuario.id, Categoria.tipo == 'ingreso', filtro_fecha)\
-     .group_by(Categoria.id, Categoria.nombre, Categoria.tipo).all()
-
-    total_ingresos_suma = sum(row.monto_total for row in ingresos_cat) or 1
-    ingresos_por_categoria = [
-        CategoriaResumen(
-            categoria_id=row.categoria_id,
-            nombre=row.nombre,
-            tipo=row.tipo,
-            monto_total=row.monto_total,
-            porcentaje=float(row.monto_total) / float(total_ingresos_suma) * 100
-        )
-        for row in ingresos_cat
-    ]
-
-    # Egresos por categoría con filtro fecha
-    egresos_cat = db.query(
-        Categoria.id.label("categoria_id"),
-        Categoria.nombre,
-        Categoria.tipo,
-        func.coalesce(func.sum(Transaccion.monto), 0).label("monto_total")
-    ).join(Transaccion, Transaccion.categoria_id == Categoria.id)\
-     .filter(Transaccion.usuario_id == usuario.id, Categoria.tipo == 'egreso', filtro_fecha)\
-     .group_by(Categoria.id, Categoria.nombre, Categoria.tipo).all()
-
-    total_egresos_suma = sum(row.monto_total for row in egresos_cat) or 1
-    egresos_por_categoria = [
-        CategoriaResumen(
-            categoria_id=row.categoria_id,
-            nombre=row.nombre,
-            tipo=row.tipo,
-            monto_total=row.monto_total,
-            porcentaje=float(row.monto_total) / float(total_egresos_suma) * 100
-        )
-        for row in egresos_cat
-    ]
-
-    # Presupuestos (sin filtro de fechas, porque el presupuesto tiene rango propio)
-    presupuestos_db = db.query(
-        Presupuesto.id.label("presupuesto_id"),
-        Presupuesto.categoria_id,
-        Categoria.nombre.label("categoria_nombre"),
-        Presupuesto.monto_total,
-        func.coalesce(func.sum(Transaccion.monto), 0).label("monto_usado")
-    ).join(Categoria, Presupuesto.categoria_id == Categoria.id)\
-     .outerjoin(Transaccion, (Transaccion.presupuesto_id == Presupuesto.id) & (Transaccion.usuario_id == usuario.id))\
-     .filter(Presupuesto.usuario_id == usuario.id)\
-     .group_by(Presupuesto.id, Presupuesto.categoria_id, Categoria.nombre, Presupuesto.monto_total).all()
-
-    presupuestos = [
-        PresupuestoResumen(
-            presupuesto_id=row.presupuesto_id,
-            categoria_id=row.categoria_id,
-            categoria_nombre=row.categoria_nombre,
-            monto_total=row.monto_total,
-            monto_usado=row.monto_usado,
-            porcentaje_usado=(float(row.monto_usado) / float(row.monto_total) * 100) if row.monto_total > 0 else 0,
-            excedido=row.monto_usado > row.monto_total
-        )
-        for row in presupuestos_db
-    ]
-
-    # Pagos fijos activos y pendientes (filtramos por fecha de inicio dentro del rango si se pasa)
-    pagos_query = db.query(PagoFijo).filter(
-        PagoFijo.usuario_id == usuario.id,
-        PagoFijo.activo == True,
-        PagoFijo.estado == 'Pendiente',
-    )
-    if fecha_inicio:
-        pagos_query = pagos_query.filter(PagoFijo.fecha_inicio >= fecha_inicio)
-    if fecha_fin:
-        pagos_query = pagos_query.filter(PagoFijo.fecha_inicio <= fecha_fin)
-
-    pagos_pendientes = pagos_query.order_by(PagoFijo.fecha_inicio.asc()).limit(5).all()
-
-    # Notificaciones no leídas (sin filtro de fechas)
-    notificaciones_no_leidas = db.query(func.count()).select_from(Notificacion)\
-        .filter(Notificacion.usuario_id == usuario.id, Notificacion.leido == False)\
-        .scalar()
-
-    return DashboardResponse(
-        total_ingresos=total_ingresos,
-        total_egresos=total_egresos,
-        saldo=saldo,
-        ingresos_por_categoria=ingresos_por_categoria,
-        egresos_por_categoria=egresos_por_categoria,
-        presupuestos=presupuestos,
-        pagos_pendientes=pagos_pendientes,
-        notificaciones_no_leidas=notificaciones_no_leidas
-    )
\ No newline at end of file
+    """Resumen completo del dashboard (agregados en una sola consulta)"""
+    return calcular_dashboard(db, usuario.id, fecha_inicio, fecha_fin)
@@ -0,0 +1,66 @@
+import json
+
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from database import SessionLocal
+from utils import resumen_mensual
+from utils.auth import obtener_usuario_actual, obtener_usuario_stream
+from utils.eventos import EVENTOS_PING, bus_eventos
+from utils.jwt import EVENTOS_TOKEN_EXPIRE_SECONDS, crear_token_eventos
+from utils.notificaciones import contador_no_leidas
+
+router = APIRouter()
+
+def formato_sse(tipo: str, datos: dict) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(datos)}\n\n"
+
+def _estado_actual(usuario_id: int) -> dict:
+    with SessionLocal() as db:
+        totales = resumen_mensual.totales_por_tipo(db, usuario_id)
+        return {
+            "no_leidas": contador_no_leidas.obtener(db, usuario_id),
+            "ingresos": float(totales["ingreso"]),
+            "egresos": float(totales["egreso"]),
+            "balance": float(totales["ingreso"] - totales["egreso"]),
+        }
+
+async def _stream(usuario_id: int):
+    # Suscribir antes de leer el estado: ningún commit posterior se pierde
+    suscripcion = bus_eventos.suscribir(usuario_id)
+    try:
+        yield formato_sse("estado", await run_in_threadpool(_estado_actual, usuario_id))
+        while True:
+            evento = await suscripcion.siguiente(EVENTOS_PING)
+            if evento is None:
+                # Mantiene viva la conexión a través de proxies y detecta clientes caídos
+                yield ": ping\n\n"
+                continue
+            datos = dict(evento)
+            yield formato_sse(datos.pop("tipo"), datos)
+    finally:
+        bus_eventos.cancelar(suscripcion)
+
+@router.post("/eventos/token")
+def token_eventos(usuario=Depends(obtener_usuario_actual)):
+    """
+    Token de vida corta para abrir GET /eventos?token=... desde EventSource
+    (que no envía headers). Sólo vale para el stream; pedir uno nuevo antes
+    de cada reconexión.
+    """
+    return {"token": crear_token_eventos(usuario.id), "expira_en": EVENTOS_TOKEN_EXPIRE_SECONDS}
+
+@router.get("/eventos")
+async def eventos(usuario=Depends(obtener_usuario_stream)):
+    """
+    Stream Server-Sent Events con las notificaciones nuevas, el contador de no
+    leídas y las diferencias de balance del usuario (ver utils/eventos.py).
+    Empieza con un evento `estado` con el contador y el balance completos.
+    Autenticación: header Authorization o ?token= con un token de POST /eventos/token.
+    """
+    return StreamingResponse(
+        _stream(usuario.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,21 +1,46 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
 from datetime import date, datetime, timedelta
 
-from database import SessionLocal
-from models.BD import Transaccion, Categoria, PagoFijo
+import numpy as np
+
+from database import get_db
 from utils.auth import obtener_usuario_actual
+from utils.asincrono import bloqueante
+from utils import resumen_mensual, series_tiempo, tendencias
 from schemas.analytics import AnalyticsSummaryResponse, CategoriaTotal
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+# Granularidad por defecto de cada período
+GRANULARIDAD_PERIODO = {"semana": "dia", "mes": "dia", "trimestre": "semana", "año": "mes"}
+# Tendencias: (granularidad, cubetas completas hacia atrás) por defecto de cada período
+VENTANA_TENDENCIA = {"semana": ("dia", 7), "mes": ("dia", 30), "trimestre": ("semana", 13), "año": ("mes", 12)}
+
+def rango_periodo(periodo: str, hoy: date):
+    """(inicio, fin) del período calendario que contiene `hoy`, o None si no se reconoce"""
+    if periodo == "semana":
+        inicio = hoy - timedelta(days=hoy.weekday())
+        return inicio, inicio + timedelta(days=6)
+    if periodo == "mes":
+        return hoy.replace(day=1), resumen_mensual.fin_mes(hoy)
+    if periodo == "trimestre":
+        inicio = series_tiempo.inicio_cubeta(hoy, "trimestre")
+        return inicio, resumen_mensual.fin_mes(resumen_mensual.sumar_meses(inicio, 2))
+    if periodo == "año":
+        return hoy.replace(month=1, day=1), hoy.replace(month=12, day=31)
+    return None
+
+def serie_del_periodo(db: Session, usuario_id: int, periodo: str, granularidad: str = None):
+    """SeriesTemporales del usuario para el período, o un dict de error como el resto de las gráficas"""
+    rango = rango_periodo(periodo, datetime.now().date())
+    if rango is None:
+        return {"error": "Período no soportado"}
+    granularidad = granularidad or GRANULARIDAD_PERIODO[periodo]
     try:
-        yield db
-    finally:
-        db.close()
+        return series_tiempo.agrupar(db, [usuario_id], rango[0], rango[1], granularidad)
+    except ValueError as e:
+        return {"error": str(e)}
 
 @router.get("/graficas/ingresos-gastos")
 def grafica_ingresos_gastos(
@@ -40,91 +65,59 @@ def grafica_ingresos_gastos(
         fecha_inicio = hoy.replace(month=1, day=1)
         fecha_fin = hoy.replace(month=12, day=31)
     
-    # Consulta base
-    query = db.query(Transaccion).filter(
-        Transaccion.usuario_id == usuario.id,
-        Transaccion.fecha >= fecha_inicio,
-        Transaccion.fecha <= fecha_fin
-    )
-    
     if agrupar_por == "categoria":
-        # Agrupar por categoría
-        ingresos = db.query(
-            Categoria.nombre.label("categoria"),
-            func.coalesce(func.sum(Transaccion.monto), 0).label("total")
-        ).join(Transaccion, Categoria.id == Transaccion.categoria_id)\
-         .filter(Transaccion.usuario_id == usuario.id, Transaccion.tipo == 'ingreso', 
-                Transaccion.fecha >= fecha_inicio, Transaccion.fecha <= fecha_fin)\
-         .group_by(Categoria.nombre).all()
-        
-        egresos = db.query(
-            Categoria.nombre.label("categoria"),
-            func.coalesce(func.sum(Transaccion.monto), 0).label("total")
-        ).join(Transaccion, Categoria.id == Transaccion.categoria_id)\
-         .filter(Transaccion.usuario_id == usuario.id, Transaccion.tipo == 'egreso',
-                Transaccion.fecha >= fecha_inicio, Transaccion.fecha <= fecha_fin)\
-         .group_by(Categoria.nombre).all()
+        # Agrupar por categoría (desde el resumen mensual)
+        ingresos, egresos = {}, {}
+        for fila in resumen_mensual.totales_por_categoria(db, usuario.id, fecha_inicio, fecha_fin):
+            destino = ingresos if fila.tipo == 'ingreso' else egresos
+            destino[fila.categoria] = destino.get(fila.categoria, 0) + float(fila.total)
         
         return {
             "periodo": periodo,
             "agrupar_por": agrupar_por,
-            "ingresos": [{"categoria": r.categoria, "total": float(r.total)} for r in ingresos],
-            "egresos": [{"categoria": r.categoria, "total": float(r.total)} for r in egresos]
+            "ingresos": [{"categoria": c, "total": t} for c, t in ingresos.items()],
+            "egresos": [{"categoria": c, "total": t} for c, t in egresos.items()]
         }
     
     return {"error": "Agrupación no implementada"}
 
 @router.get("/graficas/evolucion-temporal")
+@bloqueante
 def grafica_evolucion_temporal(
-    periodo: str = Query("mes", description="Período de análisis"),
+    periodo: str = Query("mes", description="Período de análisis: semana, mes, trimestre, año"),
     metrica: str = Query("balance", description="Métrica a mostrar: balance, ingresos, egresos"),
+    granularidad: str = Query(None, description="dia, semana, mes, trimestre, anio (por defecto según el período)"),
     db: Session = Depends(get_db),
     usuario=Depends(obtener_usuario_actual)
 ):
-    """Gráfica de evolución temporal de una métrica"""
-    # Calcular fechas según el período
-    hoy = datetime.now().date()
-    if periodo == "mes":
-        fecha_inicio = hoy.replace(day=1)
-        fecha_fin = (fecha_inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        # Agrupar por día
-        group_by = func.date(Transaccion.fecha)
-    elif periodo == "año":
-        fecha_inicio = hoy.replace(month=1, day=1)
-        fecha_fin = hoy.replace(month=12, day=31)
-        # Agrupar por mes
-        group_by = func.strftime('%Y-%m', Transaccion.fecha)
-    else:
-        return {"error": "Período no soportado"}
-    
-    if metrica == "balance":
-        # Calcular balance diario/mensual
-        query = db.query(
-            group_by.label("fecha"),
-            func.coalesce(func.sum(func.case((Transaccion.tipo == 'ingreso', Transaccion.monto), else_=0)), 0).label("ingresos"),
-            func.coalesce(func.sum(func.case((Transaccion.tipo == 'egreso', Transaccion.monto), else_=0)), 0).label("egresos")
-        ).filter(
-            Transaccion.usuario_id == usuario.id,
-            Transaccion.fecha >= fecha_inicio,
-            Transaccion.fecha <= fecha_fin
-        ).group_by(group_by).order_by(group_by)
-        
-        datos = query.all()
-        return {
-            "periodo": periodo,
-            "metrica": metrica,
-            "datos": [
-                {
-                    "fecha": str(r.fecha),
-                    "balance": float(r.ingresos - r.egresos),
-                    "ingresos": float(r.ingresos),
-                    "egresos": float(r.egresos)
-                }
-                for r in datos
-            ]
-        }
-    
-    return {"error": "Métrica no implementada"}
+    """Gráfica de evolución temporal de una métrica, con el saldo acumulado al cierre de cada cubeta"""
+    if metrica not in ("balance", "ingresos", "egresos"):
+        return {"error": "Métrica no implementada"}
+    series = serie_del_periodo(db, usuario.id, periodo, granularidad)
+    if isinstance(series, dict):
+        return series
+    series_tiempo.cargar_saldo_inicial(db, series)
+
+    valores = series.metrica(metrica)[0]
+    return {
+        "periodo": periodo,
+        "metrica": metrica,
+        "granularidad": series.granularidad,
+        "datos": [
+            {
+                "fecha": fecha,
+                "valor": valor,
+                "balance": ingresos - egresos,
+                "ingresos": ingresos,
+                "egresos": egresos,
+                "saldo": saldo
+            }
+            for fecha, valor, ingresos, egresos, saldo in zip(
+                series.etiquetas(), valores.tolist(), series.ingresos[0].tolist(),
+                series.egresos[0].tolist(), series.balance_acumulado()[0].tolist()
+            )
+        ]
+    }
 
 @router.get("/graficas/distribucion-categoria")
 def grafica_distribucion_categoria(
@@ -146,29 +139,23 @@ def grafica_distribucion_categoria(
         return {"error": "Período no soportado"}
     
     # Consultar categorías del tipo especificado
-    categorias = db.query(
-        Categoria.nombre.label("categoria"),
-        func.coalesce(func.sum(Transaccion.monto), 0).label("total")
-    ).join(Transaccion, Categoria.id == Transaccion.categoria_id)\
-     .filter(
-        Transaccion.usuario_id == usuario.id,
-        Categoria.tipo == tipo,
-        Transaccion.fecha >= fecha_inicio,
-        Transaccion.fecha <= fecha_fin
-     ).group_by(Categoria.nombre).all()
+    montos = {}
+    for fila in resumen_mensual.totales_por_categoria(db, usuario.id, fecha_inicio, fecha_fin):
+        if fila.tipo_categoria == tipo:
+            montos[fila.categoria] = montos.get(fila.categoria, 0) + fila.total
     
-    total = sum(r.total for r in categorias) or 1
+    total = sum(montos.values()) or 1
     
     return {
         "periodo": periodo,
         "tipo": tipo,
         "datos": [
             {
-                "categoria": r.categoria,
-                "monto": float(r.total),
-                "porcentaje": float(r.total / total * 100)
+                "categoria": categoria,
+                "monto": float(monto),
+                "porcentaje": float(monto / total * 100)
             }
-            for r in categorias
+            for categoria, monto in montos.items()
         ]
     }
 
@@ -180,41 +167,21 @@ def grafica_comparacion_mensual(
 ):
     """Gráfica de comparación mensual"""
     hoy = datetime.now().date()
-    datos = []
-    
-    for i in range(meses):
-        fecha = hoy.replace(day=1) - timedelta(days=30*i)
-        fecha_inicio = fecha.replace(day=1)
-        fecha_fin = (fecha_inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        # Calcular ingresos del mes
-        ingresos = db.query(func.coalesce(func.sum(Transaccion.monto), 0))\
-            .filter(
-                Transaccion.usuario_id == usuario.id,
-                Transaccion.tipo == 'ingreso',
-                Transaccion.fecha >= fecha_inicio,
-                Transaccion.fecha <= fecha_fin
-            ).scalar()
-        
-        # Calcular egresos del mes
-        egresos = db.query(func.coalesce(func.sum(Transaccion.monto), 0))\
-            .filter(
-                Transaccion.usuario_id == usuario.id,
-                Transaccion.tipo == 'egreso',
-                Transaccion.fecha >= fecha_inicio,
-                Transaccion.fecha <= fecha_fin
-            ).scalar()
-        
-        datos.append({
-            "mes": fecha.strftime("%Y-%m"),
-            "ingresos": float(ingresos),
-            "egresos": float(egresos),
-            "balance": float(ingresos - egresos)
-        })
+    series = resumen_mensual.series_mensuales(
+        db, usuario.id, resumen_mensual.sumar_meses(hoy, -(meses - 1)), hoy
+    )
     
     return {
         "meses": meses,
-        "datos": list(reversed(datos))  # Del más reciente al más antiguo
+        "datos": [
+            {
+                "mes": s["mes"].strftime("%Y-%m"),
+                "ingresos": float(s["ingresos"]),
+                "egresos": float(s["egresos"]),
+                "balance": float(s["ingresos"] - s["egresos"])
+            }
+            for s in series
+        ]  # Del más antiguo al más reciente
     }
 
 @router.get("/graficas/presupuesto-vs-real")
@@ -233,19 +200,43 @@ def grafica_presupuesto_vs_real(
     }
 
 @router.get("/graficas/tendencias")
+@bloqueante
 def grafica_tendencias(
-    periodo: str = Query("año", description="Período de análisis"),
+    periodo: str = Query("año", description="Período de análisis: semana, mes, trimestre, año"),
     metrica: str = Query("gastos", description="Métrica: ingresos, gastos, balance"),
+    granularidad: str = Query(None, description="dia, semana, mes, trimestre, anio (por defecto según el período)"),
+    cubetas: int = Query(None, ge=2, le=series_tiempo.MAX_CUBETAS, description="Cubetas completas a analizar (por defecto según el período)"),
+    ventana: int = Query(3, ge=1, le=60, description="Cubetas del promedio móvil"),
     db: Session = Depends(get_db),
     usuario=Depends(obtener_usuario_actual)
 ):
-    """Gráfica de tendencias"""
-    # Por ahora retornamos datos básicos
+    """
+    Tendencia de una métrica en las últimas cubetas completas (la cubeta en
+    curso queda fuera para no sesgar el crecimiento ni la recta): promedio
+    móvil, crecimiento respecto a la cubeta anterior y recta de regresión
+    """
+    if metrica not in tendencias.METRICAS:
+        return {"error": "Métrica no implementada"}
+    if periodo not in VENTANA_TENDENCIA:
+        return {"error": "Período no soportado"}
+    granularidad_defecto, cubetas_defecto = VENTANA_TENDENCIA[periodo]
+    granularidad = granularidad or granularidad_defecto
+    try:
+        desde, hasta = series_tiempo.ultimas_cubetas(datetime.now().date(), granularidad, cubetas or cubetas_defecto)
+        series = series_tiempo.agrupar(db, [usuario.id], desde, hasta, granularidad)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    resultado = tendencias.calcular(series, metrica, ventana)
     return {
         "periodo": periodo,
         "metrica": metrica,
-        "datos": [],
-        "mensaje": "Funcionalidad en desarrollo"
+        "granularidad": granularidad,
+        "ventana": ventana,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "resumen": resultado.resumen(0),
+        "datos": resultado.datos(0)
     }
 
 @router.get("/graficas/pagos-fijos")
@@ -263,17 +254,44 @@ def grafica_pagos_fijos(
     }
 
 @router.get("/graficas/ahorros")
+@bloqueante
 def grafica_ahorros(
-    periodo: str = Query("año", description="Período de análisis"),
+    periodo: str = Query("año", description="Período de análisis: semana, mes, trimestre, año"),
+    granularidad: str = Query(None, description="dia, semana, mes, trimestre, anio (por defecto según el período)"),
     db: Session = Depends(get_db),
     usuario=Depends(obtener_usuario_actual)
 ):
-    """Gráfica de ahorros"""
-    # Por ahora retornamos datos básicos
+    """Gráfica de ahorros: ahorro, tasa de ahorro y ahorro acumulado por cubeta"""
+    series = serie_del_periodo(db, usuario.id, periodo, granularidad)
+    if isinstance(series, dict):
+        return series
+
+    ingresos, ahorro = series.ingresos[0], series.balance[0]
+    # Tasa de ahorro (% de los ingresos); 0 en las cubetas sin ingresos
+    tasa = np.divide(ahorro * 100, ingresos, out=np.zeros_like(ahorro), where=ingresos != 0)
+    total_ingresos, total_ahorro = float(ingresos.sum()), float(ahorro.sum())
+
     return {
         "periodo": periodo,
-        "datos": [],
-        "mensaje": "Funcionalidad en desarrollo"
+        "granularidad": series.granularidad,
+        "total_ingresos": total_ingresos,
+        "total_egresos": float(series.egresos[0].sum()),
+        "total_ahorro": total_ahorro,
+        "tasa_ahorro": total_ahorro * 100 / total_ingresos if total_ingresos else 0,
+        "datos": [
+            {
+                "fecha": fecha,
+                "ingresos": ingresos_cubeta,
+                "egresos": egresos_cubeta,
+                "ahorro": ahorro_cubeta,
+                "tasa_ahorro": tasa_cubeta,
+                "ahorro_acumulado": acumulado
+            }
+            for fecha, ingresos_cubeta, egresos_cubeta, ahorro_cubeta, tasa_cubeta, acumulado in zip(
+                series.etiquetas(), ingresos.tolist(), series.egresos[0].tolist(),
+                ahorro.tolist(), tasa.tolist(), np.cumsum(ahorro).tolist()
+            )
+        ]
     }
 
 @router.get("/graficas/metricas")
@@ -295,33 +313,16 @@ def graficas_metricas(
         return {"error": "Período no soportado"}
     
     # Calcular métricas básicas
-    ingresos = db.query(func.coalesce(func.sum(Transaccion.monto), 0))\
-        .filter(
-            Transaccion.usuario_id == usuario.id,
-            Transaccion.tipo == 'ingreso',
-            Transaccion.fecha >= fecha_inicio,
-            Transaccion.fecha <= fecha_fin
-        ).scalar()
-    
-    egresos = db.query(func.coalesce(func.sum(Transaccion.monto), 0))\
-        .filter(
-            Transaccion.usuario_id == usuario.id,
-            Transaccion.tipo == 'egreso',
-            Transaccion.fecha >= fecha_inicio,
-            Transaccion.fecha <= fecha_fin
-        ).scalar()
+    totales = resumen_mensual.totales_por_tipo(db, usuario.id, fecha_inicio, fecha_fin)
+    ingresos = totales["ingreso"]
+    egresos = totales["egreso"]
     
     return {
         "periodo": periodo,
         "ingresos": float(ingresos),
         "egresos": float(egresos),
         "ahorros": float(ingresos - egresos),
-        "total_transacciones": db.query(func.count(Transaccion.id))\
-            .filter(
-                Transaccion.usuario_id == usuario.id,
-                Transaccion.fecha >= fecha_inicio,
-                Transaccion.fecha <= fecha_fin
-            ).scalar()
+        "total_transacciones": totales["cantidad"]
     }
 
 # Mantener compatibilidad con la ruta anterior
@@ -333,36 +334,12 @@ def resumen_analitico_old(
     usuario=Depends(obtener_usuario_actual)
 ):
     """Endpoint de compatibilidad - usar /graficas/ingresos-gastos en su lugar"""
-    filtro_fecha = True
-    if fecha_inicio and fecha_fin:
-        filtro_fecha = and_(Transaccion.fecha >= fecha_inicio, Transaccion.fecha <= fecha_fin)
-    elif fecha_inicio:
-        filtro_fecha = Transaccion.fecha >= fecha_inicio
-    elif fecha_fin:
-        filtro_fecha = Transaccion.fecha <= fecha_fin
+    ingresos, egresos = {}, {}
+    for fila in resumen_mensual.totales_por_categoria(db, usuario.id, fecha_inicio, fecha_fin):
+        destino = ingresos if fila.tipo == 'ingreso' else egresos
+        destino[fila.categoria] = destino.get(fila.categoria, 0) + fila.total
 
-    # Ingresos
-    ingresos_query = (
-        db.query(
-            Categoria.nombre.label("categoria"),
-            func.coalesce(func.sum(Transaccion.monto), 0).label("total")
-        )
-        .join(Transaccion, Categoria.id == Transaccion.categoria_id)
-        .filter(Transaccion.usuario_id == usuario.id, Transaccion.tipo == 'ingreso', filtro_fecha)
-        .group_by(Categoria.nombre)
+    return AnalyticsSummaryResponse(
+        ingresos=[CategoriaTotal(categoria=c, total=t) for c, t in ingresos.items()],
+        egresos=[CategoriaTotal(categoria=c, total=t) for c, t in egresos.items()]
     )
-    ingresos = [CategoriaTotal(categoria=r.categoria, total=r.total) for r in ingresos_query.all()]
-
-    # Egresos
-    egresos_query = (
-        db.query(
-            Categoria.nombre.label("categoria"),
-            func.coalesce(func.sum(Transaccion.monto), 0).label("total")
-        )
-        .join(Transaccion, Categoria.id == Transaccion.categoria_id)
-        .filter(Transaccion.usuario_id == usuario.id, Transaccion.tipo == 'egreso', filtro_fecha)
-        .group_by(Categoria.nombre)
-    )
-    egresos = [CategoriaTotal(categoria=r.categoria, total=r.total) for r in egresos_query.all()]
-
-    return AnalyticsSummaryResponse(ingresos=ingresos, egresos=egresos)
\ No newline at end of file
@@ -1,22 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
-from sqlalchemy import func
 
-from database import SessionLocal
-from models.BD import Notificacion, ConfiguracionNotificacion
+from database import get_db
+from models.BD import Notificacion, NotificacionArchivada, ConfiguracionNotificacion, Usuario
 from utils.auth import obtener_usuario_actual
+from utils.asincrono import bloqueante_con_redis
+from utils import notificaciones as servicio
+from utils.notificaciones import contador_no_leidas
+from utils.paginacion import paginar, HEADER_SIGUIENTE_CURSOR
 from schemas.notificaciones import (
+    NotificacionCreate,
+    NotificacionDifusion,
+    NotificacionDifusionOut,
     NotificacionOut,
+    NotificacionArchivadaOut,
     ConfiguracionNotificacionOut,
     ConfiguracionNotificacionUpdate
 )
 
 router = APIRouter()
 
-def get_db():
-    with SessionLocal() as db:
-        yield db
+LIMITE_PAGINA = 20
+LIMITE_PAGINA_MAXIMO = 100
 
 @router.get("/notificaciones/configuracion", response_model=ConfiguracionNotificacionOut)
 def obtener_configuracion(db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
@@ -44,63 +50,91 @@ def actualizar_configuracion(payload: ConfiguracionNotificacionUpdate, db: Sessi
     return config
 
 @router.get("/notificaciones/contador-no-leidas")
+@bloqueante_con_redis
 def obtener_contador_no_leidas(db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
-    """Obtener el contador de notificaciones no leídas"""
-    contador = db.query(func.count(Notificacion.id))\
-        .filter(Notificacion.usuario_id == usuario.id, Notificacion.leido == False)\
-        .scalar()
-    
-    return {"contador": contador}
+    """Obtener el contador de notificaciones no leídas (en caché hasta el siguiente cambio)"""
+    return {"contador": contador_no_leidas.obtener(db, usuario.id)}
 
 @router.get("/notificaciones/marcar-todas-leidas")
+@bloqueante_con_redis
 def marcar_todas_leidas(db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
     """Marcar todas las notificaciones del usuario como leídas"""
-    db.query(Notificacion)\
-        .filter(Notificacion.usuario_id == usuario.id, Notificacion.leido == False)\
-        .update({"leido": True})
-    db.commit()
-    
+    servicio.marcar_todas_leidas(db, usuario.id)
+
     return {"mensaje": "Todas las notificaciones marcadas como leídas"}
 
 @router.delete("/notificaciones/eliminar-leidas")
+@bloqueante_con_redis
 def eliminar_notificaciones_leidas(db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
     """Eliminar todas las notificaciones leídas del usuario"""
-    db.query(Notificacion)\
-        .filter(Notificacion.usuario_id == usuario.id, Notificacion.leido == True)\
-        .delete()
-    db.commit()
-    
+    servicio.eliminar_leidas(db, usuario.id)
+
     return {"mensaje": "Notificaciones leídas eliminadas exitosamente"}
 
 # Obtener todas las notificaciones del usuario
 @router.get("/notificaciones", response_model=List[NotificacionOut])
 def obtener_notificaciones(
-    pagina: int = Query(1, ge=1, description="Número de página"),
-    limite: int = Query(20, ge=1, le=100, description="Elementos por página"),
+    response: Response,
+    limite: int = Query(LIMITE_PAGINA, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Elementos por página"),
+    cursor: str = Query(None, description="Cursor devuelto en el header X-Siguiente-Cursor"),
+    pagina: int = Query(None, ge=1, deprecated=True, description="Paginación por OFFSET; usar cursor"),
     solo_no_leidas: bool = Query(False, description="Solo notificaciones no leídas"),
     db: Session = Depends(get_db), 
     usuario=Depends(obtener_usuario_actual)
 ):
-    """Obtener notificaciones con paginación y filtros"""
+    """Obtener notificaciones con filtros, paginadas por (fecha_creacion, id)"""
     query = db.query(Notificacion).filter(Notificacion.usuario_id == usuario.id)
     
     if solo_no_leidas:
         query = query.filter(Notificacion.leido == False)
-    
-    # Calcular offset para paginación
-    offset = (pagina - 1) * limite
-    
-    notificaciones = query.order_by(Notificacion.fecha_creacion.desc())\
-        .offset(offset).limit(limite).all()
-    
+
+    if pagina is not None and not cursor:
+        # Compatibilidad con clientes anteriores: el costo crece con la página
+        return query.order_by(Notificacion.fecha_creacion.desc(), Notificacion.id.desc())\
+            .offset((pagina - 1) * limite).limit(limite).all()
+
+    notificaciones, siguiente = paginar(query, [Notificacion.fecha_creacion, Notificacion.id], limite, cursor)
+    if siguiente:
+        response.headers[HEADER_SIGUIENTE_CURSOR] = siguiente
     return notificaciones
 
+@router.get("/notificaciones/archivo", response_model=List[NotificacionArchivadaOut])
+def obtener_notificaciones_archivadas(
+    response: Response,
+    limite: int = Query(LIMITE_PAGINA, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Elementos por página"),
+    cursor: str = Query(None, description="Cursor devuelto en el header X-Siguiente-Cursor"),
+    db: Session = Depends(get_db),
+    usuario=Depends(obtener_usuario_actual)
+):
+    """Notificaciones leídas antiguas que movió el proceso de retención, paginadas por (fecha_creacion, id)"""
+    query = db.query(NotificacionArchivada).filter(NotificacionArchivada.usuario_id == usuario.id)
+    archivadas, siguiente = paginar(query, [NotificacionArchivada.fecha_creacion, NotificacionArchivada.id], limite, cursor)
+    if siguiente:
+        response.headers[HEADER_SIGUIENTE_CURSOR] = siguiente
+    return archivadas
+
 @router.post("/notificaciones", response_model=NotificacionOut)
-def crear_notificacion(payload: dict, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
-    """Crear una nueva notificación"""
-    # Por ahora retornamos éxito
-    # En una implementación completa, crearías la notificación
-    return {"mensaje": "Notificación creada exitosamente"}
+@bloqueante_con_redis
+def crear_notificacion(payload: NotificacionCreate, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
+    """Crear una notificación (para otro usuario sólo si eres admin)"""
+    if payload.usuario_id != usuario.id and usuario.rol != "admin":
+        raise HTTPException(status_code=403, detail="No puedes crear notificaciones para otro usuario")
+    if payload.usuario_id != usuario.id and db.get(Usuario, payload.usuario_id) is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return servicio.crear(db, payload.usuario_id, payload.mensaje)
+
+@router.post("/notificaciones/difusion", response_model=NotificacionDifusionOut)
+@bloqueante_con_redis
+def difundir_notificacion(payload: NotificacionDifusion, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
+    """Crear el mismo aviso para varios usuarios o para todos, en lotes (sólo admin)"""
+    if usuario.rol != "admin":
+        raise HTTPException(status_code=403, detail="Solo un administrador puede enviar avisos")
+    if payload.todos == bool(payload.usuario_ids):
+        raise HTTPException(status_code=400, detail="Indica usuario_ids o todos=true")
+    if payload.todos:
+        return {"creadas": servicio.anunciar(db, payload.mensaje, payload.preferencia)}
+    resultado = servicio.notificar(db, payload.usuario_ids, payload.mensaje, payload.preferencia)
+    return {"creadas": resultado.creadas, "usuarios_desconocidos": resultado.desconocidos}
 
 @router.get("/notificaciones/{id}", response_model=NotificacionOut)
 def obtener_notificacion(id: int, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
@@ -114,35 +148,35 @@ def obtener_notificacion(id: int, db: Session = Depends(get_db), usuario=Depends
     return notificacion
 
 @router.put("/notificaciones/{id}/leer")
+@bloqueante_con_redis
 def marcar_como_leida(id: int, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
     """Marcar una notificación como leída"""
-    notificacion = db.query(Notificacion)\
-        .filter(Notificacion.id == id, Notificacion.usuario_id == usuario.id).first()
-    
-    if not notificacion:
+    if not servicio.marcar_leida(db, usuario.id, id):
         raise HTTPException(status_code=404, detail="Notificación no encontrada")
     
-    notificacion.leido = True
-    db.commit()
-    
     return {"mensaje": "Notificación marcada como leída"}
 
 @router.delete("/notificaciones/{id}")
+@bloqueante_con_redis
 def eliminar_notificacion(id: int, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
     """Eliminar una notificación"""
-    notificacion = db.query(Notificacion)\
-        .filter(Notificacion.id == id, Notificacion.usuario_id == usuario.id).first()
-    
-    if not notificacion:
+    if not servicio.eliminar(db, usuario.id, id):
         raise HTTPException(status_code=404, detail="Notificación no encontrada")
     
-    db.delete(notificacion)
-    db.commit()
-    
     return {"mensaje": "Notificación eliminada exitosamente"}
 
 # Mantener compatibilidad con la ruta anterior
 @router.get("/notifications", response_model=List[NotificacionOut])
-def obtener_notificaciones_old(db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
+def obtener_notificaciones_old(
+    response: Response,
+    limite: int = Query(LIMITE_PAGINA, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    cursor: str = Query(None),
+    db: Session = Depends(get_db),
+    usuario=Depends(obtener_usuario_actual)
+):
     """Endpoint de compatibilidad - usar /notificaciones en su lugar"""
-    return obtener_notificaciones(db=db, usuario=usuario)
\ No newline at end of file
+    query = db.query(Notificacion).filter(Notificacion.usuario_id == usuario.id)
+    notificaciones, siguiente = paginar(query, [Notificacion.fecha_creacion, Notificacion.id], limite, cursor)
+    if siguiente:
+        response.headers[HEADER_SIGUIENTE_CURSOR] = siguiente
+    return notificaciones
\ No newline at end of file
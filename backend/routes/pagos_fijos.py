@@ -1,64 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import date, datetime, timedelta
 from fastapi.responses import Response
 
-from models.BD import PagoFijo, Categoria
-from database import SessionLocal
+from models.BD import PagoFijo
+from database import get_db
 from utils.auth import obtener_usuario_actual
+from utils.cache_categorias import catalogo_categorias
+from utils.etag import responder_con_etag
+from utils import recurrencia
 from schemas.pagos_fijos import PagoFijoCreate, PagoFijoOut, PagoFijoUpdate
 
 router = APIRouter()
 
-def get_db():
-    with SessionLocal() as db:
-        yield db
-
 @router.get("/pagos-fijos/proximos")
 def listar_pagos_proximos(
     dias: int = Query(30, ge=1, le=365, description="Días hacia adelante para buscar pagos"),
     db: Session = Depends(get_db), 
     usuario=Depends(obtener_usuario_actual)
 ):
-    """Obtener pagos fijos próximos en los próximos N días"""
+    """Obtener pagos fijos con cobros en los próximos N días (con cada ocurrencia del período)"""
     hoy = date.today()
     fecha_limite = hoy + timedelta(days=dias)
-    
+
+    # proxima_fecha <= límite usa idx_pago_fijo_usuario_proxima; las ocurrencias
+    # se calculan desde fecha_inicio, así que una proxima_fecha atrasada no las altera
     pagos = db.query(PagoFijo).filter(
         PagoFijo.usuario_id == usuario.id,
-        PagoFijo.fecha_inicio >= hoy,
-        PagoFijo.fecha_inicio <= fecha_limite,
+        PagoFijo.activo == True,
         PagoFijo.estado == "Pendiente",
-        PagoFijo.activo == True
-    ).order_by(PagoFijo.fecha_inicio.asc()).all()
-    
-    return [
-        {
+        PagoFijo.proxima_fecha <= fecha_limite
+    ).order_by(PagoFijo.proxima_fecha.asc()).all()
+
+    proximos = []
+    for p in pagos:
+        fechas = list(recurrencia.ocurrencias(p.fecha_inicio, p.frecuencia, hoy, fecha_limite))
+        if not fechas:
+            continue
+        proximos.append({
             "id": p.id,
-            "descripcion": p.descripcion,
+            "nombre": p.nombre,
             "monto": float(p.monto),
-            "fecha_inicio": p.fecha_inicio.isoformat() if p.fecha_inicio else None,
+            "fecha_inicio": p.fecha_inicio.isoformat(),
+            "proxima_fecha": fechas[0].isoformat(),
+            "ocurrencias": [f.isoformat() for f in fechas],
             "frecuencia": p.frecuencia,
-            "categoria": p.categoria.nombre if p.categoria else None,
+            "categoria": p.categoria,
             "estado": p.estado
-        }
-        for p in pagos
-    ]
+        })
+    proximos.sort(key=lambda pago: pago["proxima_fecha"])
+    return proximos
 
 @router.get("/pagos-fijos/categorias")
-def obtener_categorias_pagos_fijos(db: Session = Depends(get_db)):
-    """Obtener categorías disponibles para pagos fijos"""
-    categorias = db.query(Categoria).filter(Categoria.tipo == 'egreso').all()
-    return [
+def obtener_categorias_pagos_fijos(request: Request, db: Session = Depends(get_db)):
+    """Obtener categorías disponibles para pagos fijos (en caché; responde 304 si el ETag no cambió)"""
+    catalogo = catalogo_categorias.obtener(db)
+    return responder_con_etag(request, catalogo.etag("egreso"), lambda: [
         {
             "id": c.id,
             "nombre": c.nombre,
             "tipo": c.tipo,
             "descripcion": c.descripcion
         }
-        for c in categorias
-    ]
+        for c in catalogo.de_tipo("egreso")
+    ])
 
 @router.get("/pagos-fijos/frecuencias")
 def obtener_frecuencias_pagos_fijos():
@@ -83,6 +89,7 @@ def listar_pagos_fijos(db: Session = Depends(get_db), usuario=Depends(obtener_us
 def crear_pago_fijo(payload: PagoFijoCreate, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
     """Crear un nuevo pago fijo"""
     nuevo_pago = PagoFijo(usuario_id=usuario.id, **payload.dict())
+    recurrencia.sincronizar(nuevo_pago)
     db.add(nuevo_pago)
     db.commit()
     db.refresh(nuevo_pago)
@@ -103,8 +110,11 @@ def editar_pago_fijo(id: int, payload: PagoFijoUpdate, db: Session = Depends(get
     if not pago:
         raise HTTPException(status_code=404, detail="Pago fijo no encontrado")
     
-    for key, value in payload.dict(exclude_unset=True).items():
+    cambios = payload.dict(exclude_unset=True)
+    for key, value in cambios.items():
         setattr(pago, key, value)
+    if "fecha_inicio" in cambios or "frecuencia" in cambios:
+        recurrencia.sincronizar(pago)
     
     db.commit()
     db.refresh(pago)
@@ -141,6 +151,7 @@ def reanudar_pago_fijo(id: int, db: Session = Depends(get_db), usuario=Depends(o
         raise HTTPException(status_code=404, detail="Pago fijo no encontrado")
     
     pago.activo = True
+    recurrencia.sincronizar(pago)
     db.commit()
     
     return {"mensaje": "Pago fijo reanudado exitosamente"}
\ No newline at end of file
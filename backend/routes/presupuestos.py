@@ -1,31 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from typing import List
 from sqlalchemy import func
-from models.BD import Presupuesto, Categoria
+from models.BD import AlertaPresupuesto, Presupuesto
 from schemas.presupuestos import PresupuestoCreate, PresupuestoOut, PresupuestoUpdate
-from database import SessionLocal
+from database import get_db
 from utils.auth import obtener_usuario_actual
+from utils.cache_categorias import catalogo_categorias
+from utils.etag import responder_con_etag
+from utils import alertas_presupuesto
+from utils.evaluacion_presupuestos import (
+    EXCEDIDO, NORMAL, PRESUPUESTO_UMBRAL_ALERTA, PRESUPUESTO_UMBRAL_EXCEDIDO, PROXIMO_EXCEDER, evaluar_presupuestos
+)
 
 router = APIRouter()
 
-def get_db():
-    with SessionLocal() as db:
-        yield db
-
 @router.get("/presupuestos/categorias")
-def obtener_categorias_presupuesto(db: Session = Depends(get_db)):
-    """Obtener categorías disponibles para presupuestos"""
-    categorias = db.query(Categoria).filter(Categoria.tipo == 'egreso').all()
-    return [
+def obtener_categorias_presupuesto(request: Request, db: Session = Depends(get_db)):
+    """Obtener categorías disponibles para presupuestos (en caché; responde 304 si el ETag no cambió)"""
+    catalogo = catalogo_categorias.obtener(db)
+    return responder_con_etag(request, catalogo.etag("egreso"), lambda: [
         {
             "id": c.id,
             "nombre": c.nombre,
             "tipo": c.tipo,
             "descripcion": c.descripcion
         }
-        for c in categorias
-    ]
+        for c in catalogo.de_tipo("egreso")
+    ])
 
 @router.get("/presupuestos/resumen")
 def obtener_resumen_presupuestos(
@@ -33,41 +35,50 @@ def obtener_resumen_presupuestos(
     db: Session = Depends(get_db), 
     usuario=Depends(obtener_usuario_actual)
 ):
-    """Obtener resumen de presupuestos del usuario"""
-    presupuestos = db.query(Presupuesto)\
-        .filter(Presupuesto.usuario_id == usuario.id)\
-        .all()
-    
-    total_presupuestado = sum(p.monto_total for p in presupuestos)
-    total_usado = 0  # Aquí podrías calcular el total usado de las transacciones
-    
+    """Obtener resumen de presupuestos del usuario (monto usado real, en una sola consulta)"""
+    evaluaciones = evaluar_presupuestos(db, usuario.id)
+
+    total_presupuestado = sum(e.monto_total for e in evaluaciones)
+    total_usado = sum(e.monto_usado for e in evaluaciones)
+    estados = [e.estado for e in evaluaciones]
+
     return {
         "periodo": periodo,
         "total_presupuestado": float(total_presupuestado),
         "total_usado": float(total_usado),
-        "porcentaje_usado": (total_usado / total_presupuestado * 100) if total_presupuestado > 0 else 0,
-        "cantidad_presupuestos": len(presupuestos)
+        "porcentaje_usado": float(total_usado / total_presupuestado * 100) if total_presupuestado > 0 else 0,
+        "cantidad_presupuestos": len(evaluaciones),
+        "presupuestos_normales": estados.count(NORMAL),
+        "presupuestos_proximos_exceder": estados.count(PROXIMO_EXCEDER),
+        "presupuestos_excedidos": estados.count(EXCEDIDO)
     }
 
 @router.get("/presupuestos/alertas")
-def obtener_alertas_presupuestos(db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
+def obtener_alertas_presupuestos(
+    umbral_alerta: float = Query(PRESUPUESTO_UMBRAL_ALERTA, ge=0, description="% usado desde el que se avisa"),
+    umbral_excedido: float = Query(PRESUPUESTO_UMBRAL_EXCEDIDO, ge=0, description="% usado por encima del cual está excedido"),
+    solo_alertas: bool = Query(False, description="Omitir los presupuestos en estado normal"),
+    db: Session = Depends(get_db),
+    usuario=Depends(obtener_usuario_actual)
+):
     """Obtener alertas de presupuestos (excedidos, próximos a exceder)"""
-    presupuestos = db.query(Presupuesto)\
-        .filter(Presupuesto.usuario_id == usuario.id)\
-        .all()
-    
-    alertas = []
-    for presupuesto in presupuestos:
-        # Aquí podrías calcular si está excedido o próximo a exceder
-        # Por ahora retornamos información básica
-        alertas.append({
-            "presupuesto_id": presupuesto.id,
-            "categoria": presupuesto.categoria.nombre if presupuesto.categoria else "Sin categoría",
-            "monto_total": float(presupuesto.monto_total),
-            "estado": "normal"  # normal, proximo_exceder, excedido
-        })
-    
-    return alertas
+    if umbral_alerta > umbral_excedido:
+        raise HTTPException(status_code=400, detail="umbral_alerta no puede ser mayor que umbral_excedido")
+
+    return [
+        {
+            "presupuesto_id": e.presupuesto_id,
+            "nombre": e.nombre,
+            "categoria": e.categoria,
+            "monto_total": float(e.monto_total),
+            "monto_usado": float(e.monto_usado),
+            "disponible": float(e.disponible),
+            "porcentaje_usado": round(e.porcentaje_usado, 2),
+            "estado": e.estado  # normal, proximo_exceder, excedido
+        }
+        for e in evaluar_presupuestos(db, usuario.id, umbral_alerta=umbral_alerta, umbral_excedido=umbral_excedido)
+        if not (solo_alertas and e.estado == NORMAL)
+    ]
 
 @router.get("/presupuestos", response_model=List[PresupuestoOut])
 def obtener_presupuestos(
@@ -85,6 +96,8 @@ def obtener_presupuestos(
 def crear_presupuesto(presupuesto: PresupuestoCreate, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
     nuevo_presupuesto = Presupuesto(**presupuesto.dict(), usuario_id=usuario.id)
     db.add(nuevo_presupuesto)
+    db.flush()
+    alertas_presupuesto.recalcular(db, nuevo_presupuesto.id)
     db.commit()
     db.refresh(nuevo_presupuesto)
     return nuevo_presupuesto
@@ -108,9 +121,14 @@ def actualizar_presupuesto(presupuesto_id: int, payload: PresupuestoUpdate, db:
     if not presupuesto:
         raise HTTPException(status_code=404, detail="Presupuesto no encontrado")
 
-    for key, value in payload.dict(exclude_unset=True).items():
+    cambios = payload.dict(exclude_unset=True)
+    for key, value in cambios.items():
         setattr(presupuesto, key, value)
 
+    # Otra categoría, rango o monto: recalcular lo usado y el nivel de alerta
+    if cambios.keys() & {"categoria_id", "fecha_inicio", "fecha_fin", "monto_total"}:
+        db.flush()
+        alertas_presupuesto.recalcular(db, presupuesto.id)
     db.commit()
     db.refresh(presupuesto)
     return presupuesto
@@ -124,6 +142,7 @@ def eliminar_presupuesto(presupuesto_id: int, db: Session = Depends(get_db), usu
     if not presupuesto:
         raise HTTPException(status_code=404, detail="Presupuesto no encontrado")
 
+    db.query(AlertaPresupuesto).filter(AlertaPresupuesto.presupuesto_id == presupuesto.id).delete(synchronize_session=False)
     db.delete(presupuesto)
     db.commit()
     return {"mensaje": "Presupuesto eliminado exitosamente"}
@@ -134,7 +153,7 @@ def create_presupuesto_old(presupuesto: PresupuestoCreate, db: Session = Depends
     """Endpoint de compatibilidad - usar /presupuestos en su lugar"""
     return crear_presupuesto(presupuesto, db, usuario)
 
-@router.get("/{presupuesto_id}", response_model=PresupuestoOut)
+@router.get("/{presupuesto_id:int}", response_model=PresupuestoOut)
 def get_presupuesto_old(presupuesto_id: int, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
     """Endpoint de compatibilidad - usar /presupuestos/{id} en su lugar"""
     return obtener_presupuesto(presupuesto_id, db, usuario)
\ No newline at end of file
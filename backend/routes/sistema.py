@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends
+
+import database
+from database import metricas_pool
+from utils.cache_categorias import catalogo_categorias
+from utils.cache_respuestas import cache_respuestas
+from utils.auth import obtener_administrador
+from utils.cache_usuarios import cache_usuarios
+from utils.eventos import bus_eventos
+from utils.hashing import pool_hashing
+from utils.notificaciones import contador_no_leidas
+from utils.procesador_pagos import programador_pagos
+
+# Métricas internas (pool, cachés, Redis, programador): sólo para administradores
+router = APIRouter(dependencies=[Depends(obtener_administrador)])
+
+@router.get("/sistema/pool")
+def obtener_metricas_pool():
+    """Métricas del pool de conexiones a la base de datos (checkouts, espera, overflow)"""
+    metricas = metricas_pool()
+    if database.async_engine is not None:
+        metricas["async"] = metricas_pool(database.async_engine.sync_engine)
+    return metricas
+
+
+@router.get("/sistema/cache-auth")
+def obtener_metricas_cache_auth():
+    """Aciertos, fallos y tamaño de la caché de tokens verificados"""
+    return cache_usuarios.estadisticas()
+
+
+@router.get("/sistema/hashing")
+def obtener_metricas_hashing():
+    """Profundidad de cola, rechazos (429) y duración del pool de hashing de contraseñas"""
+    return pool_hashing.estadisticas()
+
+
+@router.get("/sistema/cache-categorias")
+def obtener_metricas_cache_categorias():
+    """Versión, cargas y aciertos del catálogo de categorías en memoria"""
+    return catalogo_categorias.estadisticas()
+
+
+@router.get("/sistema/cache-respuestas")
+def obtener_metricas_cache_respuestas():
+    """Aciertos, fallos, respuestas 304 y tamaño de la caché de respuestas GET"""
+    return cache_respuestas.estadisticas()
+
+
+@router.get("/sistema/contador-notificaciones")
+def obtener_metricas_contador_notificaciones():
+    """Aciertos y fallos de la caché del contador de notificaciones no leídas"""
+    return contador_no_leidas.estadisticas()
+
+
+@router.get("/sistema/programador-pagos")
+def obtener_metricas_programador_pagos():
+    """Estado del procesador programado de pagos fijos y resultado de su última ejecución"""
+    return programador_pagos.estadisticas()
+
+
+@router.get("/sistema/eventos")
+def obtener_metricas_eventos():
+    """Conexiones abiertas y eventos publicados/entregados por el bus de eventos en vivo"""
+    return bus_eventos.estadisticas()
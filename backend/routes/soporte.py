@@ -4,20 +4,13 @@ from typing import List
 from sqlalchemy import func
 from datetime import datetime
 
-from database import SessionLocal
+from database import get_db
 from models.BD import Soporte
 from utils.auth import obtener_usuario_actual
 from schemas.soporte import MensajeSoporte, SoporteOut
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/soporte/tickets")
 def crear_ticket(payload: MensajeSoporte, db: Session = Depends(get_db), usuario=Depends(obtener_usuario_actual)):
     """Crear un nuevo ticket de soporte"""
@@ -48,7 +41,7 @@ def obtener_tickets(
     # Calcular offset para paginación
     offset = (pagina - 1) * limite
     
-    tickets = query.order_by(Soporte.fecha_creacion.desc())\
+    tickets = query.order_by(Soporte.fecha_envio.desc(), Soporte.id.desc())\
         .offset(offset).limit(limite).all()
     
     return [
@@ -58,7 +51,7 @@ def obtener_tickets(
             "mensaje": t.mensaje,
             "estado": t.estado,
             "prioridad": t.prioridad,
-            "fecha_creacion": t.fecha_creacion.isoformat() if t.fecha_creacion else None,
+            "fecha_creacion": t.fecha_envio.isoformat() if t.fecha_envio else None,
             "fecha_resolucion": t.fecha_resolucion.isoformat() if t.fecha_resolucion else None
         }
         for t in tickets
@@ -78,7 +71,7 @@ def obtener_ticket(ticket_id: int, db: Session = Depends(get_db), usuario=Depend
         "mensaje": ticket.mensaje,
         "estado": ticket.estado,
         "prioridad": ticket.prioridad,
-        "fecha_creacion": ticket.fecha_creacion.isoformat() if ticket.fecha_creacion else None,
+        "fecha_creacion": ticket.fecha_envio.isoformat() if ticket.fecha_envio else None,
         "fecha_resolucion": ticket.fecha_resolucion.isoformat() if ticket.fecha_resolucion else None
     }
 
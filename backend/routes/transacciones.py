@@ -1,34 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy import func
+from typing import List, Optional
+from datetime import date
+from sqlalchemy import func, select
 
 from models.BD import Transaccion, Presupuesto, Categoria
-from schemas.transacciones import TransaccionCreate, TransaccionOut, TransaccionUpdate
-from database import SessionLocal
+from schemas.transacciones import TransaccionCreate, TransaccionOut, TransaccionUpdate, ResultadoImportacion
+from database import SessionLocal, get_db
 from utils.auth import obtener_usuario_actual
+from utils.asincrono import bloqueante, bloqueante_con_redis
+from utils.cache_categorias import catalogo_categorias
+from utils.etag import responder_con_etag
+from utils import alertas_presupuesto, resumen_mensual
+from utils.paginacion import paginar, HEADER_SIGUIENTE_CURSOR
+from utils.importacion import insertar_lotes, leer_csv, leer_ofx, validar_filas
+from utils.exportacion import TIPOS_CONTENIDO, XLSX_DISPONIBLE, csv_en_trozos, xlsx_en_trozos
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+LIMITE_PAGINA = 100
+LIMITE_PAGINA_MAXIMO = 500
+TAMANO_LOTE_STREAM = 500
+LIMITE_IMPORTACION = 10000
 
 @router.get("/transacciones/categorias")
-def obtener_categorias(db: Session = Depends(get_db)):
-    """Obtener todas las categorías disponibles"""
-    categorias = db.query(Categoria).all()
-    return [
+def obtener_categorias(request: Request, db: Session = Depends(get_db)):
+    """Obtener todas las categorías disponibles (en caché; responde 304 si el ETag no cambió)"""
+    catalogo = catalogo_categorias.obtener(db)
+    return responder_con_etag(request, catalogo.etag("todas"), lambda: [
         {
             "id": c.id,
             "nombre": c.nombre,
             "tipo": c.tipo
         }
-        for c in categorias
-    ]
+        for c in catalogo.categorias
+    ])
 
 @router.get("/transacciones/tipos")
 def obtener_tipos_transaccion():
@@ -38,20 +45,16 @@ def obtener_tipos_transaccion():
         {"id": "egreso", "nombre": "Egreso", "descripcion": "Dinero que sale"}
     ]
 
-@router.get("/transacciones", response_model=List[TransaccionOut])
-def obtener_transacciones(
-    fecha_inicio: str = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
-    fecha_fin: str = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
-    tipo: str = Query(None, description="Tipo de transacción (ingreso/egreso)"),
-    categoria: int = Query(None, description="ID de la categoría"),
-    monto_min: float = Query(None, description="Monto mínimo"),
-    monto_max: float = Query(None, description="Monto máximo"),
-    db: Session = Depends(get_db), 
-    usuario = Depends(obtener_usuario_actual)
+def filtrar_transacciones(
+    query,
+    fecha_inicio: str = None,
+    fecha_fin: str = None,
+    tipo: str = None,
+    categoria: int = None,
+    monto_min: float = None,
+    monto_max: float = None
 ):
-    """Obtener transacciones con filtros opcionales"""
-    query = db.query(Transaccion).filter(Transaccion.usuario_id == usuario.id)
-    
+    """Aplicar los filtros opcionales de listado a una consulta de transacciones"""
     if fecha_inicio:
         query = query.filter(Transaccion.fecha >= fecha_inicio)
     if fecha_fin:
@@ -64,10 +67,117 @@ def obtener_transacciones(
         query = query.filter(Transaccion.monto >= monto_min)
     if monto_max is not None:
         query = query.filter(Transaccion.monto <= monto_max)
-    
-    return query.order_by(Transaccion.fecha.desc()).all()
+    return query
+
+def _stream_ndjson(usuario_id: int, filtros: dict):
+    """Generar todas las transacciones como NDJSON leyendo por lotes desde un cursor del servidor"""
+    # Sesión propia: la del request puede cerrarse antes de terminar el streaming
+    with SessionLocal() as db:
+        consulta = filtrar_transacciones(select(Transaccion).where(Transaccion.usuario_id == usuario_id), **filtros)
+        consulta = consulta.order_by(Transaccion.fecha.desc(), Transaccion.id.desc())\
+            .execution_options(yield_per=TAMANO_LOTE_STREAM)
+        for transaccion in db.scalars(consulta):
+            yield TransaccionOut.model_validate(transaccion).model_dump_json() + "\n"
+
+def _pagina(response: Response, query, limite: Optional[int], cursor: Optional[str]):
+    """Todas las transacciones de `query`, o una página si se pidió `limite` o `cursor`"""
+    if limite is None and not cursor:
+        return query.order_by(Transaccion.fecha.desc(), Transaccion.id.desc()).all()
+    transacciones, siguiente = paginar(query, [Transaccion.fecha, Transaccion.id], limite or LIMITE_PAGINA, cursor)
+    if siguiente:
+        response.headers[HEADER_SIGUIENTE_CURSOR] = siguiente
+    return transacciones
+
+@router.get("/transacciones", response_model=List[TransaccionOut])
+def obtener_transacciones(
+    response: Response,
+    fecha_inicio: str = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: str = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    tipo: str = Query(None, description="Tipo de transacción (ingreso/egreso)"),
+    categoria: int = Query(None, description="ID de la categoría"),
+    monto_min: float = Query(None, description="Monto mínimo"),
+    monto_max: float = Query(None, description="Monto máximo"),
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_PAGINA_MAXIMO, description=f"Transacciones por página (con cursor, {LIMITE_PAGINA} por defecto)"),
+    cursor: str = Query(None, description="Cursor devuelto en el header X-Siguiente-Cursor"),
+    formato: str = Query("json", pattern="^(json|ndjson)$", description="json o ndjson (todo, en streaming)"),
+    db: Session = Depends(get_db), 
+    usuario = Depends(obtener_usuario_actual)
+):
+    """
+    Obtener transacciones con filtros opcionales.
+
+    Con `limite` o `cursor` se paginan por (fecha, id) y el header
+    X-Siguiente-Cursor trae la página siguiente; sin ninguno de los dos se
+    devuelven todas, como esperan los clientes anteriores a la paginación.
+    """
+    filtros = {
+        "fecha_inicio": fecha_inicio,
+        "fecha_fin": fecha_fin,
+        "tipo": tipo,
+        "categoria": categoria,
+        "monto_min": monto_min,
+        "monto_max": monto_max,
+    }
+
+    if formato == "ndjson":
+        return StreamingResponse(_stream_ndjson(usuario.id, filtros), media_type="application/x-ndjson")
+
+    query = filtrar_transacciones(db.query(Transaccion).filter(Transaccion.usuario_id == usuario.id), **filtros)
+    return _pagina(response, query, limite, cursor)
+
+def _filas_exportacion(usuario_id: int, filtros: dict):
+    """Tuplas (id, fecha, tipo, categoria, monto, descripcion, presupuesto_id) en orden cronológico"""
+    with SessionLocal() as db:
+        consulta = select(
+            Transaccion.id,
+            Transaccion.fecha,
+            Transaccion.tipo,
+            Categoria.nombre,
+            Transaccion.monto,
+            Transaccion.descripcion,
+            Transaccion.presupuesto_id,
+        ).join(Categoria, Categoria.id == Transaccion.categoria_id)\
+         .where(Transaccion.usuario_id == usuario_id)
+        consulta = filtrar_transacciones(consulta, **filtros)
+        consulta = consulta.order_by(Transaccion.fecha, Transaccion.id)\
+            .execution_options(yield_per=TAMANO_LOTE_STREAM)
+        for fila in db.execute(consulta):
+            yield tuple(fila)
+
+@router.get("/transacciones/export")
+def exportar_transacciones(
+    fecha_inicio: str = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: str = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    tipo: str = Query(None, description="Tipo de transacción (ingreso/egreso)"),
+    categoria: int = Query(None, description="ID de la categoría"),
+    monto_min: float = Query(None, description="Monto mínimo"),
+    monto_max: float = Query(None, description="Monto máximo"),
+    formato: str = Query("csv", pattern="^(csv|xlsx)$", description="csv o xlsx (requiere openpyxl)"),
+    usuario = Depends(obtener_usuario_actual)
+):
+    """Exportar el historial completo (con los mismos filtros del listado) en streaming"""
+    if formato == "xlsx" and not XLSX_DISPONIBLE:
+        raise HTTPException(status_code=501, detail="Exportación XLSX no disponible: instale openpyxl")
+
+    filtros = {
+        "fecha_inicio": fecha_inicio,
+        "fecha_fin": fecha_fin,
+        "tipo": tipo,
+        "categoria": categoria,
+        "monto_min": monto_min,
+        "monto_max": monto_max,
+    }
+    filas = _filas_exportacion(usuario.id, filtros)
+    contenido = xlsx_en_trozos(filas) if formato == "xlsx" else csv_en_trozos(filas)
+    nombre = f"transacciones_{date.today():%Y%m%d}.{formato}"
+    return StreamingResponse(
+        contenido,
+        media_type=TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
 
 @router.post("/transacciones", response_model=TransaccionOut)
+@bloqueante_con_redis
 def crear_transaccion(data: TransaccionCreate, db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
     # Validar que el usuario del payload coincida con el autenticado
     if data.usuario_id != usuario.id:
@@ -84,7 +194,7 @@ def crear_transaccion(data: TransaccionCreate, db: Session = Depends(get_db), us
             raise HTTPException(status_code=400, detail="Presupuesto no válido para este usuario")
 
     # Validar categoría
-    categoria = db.query(Categoria).filter(Categoria.id == data.categoria_id).first()
+    categoria = catalogo_categorias.por_id(db, data.categoria_id)
     if not categoria:
         raise HTTPException(status_code=400, detail="Categoría no encontrada")
 
@@ -98,10 +208,63 @@ def crear_transaccion(data: TransaccionCreate, db: Session = Depends(get_db), us
 
     nueva = Transaccion(**data.dict())
     db.add(nueva)
+    resumen_mensual.registrar_alta(db, nueva)
+    alertas_presupuesto.registrar_alta(db, nueva)
     db.commit()
     db.refresh(nueva)
     return nueva
 
+def _importar(db: Session, usuario_id: int, filas: list, categoria_ingreso_id: Optional[int],
+              categoria_egreso_id: Optional[int], todo_o_nada: bool) -> ResultadoImportacion:
+    if len(filas) > LIMITE_IMPORTACION:
+        raise HTTPException(status_code=413, detail=f"Máximo {LIMITE_IMPORTACION} transacciones por importación")
+
+    validas, errores = validar_filas(db, usuario_id, filas, categoria_ingreso_id, categoria_egreso_id)
+    insertadas = 0
+    if validas and not (todo_o_nada and errores):
+        insertadas, errores_lotes = insertar_lotes(db, validas)
+        errores += errores_lotes
+
+    return ResultadoImportacion(
+        total=len(filas),
+        insertadas=insertadas,
+        errores=sorted(errores, key=lambda e: e["fila"])
+    )
+
+@router.post("/transacciones/bulk", response_model=ResultadoImportacion)
+@bloqueante
+def importar_transacciones(
+    filas: List[dict] = Body(..., description="Transacciones a importar (ver TransaccionImportar)"),
+    categoria_ingreso_id: Optional[int] = Query(None, description="Categoría para ingresos sin categoría"),
+    categoria_egreso_id: Optional[int] = Query(None, description="Categoría para egresos sin categoría"),
+    todo_o_nada: bool = Query(False, description="No insertar nada si alguna fila es inválida"),
+    db: Session = Depends(get_db),
+    usuario = Depends(obtener_usuario_actual)
+):
+    """Importar muchas transacciones en una sola petición; los errores se reportan por fila"""
+    return _importar(db, usuario.id, filas, categoria_ingreso_id, categoria_egreso_id, todo_o_nada)
+
+@router.post("/transacciones/bulk/archivo", response_model=ResultadoImportacion)
+@bloqueante
+def importar_archivo_transacciones(
+    archivo: UploadFile = File(..., description="Exportación bancaria en CSV u OFX"),
+    formato: Optional[str] = Query(None, pattern="^(csv|ofx)$", description="Por defecto se deduce de la extensión"),
+    categoria_ingreso_id: Optional[int] = Query(None, description="Categoría para ingresos sin categoría"),
+    categoria_egreso_id: Optional[int] = Query(None, description="Categoría para egresos sin categoría"),
+    todo_o_nada: bool = Query(False, description="No insertar nada si alguna fila es inválida"),
+    db: Session = Depends(get_db),
+    usuario = Depends(obtener_usuario_actual)
+):
+    """Importar transacciones desde un archivo CSV u OFX"""
+    nombre = (archivo.filename or "").lower()
+    formato = formato or ("ofx" if nombre.endswith((".ofx", ".qfx")) else "csv")
+    contenido = archivo.file.read()
+    try:
+        filas = leer_ofx(contenido) if formato == "ofx" else leer_csv(contenido)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo debe estar codificado en UTF-8")
+    return _importar(db, usuario.id, filas, categoria_ingreso_id, categoria_egreso_id, todo_o_nada)
+
 @router.get("/transacciones/{id}", response_model=TransaccionOut)
 def detalle_transaccion(id: int, db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
     transaccion = db.query(Transaccion).filter(Transaccion.id == id, Transaccion.usuario_id == usuario.id).first()
@@ -110,6 +273,7 @@ def detalle_transaccion(id: int, db: Session = Depends(get_db), usuario = Depend
     return transaccion
 
 @router.put("/transacciones/{id}", response_model=TransaccionOut)
+@bloqueante_con_redis
 def editar_transaccion(id: int, data: TransaccionUpdate, db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
     transaccion = db.query(Transaccion).filter(
         Transaccion.id == id,
@@ -131,7 +295,7 @@ def editar_transaccion(id: int, data: TransaccionUpdate, db: Session = Depends(g
 
     # Validar categoría si se cambia
     if 'categoria_id' in cambios:
-        categoria = db.query(Categoria).filter(Categoria.id == cambios['categoria_id']).first()
+        categoria = catalogo_categorias.por_id(db, cambios['categoria_id'])
         if not categoria:
             raise HTTPException(status_code=400, detail="Categoría no encontrada")
         tipo_nuevo = cambios.get('tipo', transaccion.tipo)
@@ -145,25 +309,38 @@ def editar_transaccion(id: int, data: TransaccionUpdate, db: Session = Depends(g
         if cambios['monto'] > 999999999.99:
             raise HTTPException(status_code=400, detail="El monto no puede ser mayor a $999,999,999.99")
 
+    anteriores = resumen_mensual.valores_resumen(transaccion)
     for campo, valor in cambios.items():
         setattr(transaccion, campo, valor)
+    resumen_mensual.registrar_edicion(db, anteriores, transaccion)
+    alertas_presupuesto.registrar_edicion(db, anteriores, transaccion)
 
     db.commit()
     db.refresh(transaccion)
     return transaccion
 
 @router.delete("/transacciones/{id}")
+@bloqueante_con_redis
 def eliminar_transaccion(id: int, db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
     transaccion = db.query(Transaccion).filter(Transaccion.id == id, Transaccion.usuario_id == usuario.id).first()
     if not transaccion:
         raise HTTPException(status_code=404, detail="Transacción no encontrada")
 
+    resumen_mensual.registrar_baja(db, transaccion)
+    alertas_presupuesto.registrar_baja(db, transaccion)
     db.delete(transaccion)
     db.commit()
     return {"mensaje": "Transacción eliminada correctamente"}
 
 # Mantener compatibilidad con la ruta anterior
 @router.get("/transactions", response_model=List[TransaccionOut])
-def obtener_transacciones_old(db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
+def obtener_transacciones_old(
+    response: Response,
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    cursor: str = Query(None),
+    db: Session = Depends(get_db),
+    usuario = Depends(obtener_usuario_actual)
+):
     """Endpoint de compatibilidad - usar /transacciones en su lugar"""
-    return obtener_transacciones(db=db, usuario=usuario)
\ No newline at end of file
+    query = db.query(Transaccion).filter(Transaccion.usuario_id == usuario.id)
+    return _pagina(response, query, limite, cursor)
\ No newline at end of file
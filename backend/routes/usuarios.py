@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 from models.BD import Usuario, Sesion, Recuperacion
-from passlib.hash import bcrypt
 from schemas.usuarios import UsuarioCreate, UsuarioOut, UsuarioUpdate, UsuarioLogin
 from utils.jwt import crear_token, verificar_token
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from utils.auth import obtener_usuario_actual, get_token_actual
+from utils.cache_usuarios import cache_usuarios
+from utils.hashing import pool_hashing
 from utils.email_service import email_service
 from datetime import datetime, timedelta
 import secrets
@@ -15,12 +16,8 @@ router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_db():
-    with SessionLocal() as db:
-        yield db
-
 @router.post("/auth/register")
-def registrar_usuario(user: UsuarioCreate, db: Session = Depends(get_db)):
+async def registrar_usuario(user: UsuarioCreate, db: Session = Depends(get_db)):
     existente = db.query(Usuario).filter(Usuario.correo == user.correo).first()
     if existente:
         raise HTTPException(status_code=400, detail="Correo ya registrado")
@@ -28,7 +25,7 @@ def registrar_usuario(user: UsuarioCreate, db: Session = Depends(get_db)):
     nuevo_usuario = Usuario(
         nombre=user.nombre,
         correo=user.correo,
-        contrasena=bcrypt.hash(user.contrasena),
+        contrasena=await pool_hashing.hashear_async(user.contrasena),
         rol=user.rol or "usuario"
     )
     db.add(nuevo_usuario)
@@ -46,10 +43,10 @@ def registrar_usuario(user: UsuarioCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/auth/login")
-def login(user_data: UsuarioLogin, db: Session = Depends(get_db)):
+async def login(user_data: UsuarioLogin, db: Session = Depends(get_db)):
     usuario = db.query(Usuario).filter(Usuario.correo == user_data.correo).first()
     
-    if not usuario or not bcrypt.verify(user_data.contrasena, usuario.contrasena):
+    if not usuario or not await pool_hashing.verificar_async(user_data.contrasena, usuario.contrasena):
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
     token = crear_token({"sub": str(usuario.id)})
@@ -93,7 +90,7 @@ def forgot_password(correo: str, db: Session = Depends(get_db)):
     return {"mensaje": "Token generado", "token": token}
 
 @router.post("/auth/reset-password")
-def reset_password(token: str, nueva_contrasena: str, db: Session = Depends(get_db)):
+async def reset_password(token: str, nueva_contrasena: str, db: Session = Depends(get_db)):
     rec = db.query(Recuperacion).filter(Recuperacion.token == token, Recuperacion.usado == False).first()
 
     if not rec or rec.expiracion < datetime.utcnow():
@@ -103,9 +100,10 @@ def reset_password(token: str, nueva_contrasena: str, db: Session = Depends(get_
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    usuario.contrasena = bcrypt.hash(nueva_contrasena)  # Aquí hasheamos la nueva contraseña
+    usuario.contrasena = await pool_hashing.hashear_async(nueva_contrasena)  # Aquí hasheamos la nueva contraseña
     rec.usado = True
     db.commit()
+    cache_usuarios.invalidar_usuario(usuario.id)
 
     return {"mensaje": "Contraseña actualizada correctamente"}
 
@@ -114,22 +112,24 @@ def get_perfil(usuario = Depends(obtener_usuario_actual)):
     return usuario
 
 @router.put("/users/me", response_model=UsuarioOut)
-def actualizar_perfil(payload: UsuarioUpdate, db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
+async def actualizar_perfil(payload: UsuarioUpdate, db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
     if payload.correo:
         # Verificar que el nuevo correo no esté en uso
         existente = db.query(Usuario).filter(Usuario.correo == payload.correo, Usuario.id != usuario.id).first()
         if existente:
             raise HTTPException(status_code=400, detail="Correo ya en uso")
 
+    fila = db.get(Usuario, usuario.id)
     for key, value in payload.dict(exclude_unset=True).items():
         if key == "contrasena":
-            setattr(usuario, key, bcrypt.hash(value))
+            setattr(fila, key, await pool_hashing.hashear_async(value))
         else:
-            setattr(usuario, key, value)
+            setattr(fila, key, value)
 
     db.commit()
-    db.refresh(usuario)
-    return usuario
+    db.refresh(fila)
+    cache_usuarios.invalidar_usuario(fila.id)
+    return fila
 
 @router.get("/usuarios/perfil")
 def obtener_perfil_usuario(usuario = Depends(obtener_usuario_actual)):
@@ -183,6 +183,7 @@ def actualizar_perfil_usuario(payload: dict, db: Session = Depends(get_db), toke
         print("💾 Guardando cambios en la base de datos...")
         db.commit()
         db.refresh(usuario)
+        cache_usuarios.invalidar_usuario(usuario.id)
         
         print("✅ Perfil actualizado exitosamente")
         return {"mensaje": "Perfil actualizado exitosamente"}
@@ -205,22 +206,24 @@ async def cambiar_contrasena(payload: dict, db: Session = Depends(get_db), usuar
             raise HTTPException(status_code=400, detail="Se requieren ambas contraseñas")
         
         # Verificar contraseña actual
-        if not bcrypt.verify(contrasena_actual, usuario.contrasena):
+        fila = db.get(Usuario, usuario.id)
+        if not await pool_hashing.verificar_async(contrasena_actual, fila.contrasena):
             raise HTTPException(status_code=400, detail="Contraseña actual incorrecta")
         
         # Actualizar contraseña
-        usuario.contrasena = bcrypt.hash(nueva_contrasena)
+        fila.contrasena = await pool_hashing.hashear_async(nueva_contrasena)
         db.commit()
+        cache_usuarios.invalidar_usuario(usuario.id)
         
-        # Enviar correo de notificación
+        # Encolar correo de notificación (se envía en segundo plano)
         try:
             fecha_cambio = datetime.now()
-            await email_service.enviar_correo_cambio_contrasena(
+            email_service.enviar_correo_cambio_contrasena(
                 email=usuario.correo,
                 nombre_usuario=usuario.nombre,
                 fecha_cambio=fecha_cambio
             )
-            print(f"📧 Correo de cambio de contraseña enviado a {usuario.correo}")
+            print(f"📧 Correo de cambio de contraseña encolado para {usuario.correo}")
         except Exception as e:
             print(f"⚠️ Error enviando correo de cambio de contraseña: {str(e)}")
             # No fallar la operación si el correo no se puede enviar
@@ -234,15 +237,17 @@ async def cambiar_contrasena(payload: dict, db: Session = Depends(get_db), usuar
         raise HTTPException(status_code=500, detail="Error interno del servidor al cambiar la contraseña")
 
 @router.delete("/usuarios/cuenta")
-def eliminar_cuenta(contrasena: str, db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
+async def eliminar_cuenta(contrasena: str, db: Session = Depends(get_db), usuario = Depends(obtener_usuario_actual)):
     """Eliminar cuenta del usuario"""
     # Verificar contraseña
-    if not bcrypt.verify(contrasena, usuario.contrasena):
+    fila = db.get(Usuario, usuario.id)
+    if not await pool_hashing.verificar_async(contrasena, fila.contrasena):
         raise HTTPException(status_code=400, detail="Contraseña incorrecta")
     
     # Eliminar usuario
-    db.delete(usuario)
+    db.delete(fila)
     db.commit()
+    cache_usuarios.invalidar_usuario(usuario.id)
     
     return {"mensaje": "Cuenta eliminada exitosamente"}
 
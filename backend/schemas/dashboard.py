@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Optional
 from pydantic import BaseModel, Field
 from datetime import date
 from decimal import Decimal
@@ -9,6 +9,7 @@ class PagoFijoResumen(BaseModel):
     nombre: str
     monto: Annotated[Decimal, Field(max_digits=10, decimal_places=2)]
     fecha_inicio: date
+    proxima_fecha: Optional[date] = None
     frecuencia: str
     estado: str
 
@@ -1,4 +1,4 @@
-from typing import Annotated, Optional
+from typing import Annotated, List, Literal, Optional
 from pydantic import BaseModel, StringConstraints
 from datetime import datetime
 
@@ -11,6 +11,19 @@ class NotificacionBase(BaseModel):
 class NotificacionCreate(NotificacionBase):
     pass
 
+class NotificacionDifusion(BaseModel):
+    """Aviso para varios usuarios (usuario_ids) o para todos (todos=True)"""
+    mensaje: Annotated[str, StringConstraints(min_length=1)]
+    usuario_ids: Optional[List[int]] = None
+    todos: bool = False
+    # Omitir a quienes tengan desactivada esta preferencia de ConfiguracionNotificacion
+    preferencia: Optional[Literal["email", "sms", "recordatorios"]] = None
+
+class NotificacionDifusionOut(BaseModel):
+    creadas: int
+    # ids de usuario_ids que no existen (no se les creó nada)
+    usuarios_desconocidos: List[int] = []
+
 class NotificacionUpdate(BaseModel):
     mensaje: Optional[Annotated[str, StringConstraints(min_length=1)]] = None
     leido: Optional[bool] = None
@@ -22,6 +35,16 @@ class NotificacionOut(NotificacionBase):
     class Config:
         from_attributes = True
 
+class NotificacionArchivadaOut(BaseModel):
+    id: int
+    usuario_id: int
+    mensaje: str
+    fecha_creacion: datetime
+    fecha_archivo: datetime
+
+    class Config:
+        from_attributes = True
+
 # ---- CONFIGURACIÓN DE NOTIFICACIONES ----
 class ConfiguracionNotificacionBase(BaseModel):
     usuario_id: int
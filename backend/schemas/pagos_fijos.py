@@ -11,10 +11,15 @@ class EstadoPago(str, Enum):
     completado = "Completado"
 
 class FrecuenciaPago(str, Enum):
-    diario = "Diario"
-    semanal = "Semanal"
-    mensual = "Mensual"
-    anual = "Anual"
+    # Mismos valores que la columna pagos_fijos.frecuencia y /pagos-fijos/frecuencias
+    diario = "diario"
+    semanal = "semanal"
+    quincenal = "quincenal"
+    mensual = "mensual"
+    bimestral = "bimestral"
+    trimestral = "trimestral"
+    semestral = "semestral"
+    anual = "anual"
 
 # Modelo base
 class PagoFijoBase(BaseModel):
@@ -33,13 +38,7 @@ class PagoFijoBase(BaseModel):
     def _norm_freq(cls, v):
         if isinstance(v, str):
             v_low = v.strip().lower()
-            mapa = {
-                "diario": FrecuenciaPago.diario,
-                "semanal": FrecuenciaPago.semanal,
-                "mensual": FrecuenciaPago.mensual,
-                "anual": FrecuenciaPago.anual,
-            }
-            return mapa.get(v_low, v)  # si no coincide, que valide normal y falle
+            return v_low  # si no coincide, que valide normal y falle
         return v
 
     @field_validator("estado", mode="before")
@@ -75,13 +74,7 @@ class PagoFijoUpdate(BaseModel):
     def _norm_freq(cls, v):
         if isinstance(v, str):
             v_low = v.strip().lower()
-            mapa = {
-                "diario": FrecuenciaPago.diario,
-                "semanal": FrecuenciaPago.semanal,
-                "mensual": FrecuenciaPago.mensual,
-                "anual": FrecuenciaPago.anual,
-            }
-            return mapa.get(v_low, v)
+            return v_low
         return v
 
     @field_validator("estado", mode="before")
@@ -99,6 +92,7 @@ class PagoFijoUpdate(BaseModel):
 # Respuesta
 class PagoFijoOut(PagoFijoBase):
     id: int
+    proxima_fecha: Optional[date] = None
 
     # 👇 Pydantic v2
     model_config = {"from_attributes": True}
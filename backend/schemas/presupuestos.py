@@ -27,6 +27,8 @@ class PresupuestoUpdate(BaseModel):
 class PresupuestoOut(PresupuestoBase):
     id: int
     usuario_id: int
+    monto_usado: Optional[Decimal] = None
+    nivel_alerta: Optional[str] = None
 
     class Config:
         orm_mode = True  # (en Pydantic v2 también puedes usar: model_config = {"from_attributes": True})
@@ -37,10 +39,15 @@ class EstadoPago(str, Enum):
     completado = "Completado"
 
 class FrecuenciaPago(str, Enum):
-    diario = "Diario"
-    semanal = "Semanal"
-    mensual = "Mensual"
-    anual = "Anual"
+    # Mismos valores que la columna pagos_fijos.frecuencia y /pagos-fijos/frecuencias
+    diario = "diario"
+    semanal = "semanal"
+    quincenal = "quincenal"
+    mensual = "mensual"
+    bimestral = "bimestral"
+    trimestral = "trimestral"
+    semestral = "semestral"
+    anual = "anual"
 
 class PagoFijoBase(BaseModel):
     nombre: Annotated[str, StringConstraints(min_length=1, max_length=100)]
@@ -66,6 +73,7 @@ class PagoFijoUpdate(BaseModel):
 
 class PagoFijoOut(PagoFijoBase):
     id: int
+    proxima_fecha: Optional[date] = None
 
     class Config:
         orm_mode = True
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class TipoTransaccion(str, Enum):
@@ -35,4 +35,22 @@ class TransaccionOut(BaseModel):
     fecha: date
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+# Importación masiva: el usuario sale del token; la categoría puede darse por id o por nombre
+class TransaccionImportar(BaseModel):
+    fecha: date
+    monto: float
+    categoria_id: Optional[int] = None
+    categoria: Optional[str] = None
+    tipo: Optional[TipoTransaccion] = None
+    presupuesto_id: Optional[int] = None
+    descripcion: Optional[str] = None
+
+class ErrorImportacion(BaseModel):
+    fila: int
+    error: str
+
+class ResultadoImportacion(BaseModel):
+    total: int
+    insertadas: int
+    errores: List[ErrorImportacion]
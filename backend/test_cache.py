@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Prueba de los backends de utils/cache.py: LRU en memoria y Redis contra un
+servidor falso que habla el protocolo RESP (no necesita Redis instalado,
+sólo el paquete `redis`).
+
+Uso: python test_cache.py   (o con pytest)
+"""
+
+import fnmatch
+import socketserver
+import threading
+import time
+
+from utils.cache import CacheMemoria, CacheRedis, redis
+from utils.version_datos import VersionesDatos, etiqueta_usuario
+
+try:
+    import pytest
+    requiere_redis = pytest.mark.skipif(redis is None, reason="paquete 'redis' no instalado")
+except ImportError:
+    # Ejecutado con python: el bloque __main__ ya omite estas pruebas sin `redis`
+    def requiere_redis(prueba):
+        return prueba
+
+class ServidorRESP(socketserver.ThreadingTCPServer):
+    """Subconjunto de comandos de Redis suficiente para CacheRedis y el bus de eventos"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ManejadorRESP)
+        self.datos = {}   # clave -> valor (bytes o set)
+        self.expira = {}  # clave -> time.monotonic()
+        self.canales = {}  # canal -> {ManejadorRESP suscrito}
+        self.lock = threading.Lock()
+
+    def vigente(self, clave):
+        if clave in self.expira and self.expira[clave] <= time.monotonic():
+            self.datos.pop(clave, None)
+            self.expira.pop(clave, None)
+        return clave in self.datos
+
+class ManejadorRESP(socketserver.StreamRequestHandler):
+    def leer_comando(self):
+        linea = self.rfile.readline()
+        if not linea:
+            return None
+        partes = []
+        for _ in range(int(linea[1:])):
+            largo = int(self.rfile.readline()[1:])
+            partes.append(self.rfile.read(largo + 2)[:-2])
+        return partes
+
+    def responder(self, valor):
+        if valor is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(valor, Exception):
+            self.wfile.write(f"-ERR {valor}\r\n".encode())
+        elif valor == "OK":
+            self.wfile.write(b"+OK\r\n")
+        elif isinstance(valor, int):
+            self.wfile.write(f":{valor}\r\n".encode())
+        elif isinstance(valor, bytes):
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(valor), valor))
+        else:
+            self.wfile.write(b"*%d\r\n" % len(valor))
+            for elemento in valor:
+                self.responder(elemento)
+
+    def handle(self):
+        while True:
+            comando = self.leer_comando()
+            if comando is None:
+                return
+            with self.server.lock:
+                self.responder(self.ejecutar(comando[0].upper().decode(), comando[1:]))
+            self.wfile.flush()
+
+    def ejecutar(self, nombre, args):
+        s = self.server
+        opciones = [a.upper() for a in args]
+        if nombre in ("PING",):
+            return "OK"
+        if nombre == "SELECT":
+            return "OK"
+        if nombre == "GET":
+            return s.datos[args[0]] if s.vigente(args[0]) else None
+        if nombre == "SET":
+            s.datos[args[0]] = args[1]
+            s.expira.pop(args[0], None)
+            if b"PX" in opciones:
+                s.expira[args[0]] = time.monotonic() + int(args[opciones.index(b"PX") + 1]) / 1000
+            return "OK"
+        if nombre == "DEL":
+            return sum(1 for clave in args if s.vigente(clave) and s.datos.pop(clave, None) is not None)
+        if nombre == "INCRBY":
+            valor = int(s.datos[args[0]]) if s.vigente(args[0]) else 0
+            s.datos[args[0]] = str(valor + int(args[1])).encode()
+            return valor + int(args[1])
+        if nombre == "SADD":
+            conjunto = s.datos[args[0]] if s.vigente(args[0]) else set()
+            nuevos = len(set(args[1:]) - conjunto)
+            s.datos[args[0]] = conjunto | set(args[1:])
+            return nuevos
+        if nombre == "SMEMBERS":
+            return sorted(s.datos[args[0]]) if s.vigente(args[0]) else []
+        if nombre == "PEXPIRE":
+            if len(args) != 2:
+                # Como Redis 6: PEXPIRE no acepta NX/XX/GT/LT
+                return Exception("wrong number of arguments for 'pexpire' command")
+            if not s.vigente(args[0]):
+                return 0
+            s.expira[args[0]] = time.monotonic() + int(args[1]) / 1000
+            return 1
+        if nombre == "PERSIST":
+            return 1 if s.expira.pop(args[0], None) is not None else 0
+        if nombre == "SUBSCRIBE":
+            s.canales.setdefault(args[0], set()).add(self)
+            return [b"subscribe", args[0], 1]
+        if nombre == "UNSUBSCRIBE":
+            for suscritos in s.canales.values():
+                suscritos.discard(self)
+            return [b"unsubscribe", args[0] if args else None, 0]
+        if nombre == "PUBLISH":
+            suscritos = list(s.canales.get(args[0], ()))
+            for manejador in suscritos:
+                manejador.responder([b"message", args[0], args[1]])
+                manejador.wfile.flush()
+            return len(suscritos)
+        if nombre == "SCAN":
+            patron = args[opciones.index(b"MATCH") + 1].decode() if b"MATCH" in opciones else "*"
+            claves = [c for c in list(s.datos) if s.vigente(c) and fnmatch.fnmatchcase(c.decode(), patron)]
+            return [b"0", claves]
+        return Exception(f"unknown command '{nombre}'")
+
+def iniciar_servidor():
+    servidor = ServidorRESP()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"redis://127.0.0.1:{servidor.server_address[1]}/0"
+
+def probar_interfaz(cache):
+    cache.guardar("a", ("uno", b"\x00\x01"), ttl=60, etiquetas=["t1"])
+    cache.guardar("b", {"dos": 2}, ttl=60, etiquetas=["t1", "t2"])
+    cache.guardar("c", 3.5, ttl=0.05)
+    assert cache.obtener("a") == ("uno", b"\x00\x01")
+    assert cache.obtener("b") == {"dos": 2}
+    assert cache.obtener("c") == 3.5
+    time.sleep(0.1)
+    assert cache.obtener("c") is None, "la entrada debió expirar"
+
+    assert cache.invalidar_etiqueta("t1") == 2
+    assert cache.obtener("a") is None and cache.obtener("b") is None
+
+    assert cache.incrementar("contador") == 1
+    assert cache.incrementar("contador", 10) == 11
+    assert cache.obtener("contador") == 11
+
+    cache.guardar("d", "x")
+    cache.borrar("d")
+    assert cache.obtener("d") is None
+
+def test_memoria_interfaz():
+    probar_interfaz(CacheMemoria(maximo=100, ttl=60))
+
+def test_memoria_expulsa_lru():
+    cache = CacheMemoria(maximo=3, ttl=60)
+    for clave in "abc":
+        cache.guardar(clave, clave, etiquetas=["todas"])
+    cache.obtener("a")  # "a" pasa a ser la más reciente
+    cache.guardar("d", "d", etiquetas=["todas"])
+    assert cache.obtener("b") is None
+    assert [cache.obtener(c) for c in "acd"] == ["a", "c", "d"]
+    assert cache.expulsiones == 1
+    assert cache.invalidar_etiqueta("todas") == 3
+
+@requiere_redis
+def test_redis_interfaz():
+    servidor, url = iniciar_servidor()
+    try:
+        probar_interfaz(CacheRedis(url, prefijo="prueba:", ttl=60))
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+@requiere_redis
+def test_redis_etiquetas_expiran_sin_opciones_de_redis7():
+    """El SET de una etiqueta recibe TTL con PEXPIRE simple y sobrevive a sus entradas"""
+    servidor, url = iniciar_servidor()
+    try:
+        cache = CacheRedis(url, prefijo="prueba:", ttl=60, ttl_etiquetas=120)
+        cache.guardar("larga", 1, ttl=100, etiquetas=["t"])
+        cache.guardar("corta", 2, ttl=1, etiquetas=["t"])
+        assert cache.errores == 0, "PEXPIRE no debe usar NX/GT"
+        restante = servidor.expira[b"prueba:etiqueta:t"] - time.monotonic()
+        assert 100 < restante <= 120, "una entrada corta no acorta la vida del SET por debajo de las demás"
+        assert cache.invalidar_etiqueta("t") == 2
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+@requiere_redis
+def test_redis_compartido_entre_instancias():
+    """Dos workers con su propio cliente ven las mismas versiones y respuestas"""
+    servidor, url = iniciar_servidor()
+    try:
+        worker_a, worker_b = CacheRedis(url, ttl=60), CacheRedis(url, ttl=60)
+        versiones_a, versiones_b = VersionesDatos(worker_a), VersionesDatos(worker_b)
+
+        version = versiones_a.actual(7)
+        assert versiones_b.actual(7) == version
+        worker_a.guardar(f"respuesta:{version}", b"{}", etiquetas=[etiqueta_usuario(7)])
+
+        nueva = versiones_b.incrementar(7)
+        assert nueva != version and versiones_a.actual(7) == nueva
+        assert worker_a.obtener(f"respuesta:{version}") is None, "la escritura en B libera las respuestas de A"
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+@requiere_redis
+def test_redis_caido_no_rompe():
+    cache = CacheRedis("redis://127.0.0.1:1/0", ttl=60)
+    cache.guardar("a", 1)
+    assert cache.obtener("a") is None
+    assert cache.incrementar("a") is None
+    assert VersionesDatos(cache).actual(1) is None
+    assert cache.errores >= 3
+
+if __name__ == "__main__":
+    print("🚀 Probando la caché compartida...")
+    print("=" * 50)
+    pruebas = [test_memoria_interfaz, test_memoria_expulsa_lru]
+    if redis is not None:
+        pruebas += [test_redis_interfaz, test_redis_etiquetas_expiran_sin_opciones_de_redis7, test_redis_compartido_entre_instancias, test_redis_caido_no_rompe]
+    else:
+        print("⚠️ Paquete 'redis' no instalado: se omiten las pruebas del backend Redis")
+    for prueba in pruebas:
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
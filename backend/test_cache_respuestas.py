@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Prueba del middleware de caché de respuestas (utils/cache_respuestas.py)
+con una app ASGI mínima y un backend de caché lento, como un Redis con
+latencia de red.
+
+Uso: python test_cache_respuestas.py   (o con pytest)
+"""
+
+import asyncio
+import json
+import time
+
+from utils.cache import CacheMemoria
+from utils.cache_respuestas import CacheRespuestas, MiddlewareCacheRespuestas
+from utils.jwt import crear_token
+from utils.version_datos import VersionesDatos
+
+LATENCIA = 0.2
+
+class CacheLenta(CacheMemoria):
+    """CacheMemoria que tarda LATENCIA segundos en cada operación (bloqueando el hilo)"""
+
+    def obtener(self, clave):
+        time.sleep(LATENCIA)
+        return super().obtener(clave)
+
+    def guardar(self, clave, valor, ttl=None, etiquetas=()):
+        time.sleep(LATENCIA)
+        return super().guardar(clave, valor, ttl=ttl, etiquetas=etiquetas)
+
+    def incrementar(self, clave, cantidad=1):
+        time.sleep(LATENCIA)
+        return super().incrementar(clave, cantidad)
+
+class AppEco:
+    """App ASGI que responde JSON y cuenta cuántas veces se ejecutó"""
+
+    def __init__(self):
+        self.llamadas = 0
+
+    async def __call__(self, scope, receive, send):
+        self.llamadas += 1
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps({"llamada": self.llamadas}).encode()})
+
+def crear_middleware(backend):
+    app = AppEco()
+    middleware = MiddlewareCacheRespuestas(app, cache=CacheRespuestas(backend, ttl=60),
+                                           versiones=VersionesDatos(backend))
+    return app, middleware
+
+async def pedir(middleware, metodo, ruta, usuario_id=1, headers=()):
+    scope = {
+        "type": "http", "method": metodo, "path": ruta, "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {crear_token({'sub': str(usuario_id)})}".encode()), *headers],
+    }
+    mensajes = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        mensajes.append(mensaje)
+
+    await middleware(scope, receive, send)
+    inicio = mensajes[0]
+    return inicio["status"], dict(inicio["headers"]), b"".join(m.get("body", b"") for m in mensajes[1:])
+
+def test_sirve_desde_cache_y_304():
+    app, middleware = crear_middleware(CacheMemoria(ttl=60))
+
+    async def escenario():
+        estado, headers, cuerpo = await pedir(middleware, "GET", "/dashboard")
+        assert estado == 200 and b"etag" in headers
+        assert await pedir(middleware, "GET", "/dashboard") == (estado, headers, cuerpo)
+        assert app.llamadas == 1, "la segunda lectura sale de la caché"
+
+        estado, _, _ = await pedir(middleware, "GET", "/dashboard", headers=[(b"if-none-match", headers[b"etag"])])
+        assert estado == 304 and app.llamadas == 1
+
+        await pedir(middleware, "POST", "/transacciones")
+        estado, _, cuerpo = await pedir(middleware, "GET", "/dashboard")
+        assert json.loads(cuerpo) == {"llamada": 3}, "una escritura invalida las respuestas del usuario"
+
+    asyncio.run(escenario())
+
+def test_solo_las_rutas_de_datos_invalidan():
+    app, middleware = crear_middleware(CacheMemoria(ttl=60))
+
+    async def escenario():
+        invalidan = {}
+        await pedir(middleware, "GET", "/graficas/ingresos-gastos")
+        for metodo, ruta in [("POST", "/auth/login"), ("POST", "/soporte/tickets"), ("PUT", "/usuarios/perfil"),
+                             ("GET", "/notificaciones"), ("POST", "/transacciones"), ("DELETE", "/pagos-fijos/3"),
+                             ("POST", "/"), ("GET", "/notificaciones/marcar-todas-leidas")]:
+            antes = app.llamadas
+            await pedir(middleware, metodo, ruta)
+            await pedir(middleware, "GET", "/graficas/ingresos-gastos")
+            # Si la versión subió, la gráfica se vuelve a calcular (dos llamadas a la app)
+            invalidan[ruta] = app.llamadas - antes == 2
+        return invalidan
+
+    assert asyncio.run(escenario()) == {
+        "/auth/login": False, "/soporte/tickets": False, "/usuarios/perfil": False, "/notificaciones": False,
+        "/transacciones": True, "/pagos-fijos/3": True, "/": True, "/notificaciones/marcar-todas-leidas": True,
+    }
+
+def test_backend_lento_no_bloquea_el_loop():
+    app, middleware = crear_middleware(CacheLenta(ttl=60))
+
+    async def latido(retrasos, listo):
+        """Despierta cada 10 ms y anota cuánto tardó realmente en despertar"""
+        while not listo.is_set():
+            antes = time.monotonic()
+            await asyncio.sleep(0.01)
+            retrasos.append(time.monotonic() - antes)
+
+    async def escenario():
+        retrasos, listo = [], asyncio.Event()
+        tarea = asyncio.create_task(latido(retrasos, listo))
+        inicio = time.monotonic()
+        # Versión (obtener + incrementar), obtener de la respuesta y guardar: varias esperas de LATENCIA
+        await asyncio.gather(pedir(middleware, "GET", "/dashboard", 1), pedir(middleware, "GET", "/dashboard", 2))
+        await pedir(middleware, "POST", "/transacciones", 1)
+        transcurrido = time.monotonic() - inicio
+        listo.set()
+        await tarea
+        return retrasos, transcurrido
+
+    retrasos, transcurrido = asyncio.run(escenario())
+    assert transcurrido >= 4 * LATENCIA
+    assert max(retrasos) < LATENCIA / 2, f"el event loop se detuvo {max(retrasos):.3f} s"
+    assert app.llamadas == 3
+
+if __name__ == "__main__":
+    print("🚀 Probando la caché de respuestas...")
+    print("=" * 50)
+    for prueba in [test_sirve_desde_cache_y_304, test_solo_las_rutas_de_datos_invalidan,
+                   test_backend_lento_no_bloquea_el_loop]:
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Prueba de la cola de correos con transportes sustitutos (sin servidor SMTP)
+
+Uso: python test_cola_correos.py   (o con pytest)
+"""
+
+import os
+import smtplib
+import socketserver
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from utils.cola_correos import ColaCorreos, TransporteArchivo, TransporteMemoria, TransporteSMTP
+from utils.email_service import EmailService
+
+class TransporteInestable(TransporteMemoria):
+    """Falla las primeras `fallos` entregas con un error temporal"""
+
+    def __init__(self, fallos):
+        super().__init__()
+        self.fallos = fallos
+
+    def enviar(self, mensaje):
+        if self.fallos > 0:
+            self.fallos -= 1
+            raise smtplib.SMTPServerDisconnected("conexión perdida")
+        super().enviar(mensaje)
+
+class TransporteRechazo(TransporteMemoria):
+    def enviar(self, mensaje):
+        raise smtplib.SMTPRecipientsRefused({mensaje["To"]: (550, b"mailbox unavailable")})
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo en 127.0.0.1 que cuenta conexiones y mensajes"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ManejadorSMTP)
+        self.conexiones = 0
+        self.mensajes = 0
+        self.lock = threading.Lock()
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linea):
+        self.wfile.write(linea.encode() + b"\r\n")
+        self.wfile.flush()
+
+    def handle(self):
+        with self.server.lock:
+            self.server.conexiones += 1
+        self.responder("220 localhost listo")
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea[:4].upper()
+            if comando in (b"EHLO", b"HELO"):
+                self.responder("250 localhost")
+            elif comando == b"DATA":
+                self.responder("354 fin con <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.mensajes += 1
+                self.responder("250 aceptado")
+            elif comando == b"QUIT":
+                self.responder("221 adios")
+                return
+            else:
+                self.responder("250 ok")
+
+def esperar(condicion, timeout=5):
+    limite = time.monotonic() + timeout
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return condicion()
+
+def test_encolar_no_bloquea_y_agrupa_en_lotes():
+    transporte = TransporteMemoria()
+    cola = ColaCorreos(transporte, lote=10, espera_lote=0.2)
+    servicio = EmailService(cola)
+
+    inicio = time.perf_counter()
+    for i in range(25):
+        assert servicio.enviar_correo_bienvenida(f"usuario{i}@example.com", f"Usuario {i}")
+    assert time.perf_counter() - inicio < 0.5
+
+    assert esperar(lambda: len(transporte.enviados) == 25)
+    assert cola.lotes <= 5
+    assert transporte.enviados[0]["Subject"] == "🎉 ¡Bienvenido a Lana App!"
+    cola.detener()
+
+def test_reintenta_errores_temporales_con_backoff():
+    transporte = TransporteInestable(fallos=2)
+    cola = ColaCorreos(transporte, espera_lote=0, backoff_base=0.05)
+    cola.encolar(["a@example.com"], "Asunto", "<p>hola</p>")
+
+    assert esperar(lambda: len(transporte.enviados) == 1)
+    assert cola.reintentados == 2 and cola.descartados == 0
+    cola.detener()
+
+def test_descarta_rechazos_permanentes():
+    cola = ColaCorreos(TransporteRechazo(), espera_lote=0, backoff_base=0.01)
+    cola.encolar(["nadie@example.com"], "Asunto", "<p>hola</p>")
+
+    assert esperar(lambda: cola.descartados == 1)
+    assert cola.reintentados == 0
+    cola.detener()
+
+def test_smtp_reutiliza_una_conexion_por_lote():
+    servidor = ServidorSMTP()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    config = SimpleNamespace(MAIL_SERVER="127.0.0.1", MAIL_PORT=servidor.server_address[1], MAIL_SSL_TLS=False,
+                             MAIL_STARTTLS=False, USE_CREDENTIALS=False, VALIDATE_CERTS=False)
+    transporte = TransporteSMTP(config)
+    cola = ColaCorreos(transporte, lote=50, espera_lote=0.2)
+    try:
+        for i in range(20):
+            cola.encolar([f"usuario{i}@example.com"], "Asunto", "<p>hola</p>")
+        assert esperar(lambda: servidor.mensajes == 20)
+        # Un segundo lote sigue usando la misma conexión
+        cola.encolar(["otro@example.com"], "Asunto", "<p>hola</p>")
+        assert esperar(lambda: servidor.mensajes == 21)
+        assert (servidor.conexiones, transporte.conexiones_abiertas) == (1, 1)
+        assert cola.estadisticas()["enviados"] == 21
+    finally:
+        cola.detener()
+        servidor.shutdown()
+        servidor.server_close()
+
+def test_transporte_archivo_escribe_eml():
+    with tempfile.TemporaryDirectory() as directorio:
+        cola = ColaCorreos(TransporteArchivo(directorio), espera_lote=0)
+        cola.encolar(["a@example.com"], "Asunto", "<p>hola</p>")
+        cola.detener()
+        archivos = os.listdir(directorio)
+        assert len(archivos) == 1 and archivos[0].endswith(".eml")
+
+if __name__ == "__main__":
+    print("🚀 Probando la cola de correos...")
+    print("=" * 50)
+    for prueba in (test_encolar_no_bloquea_y_agrupa_en_lotes, test_reintenta_errores_temporales_con_backoff,
+                   test_descarta_rechazos_permanentes, test_smtp_reutiliza_una_conexion_por_lote,
+                   test_transporte_archivo_escribe_eml):
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Prueba del bus de eventos en vivo (utils/eventos.py): publicación tras el
+commit, agrupación del balance y reparto entre procesos por Redis (con el
+servidor RESP falso de test_cache.py).
+
+Uso: python test_eventos.py   (o con pytest)
+"""
+
+import asyncio
+import logging
+import warnings
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.BD import Base, Usuario, Categoria, Transaccion
+from utils import eventos, resumen_mensual
+from utils.auth import FiltroTokenEnAccesos, obtener_usuario_stream
+from utils.jwt import USO_EVENTOS, crear_token, crear_token_eventos, verificar_token
+from utils.eventos import BusMemoria, BusRedis, RESINCRONIZAR, Suscripcion, redis
+from test_cache import iniciar_servidor, requiere_redis
+
+warnings.filterwarnings("ignore")
+
+def crear_base():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with Session() as db:
+        db.add(Usuario(nombre="Eventos", correo="eventos@example.com", contrasena="x"))
+        db.add_all([Categoria(nombre="Comida", tipo="egreso"), Categoria(nombre="Sueldo", tipo="ingreso")])
+        db.commit()
+    return Session
+
+class BusRegistro(BusMemoria):
+    def __init__(self):
+        super().__init__()
+        self.eventos = []
+
+    def publicar(self, usuario_id, evento):
+        self.eventos.append((usuario_id, evento))
+
+def con_bus(prueba):
+    def envoltura():
+        anterior, eventos.bus_eventos = eventos.bus_eventos, BusRegistro()
+        try:
+            prueba(eventos.bus_eventos)
+        finally:
+            eventos.bus_eventos = anterior
+    envoltura.__name__ = prueba.__name__
+    return envoltura
+
+@con_bus
+def test_publica_solo_tras_commit(bus):
+    Session = crear_base()
+    with Session() as db:
+        alta = Transaccion(usuario_id=1, categoria_id=2, monto=500, tipo="ingreso", fecha=date(2026, 10, 1))
+        db.add(alta)
+        db.flush()
+        resumen_mensual.registrar_alta(db, alta)
+        eventos.notificacion_nueva(db, 1, "hola")
+        db.rollback()
+        assert bus.eventos == [], "un rollback descarta los eventos"
+
+        for monto, fecha in ((80, date(2026, 9, 30)), (20, date(2026, 10, 1))):
+            transaccion = Transaccion(usuario_id=1, categoria_id=1, monto=monto, tipo="egreso", fecha=fecha)
+            db.add(transaccion)
+            db.flush()
+            # La primera fila de cada mes pasa por un savepoint: no debe publicar antes de tiempo
+            resumen_mensual.registrar_alta(db, transaccion)
+        assert bus.eventos == []
+        db.commit()
+
+    assert bus.eventos == [(1, {"tipo": "balance", "ingresos": 0.0, "egresos": 100.0, "balance": -100.0})]
+
+@con_bus
+def test_lote_agrupa_por_usuario(bus):
+    Session = crear_base()
+    with Session() as db:
+        resumen_mensual.registrar_lote(db, [
+            {"usuario_id": 1, "categoria_id": 1, "tipo": "egreso", "monto": 10, "fecha": date(2026, 10, d)}
+            for d in range(1, 4)
+        ] + [{"usuario_id": 1, "categoria_id": 2, "tipo": "ingreso", "monto": 100, "fecha": date(2026, 10, 1)}])
+        db.commit()
+    assert bus.eventos == [(1, {"tipo": "balance", "ingresos": 100.0, "egresos": 30.0, "balance": 70.0})]
+
+def test_cliente_lento_se_resincroniza():
+    async def probar():
+        bus = BusMemoria()
+        suscripcion = bus.suscribir(1)
+        suscripcion.cola = asyncio.Queue(2)
+        for n in range(3):
+            bus.publicar(1, {"tipo": "notificacion", "n": n})
+        bus.publicar(2, {"tipo": "notificacion"})
+        await asyncio.sleep(0)
+        assert await suscripcion.siguiente(1) == RESINCRONIZAR
+        assert await suscripcion.siguiente(0.01) is None
+        bus.cancelar(suscripcion)
+        assert bus.estadisticas()["conexiones"] == 0
+    asyncio.run(probar())
+
+@requiere_redis
+def test_redis_reparte_entre_procesos():
+    servidor, url = iniciar_servidor()
+
+    async def probar():
+        worker_a, worker_b = BusRedis(url, canal="prueba:eventos"), BusRedis(url, canal="prueba:eventos")
+        try:
+            suscripcion = worker_a.suscribir(5)
+            for _ in range(50):
+                if servidor.canales.get(b"prueba:eventos"):
+                    break
+                await asyncio.sleep(0.02)
+            worker_b.publicar(5, {"tipo": "no_leidas", "contador": 3})
+            assert await suscripcion.siguiente(2) == {"tipo": "no_leidas", "contador": 3}
+        finally:
+            worker_a.cerrar()
+            worker_b.cerrar()
+
+    try:
+        asyncio.run(probar())
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+@requiere_redis
+def test_redis_caido_entrega_local():
+    async def probar():
+        bus = BusRedis("redis://127.0.0.1:1/0")
+        suscripcion = Suscripcion(9)
+        bus._suscriptores[9].add(suscripcion)
+        bus.publicar(9, {"tipo": "notificacion"})
+        assert await suscripcion.siguiente(1) == {"tipo": "notificacion"}
+        assert bus.errores == 1
+    asyncio.run(probar())
+
+def test_token_de_eventos_solo_sirve_para_el_stream():
+    token = crear_token_eventos(1)
+    assert verificar_token(token) is None, "no vale como token de acceso"
+    assert verificar_token(token, uso=USO_EVENTOS)["sub"] == "1"
+    assert verificar_token(crear_token({"sub": "1"}), uso=USO_EVENTOS) is None
+
+    async def rechazado(**parametros):
+        try:
+            await obtener_usuario_stream(**parametros)
+        except HTTPException as e:
+            return e.status_code
+    # El token de acceso nunca se acepta en la URL, ni el de eventos en el header
+    assert asyncio.run(rechazado(token=None, token_query=crear_token({"sub": "1"}))) == 401
+    assert asyncio.run(rechazado(token=token, token_query=None)) == 401
+
+def test_log_de_accesos_oculta_el_token():
+    registro = logging.LogRecord("uvicorn.access", logging.INFO, __file__, 0, '%s - "%s %s HTTP/%s" %d',
+                                 ("127.0.0.1:5000", "GET", "/eventos?token=abc.def.ghi&x=1", "1.1", 200), None)
+    assert FiltroTokenEnAccesos().filter(registro)
+    assert registro.getMessage() == '127.0.0.1:5000 - "GET /eventos?token=***&x=1 HTTP/1.1" 200'
+
+if __name__ == "__main__":
+    print("🚀 Probando el bus de eventos...")
+    print("=" * 50)
+    pruebas = [test_publica_solo_tras_commit, test_lote_agrupa_por_usuario, test_cliente_lento_se_resincroniza,
+               test_token_de_eventos_solo_sirve_para_el_stream, test_log_de_accesos_oculta_el_token]
+    if redis is not None:
+        pruebas += [test_redis_reparte_entre_procesos, test_redis_caido_entrega_local]
+    else:
+        print("⚠️ Paquete 'redis' no instalado: se omiten las pruebas del backend Redis")
+    for prueba in pruebas:
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Prueba de la importación masiva de transacciones (CSV, OFX, validación e
+inserción por lotes) sobre una base SQLite en memoria
+
+Uso: python test_importacion.py   (o con pytest)
+"""
+
+import warnings
+from datetime import date
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.BD import Base, Usuario, Categoria, Transaccion, ResumenMensual
+from utils.cache_categorias import catalogo_categorias
+from utils.importacion import _normalizar_monto, insertar_lotes, leer_csv, leer_ofx, validar_filas
+
+warnings.filterwarnings("ignore")
+
+OFX_SGML = b"""OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20261003120000[-6:CST]
+<TRNAMT>-250.75
+<NAME>Supermercado
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20261015
+<TRNAMT>15000.00
+<MEMO>Nomina octubre
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+def crear_base():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    engine.connect().exec_driver_sql("PRAGMA foreign_keys=ON")
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with Session() as db:
+        db.add(Usuario(nombre="Usuario", correo="importacion@example.com", contrasena="x"))
+        db.add_all([Categoria(nombre="Comida", tipo="egreso"), Categoria(nombre="Sueldo", tipo="ingreso")])
+        db.commit()
+    # El catálogo es global al proceso: cada base nueva lo vuelve a cargar
+    catalogo_categorias.invalidar()
+    return Session
+
+def test_normalizar_monto():
+    assert _normalizar_monto("1.234,50") == "1234.50"
+    assert _normalizar_monto("-12,5") == "-12.5"
+    assert _normalizar_monto("$ 1,234.50") == "1234.50"
+    assert _normalizar_monto("1234.50") == "1234.50"
+
+def test_csv_detecta_delimitador():
+    punto_y_coma = "Fecha;Importe;Concepto;Categoria\n15/10/2026;1.234,50;Renta;Comida\n16/10/2026;-12,5;Cafe;\n"
+    filas = leer_csv(punto_y_coma.encode("utf-8-sig"))
+    assert filas == [
+        {"fecha": "2026-10-15", "monto": "1234.50", "descripcion": "Renta", "categoria": "Comida"},
+        {"fecha": "2026-10-16", "monto": "-12.5", "descripcion": "Cafe", "categoria": None},
+    ]
+
+    tabulador = "date\tamount\tdescription\n2026-10-01\t99.90\tLibros\n"
+    assert leer_csv(tabulador.encode()) == [{"fecha": "2026-10-01", "monto": "99.90", "descripcion": "Libros"}]
+
+    coma = 'fecha,monto,descripcion\n2026-10-02,"1,500.00",Bono\n'
+    assert leer_csv(coma.encode()) == [{"fecha": "2026-10-02", "monto": "1500.00", "descripcion": "Bono"}]
+
+def test_ofx_sgml_sin_cierres():
+    filas = leer_ofx(OFX_SGML)
+    assert filas == [
+        {"fecha": "2026-10-03", "monto": "-250.75", "descripcion": "Supermercado"},
+        {"fecha": "2026-10-15", "monto": "15000.00", "descripcion": "Nomina octubre"},
+    ]
+
+def test_signo_define_tipo_y_numera_errores():
+    Session = crear_base()
+    filas = [
+        {"fecha": "2026-10-03", "monto": "-250.75", "descripcion": "Supermercado"},
+        {"fecha": "2026-10-15", "monto": "15000.00", "descripcion": "Nomina"},
+        {"fecha": "no es fecha", "monto": "10"},
+        {"fecha": "2026-10-04", "monto": "-5", "tipo": "ingreso"},
+        {"fecha": "2026-10-05", "monto": "0"},
+        {"fecha": "2026-10-06", "monto": "8", "categoria": "No existe"},
+        {"fecha": "2026-10-07", "monto": "-8", "categoria": "Sueldo"},
+        {"fecha": "2026-10-08", "monto": "8", "presupuesto_id": 99},
+    ]
+    with Session() as db:
+        validas, errores = validar_filas(db, 1, filas, categoria_ingreso_id=2, categoria_egreso_id=1)
+
+    assert [(numero, fila["tipo"], fila["monto"], fila["categoria_id"]) for numero, fila in validas] == [
+        (1, "egreso", 250.75, 1),
+        (2, "ingreso", 15000.0, 2),
+    ]
+    assert [error["fila"] for error in errores] == [3, 4, 5, 6, 7, 8]
+    assert errores[0]["error"].startswith("fecha:")
+    assert errores[1]["error"] == "Monto negativo en un ingreso"
+    assert errores[2]["error"] == "El monto debe ser mayor que cero"
+    assert errores[3]["error"] == "Categoría no encontrada"
+    assert errores[4]["error"] == "La categoría es de tipo 'ingreso', pero la fila es 'egreso'"
+    assert errores[5]["error"] == "Presupuesto no válido para este usuario"
+
+def test_lote_fallido_se_revierte_solo():
+    Session = crear_base()
+    filas = [
+        {"fecha": "2026-10-01", "monto": "-10", "descripcion": "Uno"},
+        {"fecha": "2026-10-02", "monto": "-20", "descripcion": "Dos"},
+        {"fecha": "2026-10-03", "monto": "-30", "descripcion": "Tres"},
+    ]
+    with Session() as db:
+        validas, errores = validar_filas(db, 1, filas, categoria_egreso_id=1)
+        assert len(validas) == 3 and not errores
+        # La tercera fila apunta a un usuario inexistente: falla la llave foránea de su lote
+        validas[2][1]["usuario_id"] = 999
+
+        insertadas, errores = insertar_lotes(db, validas, tamano_lote=2)
+
+    assert insertadas == 2
+    assert errores == [{"fila": 3, "error": "Error al guardar el lote"}]
+    with Session() as db:
+        assert sorted(t.descripcion for t in db.query(Transaccion)) == ["Dos", "Uno"]
+        assert db.query(func.sum(ResumenMensual.total)).scalar() == 30, "el resumen sólo incluye el lote confirmado"
+        assert db.query(ResumenMensual).filter(ResumenMensual.usuario_id == 999).count() == 0
+
+if __name__ == "__main__":
+    print("🚀 Probando la importación masiva de transacciones...")
+    print("=" * 50)
+    for prueba in [test_normalizar_monto, test_csv_detecta_delimitador, test_ofx_sgml_sin_cierres,
+                   test_signo_define_tipo_y_numera_errores, test_lote_fallido_se_revierte_solo]:
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Regresión de planes de consulta: ninguna ruta debe recorrer una tabla completa
+
+Levanta la API contra una base SQLite en memoria creada desde models/BD.py,
+siembra datos, llama a cada ruta capturando las sentencias SQL que emite y
+ejecuta EXPLAIN QUERY PLAN sobre cada una. Falla si aparece un SCAN sobre
+una tabla (búsqueda sin índice).
+
+Uso: python test_planes_consulta.py   (o con pytest)
+"""
+
+import re
+import warnings
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import database
+import main
+from models.BD import (Base, Usuario, Categoria, Transaccion, Presupuesto, PagoFijo, Notificacion, NotificacionArchivada,
+                       ConfiguracionNotificacion, Soporte)
+from utils import recurrencia
+from utils.jwt import crear_token
+from utils.paginacion import codificar_cursor
+from utils.resumen_mensual import reconstruir
+
+warnings.filterwarnings("ignore")
+
+# Catálogos pequeños y casi estáticos: recorrerlos completos es lo esperado
+TABLAS_PERMITIDAS = {"categorias"}
+
+RUTAS = [
+    ("GET", "/dashboard"),
+    ("GET", "/dashboard?fecha_inicio={hace_un_anio}&fecha_fin={hoy}"),
+    ("GET", "/dashboard/balance"),
+    ("GET", "/dashboard/transacciones-recientes"),
+    ("GET", "/dashboard/resumen?periodo=mes"),
+    ("GET", "/dashboard/resumen?periodo=semana"),
+    ("GET", "/transacciones"),
+    ("GET", "/transacciones?limite=50"),
+    ("GET", "/transacciones?tipo=egreso&fecha_inicio={hace_un_anio}"),
+    ("GET", "/transacciones?categoria={categoria_id}"),
+    ("GET", "/transacciones/{transaccion_id}"),
+    ("PUT", "/transacciones/{transaccion_id}"),
+    ("GET", "/graficas/ingresos-gastos?periodo=mes"),
+    ("GET", "/graficas/evolucion-temporal?periodo=mes"),
+    ("GET", "/graficas/evolucion-temporal?periodo=año"),
+    ("GET", "/graficas/evolucion-temporal?periodo=trimestre&granularidad=semana"),
+    ("GET", "/graficas/tendencias?periodo=año&granularidad=trimestre"),
+    ("GET", "/graficas/ahorros"),
+    ("GET", "/graficas/distribucion-categoria?periodo=año&tipo=egreso"),
+    ("GET", "/graficas/comparacion-mensual?meses=12"),
+    ("GET", "/graficas/metricas?periodo=mes"),
+    ("GET", "/analytics/summary"),
+    ("GET", "/presupuestos"),
+    ("GET", "/presupuestos/resumen"),
+    ("GET", "/presupuestos/alertas"),
+    ("GET", "/presupuestos/{presupuesto_id}"),
+    ("GET", "/pagos-fijos"),
+    ("GET", "/pagos-fijos/proximos"),
+    ("GET", "/notificaciones"),
+    ("GET", "/notificaciones?solo_no_leidas=true"),
+    ("GET", "/notificaciones?cursor={cursor_notificacion}"),
+    ("GET", "/notificaciones?solo_no_leidas=true&cursor={cursor_notificacion}"),
+    ("GET", "/notificaciones/archivo"),
+    ("GET", "/notificaciones/contador-no-leidas"),
+    ("GET", "/notificaciones/configuracion"),
+    ("GET", "/users/me"),
+    ("GET", "/soporte/tickets"),
+    ("GET", "/soporte/tickets?estado=abierto"),
+]
+
+def crear_entorno():
+    """Crear base en memoria, sembrar datos y conectar la API a ella"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    with Session() as db:
+        usuarios = [Usuario(nombre=f"Usuario {i}", correo=f"plan{i}@example.com", contrasena="x") for i in range(20)]
+        categorias = [Categoria(nombre=f"Categoria {i}", tipo="ingreso" if i < 3 else "egreso") for i in range(10)]
+        db.add_all(usuarios + categorias)
+        db.flush()
+
+        hoy = date.today()
+        filas = []
+        for i in range(5000):
+            categoria = categorias[i % len(categorias)]
+            filas.append(Transaccion(
+                usuario_id=usuarios[i % len(usuarios)].id, categoria_id=categoria.id, monto=10 + i % 90,
+                tipo=categoria.tipo, descripcion=f"Movimiento {i}", fecha=hoy - timedelta(days=i % 700)
+            ))
+        db.add_all(filas)
+        for usuario in usuarios:
+            db.add(Presupuesto(usuario_id=usuario.id, categoria_id=categorias[5].id, nombre="Comida",
+                               monto_total=1000, fecha_inicio=hoy.replace(day=1), fecha_fin=hoy + timedelta(days=30)))
+            db.add(PagoFijo(usuario_id=usuario.id, nombre="Renta", monto=500, categoria="Vivienda",
+                            frecuencia="mensual", fecha_inicio=hoy + timedelta(days=3)))
+            db.add(ConfiguracionNotificacion(usuario_id=usuario.id))
+            db.add_all([Notificacion(usuario_id=usuario.id, mensaje=f"Aviso {j}", leido=bool(j % 2)) for j in range(30)])
+            db.add_all([Soporte(usuario_id=usuario.id, asunto=f"Ticket {j}", mensaje="No carga el dashboard",
+                                estado="cerrado" if j % 3 == 0 else "abierto") for j in range(5)])
+        db.add_all([NotificacionArchivada(id=100000 + j, usuario_id=usuarios[j % len(usuarios)].id, mensaje=f"Archivada {j}",
+                                          fecha_creacion=hoy - timedelta(days=200 + j)) for j in range(100)])
+        db.commit()
+        reconstruir(db)
+        recurrencia.reconstruir(db)
+
+        usuario = usuarios[0]
+        valores = {
+            "hoy": hoy.isoformat(),
+            "hace_un_anio": (hoy - timedelta(days=365)).isoformat(),
+            "categoria_id": categorias[5].id,
+            "transaccion_id": db.query(Transaccion.id).filter(Transaccion.usuario_id == usuario.id).first()[0],
+            "presupuesto_id": db.query(Presupuesto.id).filter(Presupuesto.usuario_id == usuario.id).first()[0],
+            "usuario_id": usuario.id,
+        }
+        notificacion = db.query(Notificacion).filter(Notificacion.usuario_id == usuario.id).order_by(Notificacion.id).first()
+        valores["cursor_notificacion"] = codificar_cursor(notificacion.fecha_creacion, notificacion.id + 20)
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides.clear()
+    main.app.dependency_overrides[database.get_db] = get_db
+    return engine, valores
+
+def capturar_sentencias(engine, client, headers, valores):
+    """
+    Llamar a cada ruta y devolver [(ruta, sql, parámetros)] de las lecturas
+    emitidas; una ruta que falla no llega a sus consultas, así que también es un error
+    """
+    capturadas = []
+    fallidas = []
+    ruta_actual = [None]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capturar(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and re.match(r"\s*(SELECT|UPDATE|DELETE)", statement, re.I):
+            capturadas.append((ruta_actual[0], statement, parameters))
+
+    for metodo, plantilla in RUTAS:
+        ruta = plantilla.format(**valores)
+        ruta_actual[0] = f"{metodo} {ruta}"
+        if metodo == "PUT":
+            respuesta = client.put(ruta, json={"descripcion": "editada"}, headers=headers)
+        else:
+            respuesta = client.get(ruta, headers=headers)
+        if respuesta.status_code >= 400:
+            fallidas.append(f"{ruta_actual[0]}: {respuesta.status_code} {respuesta.text[:200]}")
+
+    event.remove(engine, "before_cursor_execute", _capturar)
+    assert not fallidas, "Rutas con error:\n" + "\n".join(fallidas)
+    return capturadas
+
+def recorridos_completos(engine, capturadas):
+    """Ejecutar EXPLAIN QUERY PLAN y devolver los SCAN sobre tablas reales"""
+    tablas = set(Base.metadata.tables) - TABLAS_PERMITIDAS
+    problemas = []
+    with engine.connect() as conn:
+        for ruta, sql, parametros in capturadas:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+            for fila in plan:
+                detalle = fila[-1]
+                encontrado = re.match(r"SCAN (\w+)", detalle)
+                if encontrado and encontrado.group(1) in tablas:
+                    problemas.append((ruta, detalle, " ".join(sql.split())[:160]))
+    return problemas
+
+def test_ninguna_ruta_recorre_tablas_completas():
+    engine, valores = crear_entorno()
+    client = TestClient(main.app, raise_server_exceptions=False)
+    headers = {"Authorization": f"Bearer {crear_token({'sub': str(valores['usuario_id'])})}"}
+
+    capturadas = capturar_sentencias(engine, client, headers, valores)
+    assert capturadas, "No se capturó ninguna consulta"
+
+    problemas = recorridos_completos(engine, capturadas)
+    main.app.dependency_overrides.clear()
+    assert not problemas, "Recorridos completos encontrados:\n" + "\n".join(f"{ruta}: {detalle}\n    {sql}" for ruta, detalle, sql in problemas)
+
+if __name__ == "__main__":
+    print("🚀 Verificando planes de consulta...")
+    print("=" * 50)
+    try:
+        test_ninguna_ruta_recorre_tablas_completas()
+        print("✅ Ninguna ruta recorre tablas completas")
+    except AssertionError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
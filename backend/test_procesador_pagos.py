@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Prueba del procesador de pagos fijos vencidos sobre una base SQLite en memoria
+
+Uso: python test_procesador_pagos.py   (o con pytest)
+"""
+
+import warnings
+from datetime import date
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.BD import (Base, Usuario, Categoria, Transaccion, Presupuesto, PagoFijo, Notificacion,
+                       ConfiguracionNotificacion, ResumenMensual)
+from utils.procesador_pagos import ResultadoProcesamiento, consulta_vencidos, procesar_lote, procesar_vencidos
+from utils.recurrencia import reconstruir
+
+warnings.filterwarnings("ignore")
+
+HOY = date(2026, 10, 18)
+
+def crear_base():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with Session() as db:
+        db.add_all([Usuario(nombre=f"Usuario {i}", correo=f"pagos{i}@example.com", contrasena="x") for i in range(3)])
+        db.add_all([Categoria(nombre="Vivienda", tipo="egreso"), Categoria(nombre="Sueldo", tipo="ingreso")])
+        db.commit()
+    return Session
+
+def pago(usuario_id, nombre, frecuencia, fecha_inicio, proxima_fecha, categoria="Vivienda", activo=True):
+    return PagoFijo(usuario_id=usuario_id, nombre=nombre, monto=100, categoria=categoria, frecuencia=frecuencia,
+                    fecha_inicio=fecha_inicio, proxima_fecha=proxima_fecha, estado="Pendiente", activo=activo)
+
+def test_pone_al_dia_cobros_atrasados():
+    Session = crear_base()
+    with Session() as db:
+        db.add(Presupuesto(usuario_id=1, categoria_id=1, nombre="Casa", monto_total=250,
+                           fecha_inicio=date(2026, 1, 1), fecha_fin=date(2026, 12, 31)))
+        db.add(pago(1, "Renta", "mensual", date(2026, 7, 31), date(2026, 8, 31)))
+        db.add(pago(1, "Pausado", "diario", date(2026, 1, 1), date(2026, 1, 1), activo=False))
+        db.add(pago(1, "Futuro", "anual", date(2026, 12, 1), date(2026, 12, 1)))
+        db.commit()
+
+    resultado = procesar_vencidos(HOY, lote=1, fabrica_sesiones=Session)
+    assert (resultado.pagos, resultado.transacciones, resultado.notificaciones) == (1, 2, 1)
+
+    with Session() as db:
+        fechas = [t.fecha for t in db.query(Transaccion).order_by(Transaccion.fecha)]
+        assert fechas == [date(2026, 8, 31), date(2026, 9, 30)]
+        assert db.query(PagoFijo).filter_by(nombre="Renta").one().proxima_fecha == date(2026, 10, 31)
+        assert db.query(func.sum(ResumenMensual.total)).scalar() == 200
+        assert db.query(Presupuesto).one().monto_usado == 200
+
+def test_es_idempotente():
+    Session = crear_base()
+    with Session() as db:
+        db.add(pago(1, "Luz", "semanal", date(2026, 10, 4), date(2026, 10, 11)))
+        db.commit()
+        vencidos = db.execute(consulta_vencidos(HOY, 10)).all()
+
+    assert procesar_vencidos(HOY, fabrica_sesiones=Session).transacciones == 2
+    assert procesar_vencidos(HOY, fabrica_sesiones=Session).transacciones == 0
+
+    # Otro proceso que leyó el pago antes de que avanzara no lo vuelve a cobrar
+    with Session() as db:
+        resultado = ResultadoProcesamiento(fecha=HOY)
+        procesar_lote(db, vencidos, HOY, resultado)
+        assert (resultado.omitidos, resultado.transacciones) == (1, 0)
+        assert db.query(Transaccion).count() == 2
+
+def test_sin_categoria_y_sin_recordatorios():
+    Session = crear_base()
+    with Session() as db:
+        db.add(ConfiguracionNotificacion(usuario_id=2, recordatorios=False))
+        db.add(pago(2, "Gimnasio", "mensual", date(2026, 10, 1), date(2026, 10, 1)))
+        db.add(pago(3, "Desconocido", "mensual", date(2026, 10, 1), date(2026, 10, 1), categoria="No existe"))
+        db.commit()
+
+    resultado = procesar_vencidos(HOY, fabrica_sesiones=Session)
+    assert (resultado.transacciones, resultado.notificaciones, resultado.sin_categoria) == (1, 0, 1)
+    with Session() as db:
+        assert db.query(Notificacion).count() == 0
+        # Sin categoría queda vencido para la próxima ejecución
+        assert db.query(PagoFijo).filter_by(nombre="Desconocido").one().proxima_fecha == date(2026, 10, 1)
+
+def test_pago_sin_monto_no_detiene_el_lote():
+    Session = crear_base()
+    with Session() as db:
+        sin_monto = pago(1, "Sin monto", "mensual", date(2026, 10, 1), date(2026, 10, 1))
+        sin_monto.monto = None
+        db.add(sin_monto)
+        db.add(pago(2, "Agua", "mensual", date(2026, 10, 2), date(2026, 10, 2)))
+        db.commit()
+
+    resultado = procesar_vencidos(HOY, fabrica_sesiones=Session)
+    assert (resultado.pagos, resultado.transacciones, resultado.sin_monto) == (1, 1, 1)
+    with Session() as db:
+        assert [t.usuario_id for t in db.query(Transaccion)] == [2]
+        assert db.query(PagoFijo).filter_by(nombre="Sin monto").one().proxima_fecha == date(2026, 10, 1)
+
+def test_reconstruir_conserva_cobros_vencidos():
+    Session = crear_base()
+    with Session() as db:
+        db.add(pago(1, "Renta", "mensual", date(2026, 7, 31), date(2026, 8, 31)))
+        db.add(pago(1, "Migrado", "semanal", date(2026, 10, 5), None))
+        db.add(pago(1, "Editado", "mensual", date(2026, 11, 15), date(2026, 10, 20)))
+        db.commit()
+        assert reconstruir(db, hoy=HOY) == 2
+        proximas = {p.nombre: p.proxima_fecha for p in db.query(PagoFijo)}
+    assert proximas == {"Renta": date(2026, 8, 31), "Migrado": date(2026, 10, 19), "Editado": date(2026, 11, 15)}
+
+    # Los cobros atrasados siguen pendientes para el procesador
+    assert procesar_vencidos(HOY, fabrica_sesiones=Session).transacciones == 2
+
+if __name__ == "__main__":
+    print("🚀 Probando el procesador de pagos fijos...")
+    print("=" * 50)
+    for prueba in [test_pone_al_dia_cobros_atrasados, test_es_idempotente, test_sin_categoria_y_sin_recordatorios,
+                   test_pago_sin_monto_no_detiene_el_lote,
+                   test_reconstruir_conserva_cobros_vencidos]:
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
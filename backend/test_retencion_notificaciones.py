@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Prueba del archivo de notificaciones leídas antiguas sobre una base SQLite en memoria
+
+Uso: python test_retencion_notificaciones.py   (o con pytest)
+"""
+
+import warnings
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.BD import Base, Usuario, Notificacion, NotificacionArchivada
+from utils import retencion_notificaciones
+from utils.retencion_notificaciones import archivar
+
+warnings.filterwarnings("ignore")
+
+AHORA = datetime(2026, 10, 18, 12, 0)
+
+def crear_base():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with Session() as db:
+        db.add_all([Usuario(nombre=f"Usuario {i}", correo=f"retencion{i}@example.com", contrasena="x") for i in range(3)])
+        db.commit()
+    return Session
+
+def notificacion(usuario_id, dias, leido):
+    return Notificacion(usuario_id=usuario_id, mensaje=f"Hace {dias} días", leido=leido,
+                        fecha_creacion=AHORA - timedelta(days=dias))
+
+def test_archiva_solo_leidas_antiguas():
+    Session = crear_base()
+    with Session() as db:
+        for usuario_id in (1, 2, 3):
+            db.add_all([notificacion(usuario_id, 200, True), notificacion(usuario_id, 100, True),
+                        notificacion(usuario_id, 200, False), notificacion(usuario_id, 10, True)])
+        db.commit()
+        ids_antiguas = sorted(n.id for n in db.query(Notificacion).filter(
+            Notificacion.leido == True, Notificacion.fecha_creacion < AHORA - timedelta(days=90)))
+
+    resultado = archivar(dias=90, lote=2, ahora=AHORA, fabrica_sesiones=Session)
+    assert (resultado.archivadas, resultado.usuarios) == (6, 3)
+
+    with Session() as db:
+        assert sorted(a.id for a in db.query(NotificacionArchivada)) == ids_antiguas
+        assert db.query(Notificacion).count() == 6
+        # Las no leídas se conservan aunque sean antiguas
+        assert db.query(Notificacion).filter_by(leido=False).count() == 3
+
+def test_volver_a_ejecutar_no_duplica():
+    Session = crear_base()
+    anterior = retencion_notificaciones.NOTIF_ARCHIVO_USUARIOS
+    retencion_notificaciones.NOTIF_ARCHIVO_USUARIOS = 1
+    try:
+        with Session() as db:
+            db.add_all([notificacion(1 + i % 3, 120 + i, True) for i in range(25)])
+            db.commit()
+        assert archivar(dias=90, lote=4, ahora=AHORA, fabrica_sesiones=Session).archivadas == 25
+        assert archivar(dias=90, lote=4, ahora=AHORA, fabrica_sesiones=Session).archivadas == 0
+    finally:
+        retencion_notificaciones.NOTIF_ARCHIVO_USUARIOS = anterior
+    with Session() as db:
+        assert db.query(NotificacionArchivada).count() == 25
+        assert db.query(Notificacion).count() == 0
+
+if __name__ == "__main__":
+    print("🚀 Probando el archivo de notificaciones...")
+    print("=" * 50)
+    for prueba in [test_archiva_solo_leidas_antiguas, test_volver_a_ejecutar_no_duplica]:
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
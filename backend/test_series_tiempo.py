@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Prueba del motor de series de tiempo (utils/series_tiempo.py) contra una
+suma hecha a mano, para cada granularidad, sobre una base SQLite en memoria
+
+Uso: python test_series_tiempo.py   (o con pytest)
+"""
+
+import random
+import warnings
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.BD import Base, Usuario, Categoria, Transaccion
+from utils import series_tiempo
+from utils.resumen_mensual import reconstruir
+
+warnings.filterwarnings("ignore")
+
+DESDE, HASTA = date(2024, 3, 15), date(2026, 2, 10)
+
+def crear_base():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    aleatorio = random.Random(7)
+    filas = []
+    for _ in range(3000):
+        tipo = aleatorio.choice(["ingreso", "egreso"])
+        filas.append({
+            "usuario_id": aleatorio.randint(1, 3), "categoria_id": 2 if tipo == "ingreso" else 1, "tipo": tipo,
+            "monto": aleatorio.randint(1, 500), "fecha": date(2024, 1, 1) + timedelta(days=aleatorio.randint(0, 1000)),
+        })
+    with Session() as db:
+        db.add_all([Usuario(nombre=f"Usuario {i}", correo=f"series{i}@example.com", contrasena="x") for i in range(4)])
+        db.add_all([Categoria(nombre="Comida", tipo="egreso"), Categoria(nombre="Sueldo", tipo="ingreso")])
+        db.commit()
+        db.execute(insert(Transaccion), filas)
+        db.commit()
+        reconstruir(db)
+    return Session, filas
+
+def test_coincide_con_suma_manual():
+    Session, filas = crear_base()
+    with Session() as db:
+        for granularidad in series_tiempo.GRANULARIDADES:
+            series = series_tiempo.agrupar(db, [1, 2, 3, 4], DESDE, HASTA, granularidad)
+            inicios = series.inicios.astype(object)
+            columnas = {inicio: j for j, inicio in enumerate(inicios)}
+            limite = series_tiempo.fin_cubetas(series.inicios, granularidad)[-1].astype(object)
+            esperado = {"ingreso": np.zeros(series.ingresos.shape), "egreso": np.zeros(series.egresos.shape)}
+            for fila in filas:
+                if inicios[0] <= fila["fecha"] < limite:
+                    columna = columnas[series_tiempo.inicio_cubeta(fila["fecha"], granularidad)]
+                    esperado[fila["tipo"]][series.fila(fila["usuario_id"]), columna] += fila["monto"]
+            assert np.allclose(series.ingresos, esperado["ingreso"]), granularidad
+            assert np.allclose(series.egresos, esperado["egreso"]), granularidad
+            # El usuario sin movimientos tiene su fila en cero
+            assert not series.ingresos[series.fila(4)].any()
+
+def test_cubetas_y_saldo_acumulado():
+    Session, filas = crear_base()
+    assert series_tiempo.cubetas(date(2026, 10, 18), date(2026, 10, 19), "semana").astype(str).tolist() == ["2026-10-12", "2026-10-19"]
+    assert series_tiempo.cubetas(date(2026, 2, 10), date(2026, 11, 1), "trimestre").astype(str).tolist() == \
+        ["2026-01-01", "2026-04-01", "2026-07-01", "2026-10-01"]
+
+    with Session() as db:
+        series = series_tiempo.cargar_saldo_inicial(db, series_tiempo.agrupar(db, [1], DESDE, HASTA, "dia"))
+    signo = defaultdict(lambda: -1, ingreso=1)
+    antes = sum(signo[f["tipo"]] * f["monto"] for f in filas if f["usuario_id"] == 1 and f["fecha"] < DESDE)
+    hasta = sum(signo[f["tipo"]] * f["monto"] for f in filas if f["usuario_id"] == 1 and f["fecha"] <= HASTA)
+    assert series.saldo_inicial[0] == antes
+    assert series.balance_acumulado()[0, -1] == hasta
+
+if __name__ == "__main__":
+    print("🚀 Probando el motor de series de tiempo...")
+    print("=" * 50)
+    for prueba in [test_coincide_con_suma_manual, test_cubetas_y_saldo_acumulado]:
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Prueba de las tendencias (utils/tendencias.py): promedio móvil, crecimiento
+y recta de regresión contra numpy fila por fila, y el modo por lotes sobre
+una base SQLite en memoria
+
+Uso: python test_tendencias.py   (o con pytest)
+"""
+
+import math
+import warnings
+from datetime import date
+
+import numpy as np
+
+from test_series_tiempo import crear_base
+from utils import series_tiempo, tendencias
+
+warnings.filterwarnings("ignore")
+
+def test_calculos_por_fila():
+    valores = np.array([
+        [10.0, 12.0, 0.0, 9.0, 15.0, 18.0],
+        [5.0, 5.0, 5.0, 5.0, 5.0, 5.0],
+        [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        [-4.0, 2.0, -1.0, 3.0, 8.0, 6.0],
+    ])
+    promedio = tendencias.promedio_movil(valores, 3)
+    crecimiento = tendencias.crecimiento(valores)
+    pendiente, intercepto, r2 = tendencias.regresion_lineal(valores)
+    x = np.arange(valores.shape[1])
+    for fila, y in enumerate(valores):
+        assert np.isnan(promedio[fila, :2]).all()
+        assert np.allclose(promedio[fila, 2:], np.convolve(y, np.ones(3) / 3, "valid"))
+        for j in range(1, len(y)):
+            esperado = (y[j] - y[j - 1]) * 100 / abs(y[j - 1]) if y[j - 1] else math.nan
+            assert np.isnan(crecimiento[fila, j]) if math.isnan(esperado) else np.isclose(crecimiento[fila, j], esperado)
+        assert np.allclose([pendiente[fila], intercepto[fila]], np.polyfit(x, y, 1))
+        if y.std():
+            assert np.isclose(r2[fila], np.corrcoef(x, y)[0, 1] ** 2)
+    # Series constantes: pendiente 0 y r2 indefinido
+    assert np.isnan(r2[1]) and np.isnan(r2[2])
+    # Ventana más larga que la serie: sin promedio
+    assert np.isnan(tendencias.promedio_movil(valores, 10)).all()
+
+def test_ruta_y_lote_coinciden():
+    Session, _ = crear_base()
+    desde, hasta = date(2025, 1, 1), date(2025, 12, 31)
+    with Session() as db:
+        series = series_tiempo.agrupar(db, [1, 2, 3, 4], desde, hasta, "mes")
+        registros = list(tendencias.calcular_lote(db, desde, hasta, "mes", lote=3))
+
+    # Cada usuario, incluido el que no tiene movimientos, una vez por métrica
+    assert sorted((r["usuario_id"], r["metrica"]) for r in registros) == \
+        sorted((u, m) for u in (1, 2, 3, 4) for m in tendencias.METRICAS)
+    for registro in registros:
+        resultado = tendencias.calcular(series, registro["metrica"], 3)
+        fila = series.fila(registro["usuario_id"])
+        assert registro["granularidad"] == "mes"
+        for campo, valor in resultado.resumen(fila).items():
+            # Mismo cálculo sobre otra matriz: sólo cambia el redondeo
+            assert valor == registro[campo] or np.isclose(valor, registro[campo]), campo
+        datos = resultado.datos(fila)
+        assert len(datos) == 12 and datos[0]["fecha"] == "2025-01"
+        assert datos[-1]["valor"] == registro["ultimo_valor"]
+        assert np.isclose(datos[0]["tendencia"], registro["intercepto"])
+
+    sin_movimientos = [r for r in registros if r["usuario_id"] == 4]
+    assert all(r["direccion"] == "estable" and r["r2"] is None for r in sin_movimientos)
+
+if __name__ == "__main__":
+    print("🚀 Probando las tendencias...")
+    print("=" * 50)
+    for prueba in [test_calculos_por_fila, test_ruta_y_lote_coinciden]:
+        prueba()
+        print(f"✅ {prueba.__name__}")
+    print("\n" + "=" * 50)
+    print("🏁 Prueba completada!")
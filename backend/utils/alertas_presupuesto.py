@@ -0,0 +1,183 @@
+"""
+Mantenimiento incremental de presupuestos.monto_usado y alertas de presupuesto.
+
+Las rutas de escritura de transacciones llaman a registrar_alta /
+registrar_baja / registrar_edicion / registrar_lote dentro de la misma
+transacción de base de datos (igual que con utils/resumen_mensual.py). Sólo
+se tocan los presupuestos del usuario cuya categoría y rango de fechas
+incluyen la transacción: su monto_usado se ajusta con un UPDATE atómico
+(monto_usado = monto_usado + delta), sin volver a sumar transacciones.
+
+Cuando un presupuesto sube de nivel (normal → proximo_exceder → excedido)
+se crean un AlertaPresupuesto y una Notificacion. El nivel vigente se guarda
+en presupuestos.nivel_alerta y se cambia con un UPDATE condicionado al
+nivel anterior, así que cada cruce de umbral genera una sola alerta aunque
+haya escrituras concurrentes. Si el nivel baja (edición o borrado) se
+actualiza sin avisar, y un nuevo cruce vuelve a avisar.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from models.BD import AlertaPresupuesto, Notificacion, Presupuesto
+from utils import eventos
+from utils.resumen_mensual import valores_resumen
+from utils.evaluacion_presupuestos import (
+    EXCEDIDO, NORMAL, PROXIMO_EXCEDER, clasificar, expresion_monto_usado, porcentaje
+)
+
+RANGO_NIVEL = {NORMAL: 0, PROXIMO_EXCEDER: 1, EXCEDIDO: 2}
+
+
+def mensaje_alerta(nombre: str, nivel: str, usado: Decimal, total: Decimal) -> str:
+    usado_pct = porcentaje(usado, total)
+    if nivel == EXCEDIDO:
+        return f"Excediste el presupuesto '{nombre}': llevas ${usado:,.2f} de ${total:,.2f} ({usado_pct:.0f}%)"
+    return f"El presupuesto '{nombre}' está por agotarse: llevas ${usado:,.2f} de ${total:,.2f} ({usado_pct:.0f}%)"
+
+
+def _deltas_por_presupuesto(db: Session, movimientos: Iterable[dict]) -> Dict[int, Decimal]:
+    """
+    Sumar cada movimiento (usuario_id, categoria_id, fecha, monto con signo)
+    a los presupuestos que lo incluyen, con una sola consulta de candidatos
+    (usuarios × categorías × rango de fechas del lote) filtrada aquí.
+    """
+    por_clave = defaultdict(list)
+    for movimiento in movimientos:
+        if movimiento["fecha"] is None or not movimiento["monto"]:
+            continue
+        por_clave[(movimiento["usuario_id"], movimiento["categoria_id"])].append(movimiento)
+    if not por_clave:
+        return {}
+
+    fechas = [m["fecha"] for grupo in por_clave.values() for m in grupo]
+    candidatos = db.execute(select(
+        Presupuesto.id, Presupuesto.usuario_id, Presupuesto.categoria_id,
+        Presupuesto.fecha_inicio, Presupuesto.fecha_fin
+    ).where(
+        Presupuesto.usuario_id.in_({usuario_id for usuario_id, _ in por_clave}),
+        Presupuesto.categoria_id.in_({categoria_id for _, categoria_id in por_clave}),
+        Presupuesto.fecha_inicio <= max(fechas),
+        Presupuesto.fecha_fin >= min(fechas),
+    )).all()
+
+    deltas = defaultdict(Decimal)
+    for candidato in candidatos:
+        for movimiento in por_clave.get((candidato.usuario_id, candidato.categoria_id), ()):
+            if candidato.fecha_inicio <= movimiento["fecha"] <= candidato.fecha_fin:
+                deltas[candidato.id] += Decimal(str(movimiento["monto"]))
+    return {presupuesto_id: delta for presupuesto_id, delta in deltas.items() if delta}
+
+
+def _aplicar(db: Session, movimientos: Iterable[dict]):
+    deltas = _deltas_por_presupuesto(db, movimientos)
+    if not deltas:
+        return
+    db.connection().execute(
+        update(Presupuesto.__table__)
+        .where(Presupuesto.__table__.c.id == bindparam("p_id"))
+        .values(monto_usado=Presupuesto.__table__.c.monto_usado + bindparam("p_delta")),
+        [{"p_id": presupuesto_id, "p_delta": delta} for presupuesto_id, delta in deltas.items()]
+    )
+    actualizar_niveles(db, list(deltas))
+
+
+def actualizar_niveles(db: Session, presupuesto_ids: list) -> int:
+    """Reclasificar presupuestos ya actualizados y emitir alertas al subir de nivel. Devuelve las alertas"""
+    if not presupuesto_ids:
+        return 0
+    filas = db.execute(select(
+        Presupuesto.id, Presupuesto.usuario_id, Presupuesto.nombre,
+        Presupuesto.monto_total, Presupuesto.monto_usado, Presupuesto.nivel_alerta
+    ).where(Presupuesto.id.in_(presupuesto_ids))).all()
+
+    alertas = 0
+    for fila in filas:
+        usado, total = Decimal(fila.monto_usado), Decimal(fila.monto_total)
+        nivel = clasificar(porcentaje(usado, total))
+        if nivel == fila.nivel_alerta:
+            continue
+        cambio = db.execute(
+            update(Presupuesto)
+            .where(Presupuesto.id == fila.id, Presupuesto.nivel_alerta == fila.nivel_alerta)
+            .values(nivel_alerta=nivel)
+            .execution_options(synchronize_session=False)
+        )
+        if cambio.rowcount == 1 and RANGO_NIVEL[nivel] > RANGO_NIVEL[fila.nivel_alerta]:
+            mensaje = mensaje_alerta(fila.nombre, nivel, usado, total)
+            db.add(AlertaPresupuesto(presupuesto_id=fila.id, mensaje=mensaje))
+            db.add(Notificacion(usuario_id=fila.usuario_id, mensaje=mensaje))
+            eventos.notificacion_nueva(db, fila.usuario_id, mensaje)
+            alertas += 1
+    return alertas
+
+
+def _movimiento(valores: dict, signo: int) -> dict:
+    return {
+        "usuario_id": valores["usuario_id"],
+        "categoria_id": valores["categoria_id"],
+        "fecha": valores["fecha"],
+        "monto": Decimal(str(valores["monto"])) * signo,
+    }
+
+
+def registrar_alta(db: Session, transaccion):
+    _aplicar(db, [_movimiento(valores_resumen(transaccion), 1)])
+
+
+def registrar_baja(db: Session, transaccion):
+    _aplicar(db, [_movimiento(valores_resumen(transaccion), -1)])
+
+
+def registrar_edicion(db: Session, anteriores: dict, transaccion):
+    """`anteriores` = resumen_mensual.valores_resumen(transaccion) antes de editar"""
+    nuevos = valores_resumen(transaccion)
+    if anteriores == nuevos:
+        return
+    _aplicar(db, [_movimiento(anteriores, -1), _movimiento(nuevos, 1)])
+
+
+def registrar_lote(db: Session, filas: list):
+    """Filas nuevas de una importación: un UPDATE por presupuesto afectado, no por fila"""
+    _aplicar(db, [_movimiento(fila, 1) for fila in filas])
+
+
+def recalcular(db: Session, presupuesto_id: int):
+    """Recalcular monto_usado de un presupuesto (creado, o con categoría/rango/monto cambiados)"""
+    db.execute(
+        update(Presupuesto)
+        .where(Presupuesto.id == presupuesto_id)
+        .values(monto_usado=expresion_monto_usado())
+        .execution_options(synchronize_session=False)
+    )
+    actualizar_niveles(db, [presupuesto_id])
+
+
+def reconstruir(db: Session, usuario_id: Optional[int] = None) -> int:
+    """Recalcular monto_usado y nivel de todos los presupuestos (o de un usuario) sin emitir alertas"""
+    consulta = update(Presupuesto).values(monto_usado=expresion_monto_usado())
+    if usuario_id is not None:
+        consulta = consulta.where(Presupuesto.usuario_id == usuario_id)
+    resultado = db.execute(consulta.execution_options(synchronize_session=False))
+
+    niveles = select(Presupuesto.id, Presupuesto.monto_total, Presupuesto.monto_usado, Presupuesto.nivel_alerta)
+    if usuario_id is not None:
+        niveles = niveles.where(Presupuesto.usuario_id == usuario_id)
+    filas = db.execute(niveles).all()
+    cambios = [
+        {"p_id": fila.id, "p_nivel": nivel}
+        for fila in filas
+        if (nivel := clasificar(porcentaje(Decimal(fila.monto_usado), Decimal(fila.monto_total)))) != fila.nivel_alerta
+    ]
+    if cambios:
+        db.connection().execute(
+            update(Presupuesto.__table__)
+            .where(Presupuesto.__table__.c.id == bindparam("p_id"))
+            .values(nivel_alerta=bindparam("p_nivel")),
+            cambios
+        )
+    db.commit()
+    return resultado.rowcount
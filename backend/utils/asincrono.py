@@ -0,0 +1,122 @@
+"""
+Versiones asíncronas de los routers existentes (DB_ASYNC=true).
+
+Cada endpoint síncrono se reexpone como `async def`: la dependencia get_db
+se sustituye por una AsyncSession y el cuerpo original se ejecuta con
+`AsyncSession.run_sync`, de modo que las consultas usan el driver asíncrono
+y no ocupan un hilo del threadpool mientras esperan a la base de datos.
+La lógica de cada ruta sigue viviendo en un solo lugar.
+
+Ojo: `run_sync` ejecuta todo el cuerpo del endpoint en el event loop, así que
+cualquier trabajo bloqueante que no sea de base de datos frenaría a todas las
+conexiones. Los endpoints marcados con `@bloqueante` (CPU o archivos: parseo
+de importaciones, cálculos con numpy) y, cuando la caché o el bus de eventos
+usan Redis (cliente síncrono), los marcados con `@bloqueante_con_redis` se
+quedan en su versión síncrona, en el threadpool y con Session.
+"""
+import inspect
+
+from fastapi import APIRouter, Depends, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db, get_db
+from utils.auth import obtener_usuario_actual, obtener_usuario_actual_async
+from utils.cache import CACHE_BACKEND
+from utils.eventos import EVENTOS_BACKEND
+
+# Dependencias síncronas → equivalente asíncrono
+REEMPLAZOS = {
+    get_db: get_async_db,
+    obtener_usuario_actual: obtener_usuario_actual_async,
+}
+
+
+def usa_redis() -> bool:
+    """La caché compartida o el bus de eventos hablan con Redis"""
+    return CACHE_BACKEND == "redis" or EVENTOS_BACKEND == "redis"
+
+
+def bloqueante(endpoint):
+    """Marca un endpoint con trabajo bloqueante fuera de la base de datos: se sirve siempre en el threadpool"""
+    endpoint.bloqueante = lambda: True
+    return endpoint
+
+
+def bloqueante_con_redis(endpoint):
+    """Marca un endpoint que usa el contador en caché o publica eventos: en el threadpool si son de Redis"""
+    endpoint.bloqueante = usa_redis
+    return endpoint
+
+
+def _en_threadpool(ruta: APIRoute) -> bool:
+    condicion = getattr(ruta.endpoint, "bloqueante", None)
+    return condicion is not None and condicion()
+
+
+def _firma_asincrona(firma: inspect.Signature) -> inspect.Signature:
+    parametros = []
+    for parametro in firma.parameters.values():
+        dependencia = getattr(parametro.default, "dependency", None)
+        if dependencia in REEMPLAZOS:
+            parametro = parametro.replace(default=Depends(REEMPLAZOS[dependencia]))
+            if dependencia is get_db:
+                parametro = parametro.replace(annotation=AsyncSession)
+        parametros.append(parametro)
+    return firma.replace(parameters=parametros)
+
+
+def _endpoint_asincrono(ruta: APIRoute):
+    endpoint = ruta.endpoint
+    firma = inspect.signature(endpoint)
+    nombre_db = next(
+        (nombre for nombre, p in firma.parameters.items() if getattr(p.default, "dependency", None) is get_db),
+        None
+    )
+    # La respuesta se valida dentro de run_sync: las cargas perezosas del ORM no pueden salir del greenlet
+    adaptador = TypeAdapter(ruta.response_model) if ruta.response_model else None
+
+    def ejecutar(sesion, argumentos):
+        resultado = endpoint(**{**argumentos, nombre_db: sesion})
+        if adaptador is not None and not isinstance(resultado, Response):
+            resultado = adaptador.validate_python(resultado, from_attributes=True)
+        return resultado
+
+    async def endpoint_async(**argumentos):
+        if nombre_db is None:
+            return await run_in_threadpool(endpoint, **argumentos)
+        return await argumentos[nombre_db].run_sync(ejecutar, argumentos)
+
+    endpoint_async.__name__ = endpoint.__name__
+    endpoint_async.__doc__ = endpoint.__doc__
+    endpoint_async.__signature__ = _firma_asincrona(firma)
+    return endpoint_async
+
+
+def version_asincrona(router: APIRouter) -> APIRouter:
+    """Copia de `router` con cada endpoint (salvo los bloqueantes) ejecutándose sobre AsyncSession"""
+    asincrono = APIRouter()
+    for ruta in router.routes:
+        if not isinstance(ruta, APIRoute) or _en_threadpool(ruta):
+            asincrono.routes.append(ruta)
+            continue
+        asincrono.add_api_route(
+            ruta.path,
+            _endpoint_asincrono(ruta),
+            methods=list(ruta.methods),
+            response_model=ruta.response_model,
+            status_code=ruta.status_code,
+            tags=ruta.tags,
+            dependencies=ruta.dependencies,
+            summary=ruta.summary,
+            description=ruta.description,
+            response_description=ruta.response_description,
+            responses=ruta.responses,
+            deprecated=ruta.deprecated,
+            name=ruta.name,
+            include_in_schema=ruta.include_in_schema,
+            response_class=ruta.response_class,
+        )
+    return asincrono
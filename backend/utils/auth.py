@@ -1,31 +1,111 @@
-from fastapi import Depends, HTTPException, Request
+import logging
+import re
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, get_async_db, get_db
 from models.BD import Usuario
-from utils.jwt import verificar_token
+from utils.cache_usuarios import UsuarioActual, cache_usuarios
+from utils.jwt import USO_EVENTOS, verificar_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+oauth2_opcional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def obtener_usuario_actual(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _verificar(token: str) -> dict:
     payload = verificar_token(token)
     if payload is None:
         raise HTTPException(status_code=401, detail="Token inválido")
-    
-    usuario = db.query(Usuario).filter(Usuario.id == int(payload.get("sub"))).first()
+    return payload
+
+def _recordar(token: str, payload: dict, usuario) -> UsuarioActual:
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    actual = UsuarioActual.desde_modelo(usuario)
+    cache_usuarios.guardar(token, payload, actual)
+    return actual
+
+def obtener_usuario_actual(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UsuarioActual:
+    """
+    Usuario autenticado como UsuarioActual (copia sin sesión).
+
+    Los tokens ya verificados se sirven desde cache_usuarios sin tocar la
+    base de datos; las rutas que necesiten modificar al usuario deben cargar
+    la fila con db.get(Usuario, usuario.id).
+    """
+    entrada = cache_usuarios.obtener(token)
+    if entrada is not None:
+        return entrada.usuario
+
+    payload = _verificar(token)
+    return _recordar(token, payload, db.get(Usuario, int(payload.get("sub"))))
+
+def obtener_administrador(usuario: UsuarioActual = Depends(obtener_usuario_actual)) -> UsuarioActual:
+    """Usuario autenticado con rol admin (403 para el resto)"""
+    if usuario.rol != "admin":
+        raise HTTPException(status_code=403, detail="Solo un administrador puede acceder")
     return usuario
 
+async def obtener_usuario_actual_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """Versión de obtener_usuario_actual para los routers asíncronos (DB_ASYNC=true)"""
+    entrada = cache_usuarios.obtener(token)
+    if entrada is not None:
+        return entrada.usuario
+
+    payload = _verificar(token)
+    return _recordar(token, payload, await db.get(Usuario, int(payload.get("sub"))))
+
 async def get_token_actual(request: Request) -> str:
     token = request.headers.get("Authorization")
     if not token:
         raise HTTPException(status_code=401, detail="Token no encontrado")
-    return token
\ No newline at end of file
+    return token
+
+def _cargar_usuario(usuario_id: int):
+    with SessionLocal() as db:
+        return db.get(Usuario, usuario_id)
+
+async def obtener_usuario_stream(token: Optional[str] = Depends(oauth2_opcional), token_query: Optional[str] = Query(None, alias="token")):
+    """
+    Usuario autenticado para conexiones largas (GET /eventos).
+
+    Acepta el token de acceso en el header Authorization o, como EventSource
+    no permite headers, un token de eventos en ?token= (POST /eventos/token).
+    Una URL termina en logs de acceso, de proxies y en el historial, así que
+    por ahí nunca se acepta el token de acceso: sólo uno que vence en
+    EVENTOS_TOKEN_EXPIRE_SECONDS y no sirve para ninguna otra ruta (y el log
+    de uvicorn lo oculta, ver FiltroTokenEnAccesos). Sólo se verifica al
+    conectar. No retiene una sesión de base de datos mientras dura la conexión.
+    """
+    if token:
+        entrada = cache_usuarios.obtener(token)
+        if entrada is not None:
+            return entrada.usuario
+        payload = _verificar(token)
+        return _recordar(token, payload, await run_in_threadpool(_cargar_usuario, int(payload.get("sub"))))
+
+    if not token_query:
+        raise HTTPException(status_code=401, detail="Token no encontrado")
+    payload = verificar_token(token_query, uso=USO_EVENTOS)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Token de eventos inválido o vencido")
+    # No se guarda en cache_usuarios: allí valdría como token de acceso
+    usuario = await run_in_threadpool(_cargar_usuario, int(payload.get("sub")))
+    if not usuario:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return UsuarioActual.desde_modelo(usuario)
+
+_TOKEN_EN_URL = re.compile(r"([?&]token=)[^&\s]*")
+
+class FiltroTokenEnAccesos(logging.Filter):
+    """Reemplaza el valor de ?token= por *** en las líneas del log de accesos (uvicorn.access)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _TOKEN_EN_URL.sub(r"\1***", arg) if isinstance(arg, str) else arg for arg in record.args
+            )
+        return True
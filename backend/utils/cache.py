@@ -0,0 +1,260 @@
+"""
+Caché compartida de la aplicación con backends intercambiables.
+
+Interfaz común (claves str, TTL en segundos, etiquetas para invalidar en
+grupo):
+    obtener(clave) / guardar(clave, valor, ttl, etiquetas) / borrar(clave)
+    invalidar_etiqueta(etiqueta) / incrementar(clave, cantidad)
+
+El backend se elige con CACHE_BACKEND:
+  memoria  LRU acotado (CACHE_MAX entradas) dentro del proceso; suficiente
+           con un solo worker, sin dependencias
+  redis    servidor Redis (o compatible) en CACHE_URL, compartido por todos
+           los workers; requiere el paquete `redis`. El tamaño lo acota el
+           servidor (maxmemory / maxmemory-policy allkeys-lru)
+
+Los valores se guardan tal cual en memoria y serializados con pickle en
+Redis, así que deben ser objetos inmutables y del propio proceso (tuplas,
+NamedTuple, bytes, números).
+"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria").lower()
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_PREFIJO = os.getenv("CACHE_PREFIJO", "lana:")
+CACHE_MAX = int(os.getenv("CACHE_MAX", "20000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+# Vida de los SET de etiquetas en Redis: debe ser al menos el TTL de cualquier entrada con etiquetas
+CACHE_TTL_ETIQUETAS = float(os.getenv("CACHE_TTL_ETIQUETAS", "86400"))
+
+
+class CacheMemoria:
+    """LRU con TTL por entrada; las etiquetas se indexan para invalidar en grupo"""
+
+    def __init__(self, maximo: int = CACHE_MAX, ttl: float = CACHE_TTL):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()  # clave -> (valor, expira, etiquetas)
+        self._por_etiqueta: dict = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[1] is not None and entrada[1] <= time.monotonic():
+                self._quitar(clave)
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave: str, valor: Any, ttl: Optional[float] = None, etiquetas: Iterable[str] = ()):
+        """Guardar `valor`; ttl=None usa el TTL por defecto y ttl=0 no expira"""
+        ttl = self.ttl if ttl is None else ttl
+        etiquetas = tuple(etiquetas)
+        with self._lock:
+            self._quitar(clave)
+            self._entradas[clave] = (valor, time.monotonic() + ttl if ttl else None, etiquetas)
+            for etiqueta in etiquetas:
+                self._por_etiqueta.setdefault(etiqueta, set()).add(clave)
+            while len(self._entradas) > self.maximo:
+                self._quitar(next(iter(self._entradas)))
+                self.expulsiones += 1
+
+    def borrar(self, clave: str):
+        with self._lock:
+            self._quitar(clave)
+
+    def invalidar_etiqueta(self, etiqueta: str) -> int:
+        with self._lock:
+            claves = list(self._por_etiqueta.get(etiqueta, ()))
+            for clave in claves:
+                self._quitar(clave)
+            return len(claves)
+
+    def incrementar(self, clave: str, cantidad: int = 1) -> int:
+        """Contador atómico sin expiración (empieza en 0 si no existe)"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            valor = (entrada[0] if entrada is not None else 0) + cantidad
+            self._entradas[clave] = (valor, None, entrada[2] if entrada is not None else ())
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._quitar(next(iter(self._entradas)))
+                self.expulsiones += 1
+            return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_etiqueta.clear()
+
+    def cerrar(self):
+        pass
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "backend": "memoria",
+                "entradas": len(self._entradas),
+                "maximo": self.maximo,
+                "ttl_segundos": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0,
+            }
+
+    def _quitar(self, clave: str):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
+            return
+        for etiqueta in entrada[2]:
+            claves = self._por_etiqueta.get(etiqueta)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_etiqueta[etiqueta]
+
+
+class CacheRedis:
+    """
+    Backend sobre el protocolo Redis.
+
+    Cada etiqueta es un SET con las claves que la llevan; cada guardar le
+    renueva la vida a CACHE_TTL_ETIQUETAS (o al TTL de la entrada, si es
+    mayor) con un PEXPIRE simple, sin las opciones GT/NX de Redis 7, así que
+    el SET dura al menos tanto como sus entradas en cualquier servidor RESP2.
+    Los errores de conexión se tratan como fallos de caché: la aplicación
+    sigue funcionando sin ella.
+    """
+
+    def __init__(self, url: str = CACHE_URL, prefijo: str = CACHE_PREFIJO, ttl: float = CACHE_TTL, cliente=None,
+                 ttl_etiquetas: float = CACHE_TTL_ETIQUETAS):
+        if cliente is None:
+            if redis is None:
+                raise RuntimeError("CACHE_BACKEND=redis requiere el paquete 'redis' (pip install redis)")
+            # RESP2: lo entienden todos los servidores compatibles, incluso sin HELLO
+            cliente = redis.Redis.from_url(url, protocol=2, socket_timeout=1, socket_connect_timeout=1)
+        self.cliente = cliente
+        self.url = url
+        self.prefijo = prefijo
+        self.ttl = ttl
+        self.ttl_etiquetas = ttl_etiquetas
+        self.aciertos = 0
+        self.fallos = 0
+        self.errores = 0
+
+    def _clave(self, clave: str) -> str:
+        return self.prefijo + clave
+
+    def _etiqueta(self, etiqueta: str) -> str:
+        return f"{self.prefijo}etiqueta:{etiqueta}"
+
+    def _error(self, operacion: str, error: Exception):
+        self.errores += 1
+        print(f"⚠️ Caché Redis no disponible ({operacion}): {str(error)}")
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        try:
+            crudo = self.cliente.get(self._clave(clave))
+        except redis.RedisError as e:
+            self._error("obtener", e)
+            return None
+        if crudo is None:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        # Los contadores de incrementar() son enteros planos; el resto va con pickle
+        return pickle.loads(crudo) if crudo.startswith(b"\x80") else int(crudo)
+
+    def guardar(self, clave: str, valor: Any, ttl: Optional[float] = None, etiquetas: Iterable[str] = ()):
+        ttl = self.ttl if ttl is None else ttl
+        milisegundos = int(ttl * 1000) if ttl else None
+        try:
+            tuberia = self.cliente.pipeline(transaction=False)
+            tuberia.set(self._clave(clave), pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), px=milisegundos)
+            for etiqueta in etiquetas:
+                tuberia.sadd(self._etiqueta(etiqueta), clave)
+                if milisegundos:
+                    tuberia.pexpire(self._etiqueta(etiqueta), max(milisegundos, int(self.ttl_etiquetas * 1000)))
+                else:
+                    tuberia.persist(self._etiqueta(etiqueta))
+            tuberia.execute()
+        except redis.RedisError as e:
+            self._error("guardar", e)
+
+    def borrar(self, clave: str):
+        try:
+            self.cliente.delete(self._clave(clave))
+        except redis.RedisError as e:
+            self._error("borrar", e)
+
+    def invalidar_etiqueta(self, etiqueta: str) -> int:
+        try:
+            claves = [c.decode() for c in self.cliente.smembers(self._etiqueta(etiqueta))]
+            self.cliente.delete(*[self._clave(c) for c in claves], self._etiqueta(etiqueta))
+            return len(claves)
+        except redis.RedisError as e:
+            self._error("invalidar_etiqueta", e)
+            return 0
+
+    def incrementar(self, clave: str, cantidad: int = 1) -> Optional[int]:
+        """INCRBY; None si el servidor no responde"""
+        try:
+            return self.cliente.incrby(self._clave(clave), cantidad)
+        except redis.RedisError as e:
+            self._error("incrementar", e)
+            return None
+
+    def limpiar(self):
+        try:
+            claves = list(self.cliente.scan_iter(match=self.prefijo + "*", count=1000))
+            for inicio in range(0, len(claves), 1000):
+                self.cliente.delete(*claves[inicio:inicio + 1000])
+        except redis.RedisError as e:
+            self._error("limpiar", e)
+
+    def cerrar(self):
+        self.cliente.close()
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "backend": "redis",
+            "url": self.url.split("@")[-1],
+            "prefijo": self.prefijo,
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "errores": self.errores,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0,
+        }
+
+
+def crear_cache(nombre: str = CACHE_BACKEND):
+    if nombre == "memoria":
+        return CacheMemoria()
+    if nombre == "redis":
+        return CacheRedis()
+    raise ValueError(f"CACHE_BACKEND desconocido: {nombre}")
+
+
+cache = crear_cache()
@@ -0,0 +1,146 @@
+"""
+Catálogo de categorías en memoria.
+
+`categorias` casi nunca cambia, así que se carga una vez (al arrancar o en
+la primera consulta) y se sirve desde memoria a los endpoints de catálogo y
+a las validaciones de transacciones. Se recarga cuando vence
+CATEGORIAS_CACHE_TTL o cuando una sesión de este proceso confirma un
+cambio en alguna Categoria; los cambios hechos por fuera (SQL directo, otro
+proceso) se ven como mucho tras el TTL, o llamando a `invalidar()`.
+
+Cada carga tiene una versión (hash del contenido) que sirve de ETag.
+"""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.BD import Categoria
+
+CATEGORIAS_CACHE_TTL = float(os.getenv("CATEGORIAS_CACHE_TTL", "300"))
+
+
+@dataclass(frozen=True)
+class CategoriaCacheada:
+    id: int
+    nombre: str
+    tipo: str
+    descripcion: Optional[str] = None
+
+    @classmethod
+    def desde_modelo(cls, categoria) -> "CategoriaCacheada":
+        return cls(
+            id=categoria.id,
+            nombre=categoria.nombre,
+            tipo=categoria.tipo,
+            descripcion=getattr(categoria, "descripcion", None),
+        )
+
+
+@dataclass(frozen=True)
+class Instantanea:
+    categorias: Tuple[CategoriaCacheada, ...]
+    por_id: Dict[int, CategoriaCacheada]
+    por_nombre: Dict[str, CategoriaCacheada]
+    version: str
+    expira: float  # time.monotonic()
+
+    def etag(self, vista: str) -> str:
+        return f'"categorias-{self.version}-{vista}"'
+
+    def de_tipo(self, tipo: Optional[str] = None) -> list:
+        return [c for c in self.categorias if tipo is None or c.tipo == tipo]
+
+
+class CatalogoCategorias:
+    def __init__(self, ttl: float = CATEGORIAS_CACHE_TTL):
+        self.ttl = ttl
+        self._instantanea: Optional[Instantanea] = None
+        self._lock = threading.Lock()
+        self.cargas = 0
+        self.aciertos = 0
+
+    def obtener(self, db: Session) -> Instantanea:
+        """Instantánea vigente; la recarga con `db` si no hay o venció"""
+        instantanea = self._instantanea
+        if instantanea is not None and instantanea.expira > time.monotonic():
+            self.aciertos += 1
+            return instantanea
+        return self.cargar(db)
+
+    def cargar(self, db: Session) -> Instantanea:
+        with self._lock:
+            # Otro hilo pudo recargarla mientras se esperaba el lock
+            instantanea = self._instantanea
+            if instantanea is not None and instantanea.expira > time.monotonic():
+                return instantanea
+
+            categorias = tuple(
+                CategoriaCacheada.desde_modelo(c)
+                for c in db.query(Categoria).order_by(Categoria.id).all()
+            )
+            huella = hashlib.sha1(repr(categorias).encode()).hexdigest()[:16]
+            instantanea = Instantanea(
+                categorias=categorias,
+                por_id={c.id: c for c in categorias},
+                por_nombre={(c.nombre or "").strip().lower(): c for c in categorias},
+                version=huella,
+                expira=time.monotonic() + self.ttl,
+            )
+            self._instantanea = instantanea
+            self.cargas += 1
+            return instantanea
+
+    def por_id(self, db: Session, categoria_id: int) -> Optional[CategoriaCacheada]:
+        return self.obtener(db).por_id.get(categoria_id)
+
+    def invalidar(self):
+        self._instantanea = None
+
+    def estadisticas(self) -> dict:
+        instantanea = self._instantanea
+        return {
+            "categorias": len(instantanea.categorias) if instantanea else 0,
+            "version": instantanea.version if instantanea else None,
+            "ttl_segundos": self.ttl,
+            "cargas": self.cargas,
+            "aciertos": self.aciertos,
+        }
+
+
+catalogo_categorias = CatalogoCategorias()
+
+
+def precargar():
+    """Cargar el catálogo al arrancar; si la base no responde se cargará en la primera consulta"""
+    try:
+        with SessionLocal() as db:
+            instantanea = catalogo_categorias.cargar(db)
+        print(f"✅ Catálogo de categorías cargado ({len(instantanea.categorias)} categorías)")
+    except SQLAlchemyError as e:
+        print(f"⚠️ No se pudo precargar el catálogo de categorías: {str(e)}")
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_cambios(sesion, contexto):
+    if any(isinstance(objeto, Categoria) for objeto in (*sesion.new, *sesion.dirty, *sesion.deleted)):
+        sesion.info["categorias_modificadas"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_tras_commit(sesion):
+    # Invalidar tras el commit: recargar antes podría volver a leer los datos viejos
+    if sesion.info.pop("categorias_modificadas", False):
+        catalogo_categorias.invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_marca(sesion):
+    sesion.info.pop("categorias_modificadas", None)
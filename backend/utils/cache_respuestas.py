@@ -0,0 +1,238 @@
+"""
+Caché de respuestas GET por usuario y GET condicional (ETag / 304).
+
+MiddlewareCacheRespuestas guarda el cuerpo de las respuestas 200 de las
+rutas de lectura en RUTAS_CACHEABLES con la clave
+(usuario, versión de datos, ruta, parámetros, día). Como la versión sube
+con cada escritura del usuario (utils.version_datos), una entrada nunca se
+sirve después de un cambio: simplemente deja de encontrarse. El día forma
+parte de la clave porque varios resúmenes dependen de date.today().
+
+Las respuestas llevan un ETag derivado de la misma clave; si el cliente lo
+reenvía en If-None-Match y la entrada sigue en caché se responde 304 sin
+ejecutar la ruta.
+
+Las peticiones autenticadas que no son GET/HEAD a rutas de datos
+(RUTAS_ESCRITURA) y terminan con estado < 400 incrementan la versión del
+usuario, igual que los GET que escriben (RUTAS_GET_CON_ESCRITURA); el
+login, el perfil o soporte no tocan lo que se cachea y no la cambian. Respuestas y versiones viven en utils.cache:
+con CACHE_BACKEND=redis las comparten todos los workers; con el backend en
+memoria cada worker tiene las suyas y RESPONSE_CACHE_TTL acota cuánto
+puede servirse una respuesta anterior a una escritura atendida por otro.
+
+El middleware es asíncrono y corre en el event loop: la decodificación del
+JWT y cada llamada a la caché o a las versiones (un viaje de red con Redis)
+se ejecutan en el threadpool, para que un backend lento no detenga las
+demás conexiones ni los streams SSE.
+"""
+import hashlib
+import os
+from datetime import date
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi.concurrency import run_in_threadpool
+
+from utils.cache import cache
+from utils.cache_usuarios import cache_usuarios
+from utils.etag import CACHE_CONTROL_REVALIDAR, coincide_etag
+from utils.jwt import verificar_token
+from utils.version_datos import etiqueta_usuario, versiones_datos
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(256 * 1024)))
+
+# Prefijos de rutas GET que sólo leen datos del usuario autenticado
+RUTAS_CACHEABLES = (
+    "/dashboard",
+    "/graficas/",
+    "/analytics/",
+    "/notificaciones/contador-no-leidas",
+    "/presupuestos/resumen",
+    "/presupuestos/alertas",
+)
+# GET que modifican datos: nunca se cachean e incrementan la versión
+RUTAS_GET_CON_ESCRITURA = (
+    "/notificaciones/marcar-todas-leidas",
+)
+# Prefijos cuyas escrituras cambian datos que leen las rutas cacheables
+RUTAS_ESCRITURA = (
+    "/transacciones",
+    "/transactions",
+    "/presupuestos",
+    "/pagos-fijos",
+    "/notificaciones",
+)
+# Rutas exactas con el mismo efecto ("/" es el alias de POST /presupuestos)
+RUTAS_ESCRITURA_EXACTAS = ("/",)
+
+
+class RespuestaCacheada(NamedTuple):
+    etag: str
+    headers: list
+    cuerpo: bytes
+
+
+class CacheRespuestas:
+    """Respuestas guardadas en la caché compartida, etiquetadas por usuario"""
+
+    def __init__(self, backend=cache, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self.no_modificados = 0
+
+    def obtener(self, clave: str) -> Optional[RespuestaCacheada]:
+        entrada = self.backend.obtener("respuesta:" + clave)
+        if entrada is None:
+            self.fallos += 1
+        else:
+            self.aciertos += 1
+        return entrada
+
+    def guardar(self, usuario_id: int, clave: str, etag: str, headers: list, cuerpo: bytes):
+        if self.ttl <= 0:
+            return
+        self.backend.guardar(
+            "respuesta:" + clave, RespuestaCacheada(etag, headers, cuerpo),
+            ttl=self.ttl, etiquetas=[etiqueta_usuario(usuario_id)]
+        )
+
+    def invalidar_usuario(self, usuario_id: int):
+        self.backend.invalidar_etiqueta(etiqueta_usuario(usuario_id))
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "no_modificados": self.no_modificados,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0,
+            "backend": self.backend.estadisticas(),
+        }
+
+
+cache_respuestas = CacheRespuestas()
+
+
+def usuario_de_la_peticion(scope) -> Optional[int]:
+    """Id del usuario del header Authorization (sin consultar la base de datos), o None"""
+    autorizacion = next((valor for nombre, valor in scope["headers"] if nombre == b"authorization"), b"")
+    esquema, _, token = autorizacion.decode("latin-1").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return None
+    entrada = cache_usuarios.obtener(token)
+    if entrada is not None:
+        return entrada.usuario.id
+    payload = verificar_token(token)
+    try:
+        return int(payload["sub"]) if payload else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def clave_respuesta(usuario_id: int, ruta: str, query_string: bytes, versiones=versiones_datos) -> Optional[str]:
+    """Clave de caché de la petición; None si no se conoce la versión de datos del usuario"""
+    version = versiones.actual(usuario_id)
+    if version is None:
+        return None
+    parametros = urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+    return f"{usuario_id}|{version}|{date.today().isoformat()}|{ruta}?{parametros}"
+
+
+def etag_de_clave(clave: str) -> str:
+    return 'W/"' + hashlib.sha1(clave.encode()).hexdigest()[:20] + '"'
+
+
+class MiddlewareCacheRespuestas:
+    def __init__(self, app, cache: CacheRespuestas = cache_respuestas, rutas=RUTAS_CACHEABLES,
+                 rutas_get_con_escritura=RUTAS_GET_CON_ESCRITURA, rutas_escritura=RUTAS_ESCRITURA,
+                 rutas_escritura_exactas=RUTAS_ESCRITURA_EXACTAS, max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+                 versiones=versiones_datos):
+        self.app = app
+        self.cache = cache
+        self.versiones = versiones
+        self.rutas = tuple(rutas)
+        self.rutas_get_con_escritura = tuple(rutas_get_con_escritura)
+        self.rutas_escritura = tuple(rutas_escritura)
+        self.rutas_escritura_exactas = frozenset(rutas_escritura_exactas)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metodo, ruta = scope["method"], scope["path"]
+        if metodo in ("GET", "HEAD", "OPTIONS"):
+            escritura = ruta.startswith(self.rutas_get_con_escritura)
+        else:
+            escritura = ruta.startswith(self.rutas_escritura) or ruta in self.rutas_escritura_exactas
+        cacheable = metodo == "GET" and not escritura and ruta.startswith(self.rutas)
+        if not (escritura or cacheable):
+            return await self.app(scope, receive, send)
+
+        usuario_id = await run_in_threadpool(usuario_de_la_peticion, scope)
+        if usuario_id is None:
+            return await self.app(scope, receive, send)
+        if escritura:
+            return await self._escritura(usuario_id, scope, receive, send)
+        return await self._lectura_cacheable(usuario_id, scope, receive, send)
+
+    async def _escritura(self, usuario_id: int, scope, receive, send):
+        async def enviar(mensaje):
+            # Subir la versión antes de que el cliente reciba la respuesta
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400:
+                await run_in_threadpool(self.versiones.incrementar, usuario_id)
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+    async def _lectura_cacheable(self, usuario_id: int, scope, receive, send):
+        clave = await run_in_threadpool(clave_respuesta, usuario_id, scope["path"], scope["query_string"], self.versiones)
+        if clave is None:
+            return await self.app(scope, receive, send)
+        if_none_match = next((v.decode("latin-1") for n, v in scope["headers"] if n == b"if-none-match"), None)
+
+        entrada = await run_in_threadpool(self.cache.obtener, clave)
+        if entrada is not None:
+            if coincide_etag(if_none_match, entrada.etag):
+                self.cache.no_modificados += 1
+                await send({"type": "http.response.start", "status": 304, "headers": [
+                    (b"etag", entrada.etag.encode()), (b"cache-control", CACHE_CONTROL_REVALIDAR.encode()),
+                ]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({"type": "http.response.start", "status": 200, "headers": entrada.headers})
+            await send({"type": "http.response.body", "body": entrada.cuerpo})
+            return
+
+        etag = etag_de_clave(clave)
+        estado = {"guardar": False, "headers": None, "partes": [], "bytes": 0}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                headers = [(n, v) for n, v in mensaje.get("headers", []) if n.lower() not in (b"etag", b"cache-control")]
+                tipo = next((v for n, v in headers if n.lower() == b"content-type"), b"")
+                if mensaje["status"] == 200 and tipo.startswith(b"application/json"):
+                    headers += [
+                        (b"etag", etag.encode()),
+                        (b"cache-control", CACHE_CONTROL_REVALIDAR.encode()),
+                        (b"vary", b"Authorization"),
+                    ]
+                    estado["guardar"] = True
+                    mensaje = {**mensaje, "headers": headers}
+                estado["headers"] = mensaje["headers"]
+            elif mensaje["type"] == "http.response.body" and estado["guardar"]:
+                estado["partes"].append(mensaje.get("body", b""))
+                estado["bytes"] += len(mensaje.get("body", b""))
+                if estado["bytes"] > self.max_bytes:
+                    estado["guardar"], estado["partes"] = False, []
+                elif not mensaje.get("more_body", False):
+                    await run_in_threadpool(
+                        self.cache.guardar, usuario_id, clave, etag, estado["headers"], b"".join(estado["partes"])
+                    )
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
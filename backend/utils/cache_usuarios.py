@@ -0,0 +1,123 @@
+"""
+Caché en proceso de tokens verificados.
+
+Guarda, por token, los claims ya decodificados y una copia ligera del
+usuario, para que obtener_usuario_actual no decodifique el JWT ni consulte
+`usuarios` en cada request. Es un LRU acotado con TTL (nunca más allá del
+`exp` del token); las rutas que modifican o eliminan al usuario llaman a
+`invalidar_usuario`. Con varios procesos cada uno tiene su propia caché, así
+que el TTL acota cuánto puede tardar en verse un cambio hecho en otro.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+
+
+@dataclass(frozen=True)
+class UsuarioActual:
+    """Copia de los datos públicos de Usuario, independiente de cualquier sesión"""
+    id: int
+    nombre: str
+    correo: str
+    rol: str
+    fecha_registro: Optional[datetime]
+
+    @classmethod
+    def desde_modelo(cls, usuario) -> "UsuarioActual":
+        return cls(
+            id=usuario.id,
+            nombre=usuario.nombre,
+            correo=usuario.correo,
+            rol=usuario.rol,
+            fecha_registro=usuario.fecha_registro,
+        )
+
+
+class EntradaToken(NamedTuple):
+    claims: dict
+    usuario: UsuarioActual
+    expira: float  # time.monotonic()
+
+
+class CacheUsuarios:
+    def __init__(self, maximo: int = AUTH_CACHE_MAX, ttl: float = AUTH_CACHE_TTL):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._entradas: "OrderedDict[str, EntradaToken]" = OrderedDict()
+        self._tokens_por_usuario: dict = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, token: str) -> Optional[EntradaToken]:
+        with self._lock:
+            entrada = self._entradas.get(token)
+            if entrada is not None and entrada.expira <= time.monotonic():
+                self._quitar(token)
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(token)
+            self.aciertos += 1
+            return entrada
+
+    def guardar(self, token: str, claims: dict, usuario: UsuarioActual):
+        if self.maximo <= 0 or self.ttl <= 0:
+            return
+        vigencia = self.ttl
+        if claims.get("exp") is not None:
+            vigencia = min(vigencia, float(claims["exp"]) - time.time())
+        if vigencia <= 0:
+            return
+
+        with self._lock:
+            if token in self._entradas:
+                self._quitar(token)
+            self._entradas[token] = EntradaToken(claims, usuario, time.monotonic() + vigencia)
+            self._tokens_por_usuario.setdefault(usuario.id, set()).add(token)
+            while len(self._entradas) > self.maximo:
+                self._quitar(next(iter(self._entradas)))
+
+    def invalidar_usuario(self, usuario_id: int):
+        """Olvidar todos los tokens de un usuario (perfil, contraseña o cuenta cambiados)"""
+        with self._lock:
+            for token in list(self._tokens_por_usuario.get(usuario_id, ())):
+                self._quitar(token)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._tokens_por_usuario.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "maximo": self.maximo,
+                "ttl_segundos": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0,
+            }
+
+    def _quitar(self, token: str):
+        entrada = self._entradas.pop(token, None)
+        if entrada is None:
+            return
+        tokens = self._tokens_por_usuario.get(entrada.usuario.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_por_usuario[entrada.usuario.id]
+
+
+cache_usuarios = CacheUsuarios()
@@ -0,0 +1,275 @@
+"""
+Cola de envío de correos en segundo plano.
+
+Las rutas sólo encolan el mensaje y responden; un hilo trabajador los envía
+en lotes reutilizando una conexión SMTP persistente (se reabre si el
+servidor la cierra o tras MAIL_INACTIVIDAD segundos sin uso). Los fallos
+transitorios se reintentan con backoff exponencial; los rechazos
+permanentes (códigos 5xx) se descartan.
+
+El transporte se elige con MAIL_BACKEND:
+  smtp     servidor real de config/email_config.py
+  memoria  guarda los mensajes en `cola_correos.transporte.enviados` (pruebas)
+  archivo  escribe un .eml por mensaje en MAIL_DIRECTORIO (desarrollo local)
+Por defecto es smtp si EMAIL_ENABLED=true y memoria en caso contrario.
+"""
+import atexit
+import heapq
+import itertools
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import List
+
+from config.email_config import EMAIL_CONFIG, EMAIL_ENABLED
+
+MAIL_BACKEND = os.getenv("MAIL_BACKEND", "smtp" if EMAIL_ENABLED else "memoria").lower()
+MAIL_DIRECTORIO = os.getenv("MAIL_DIRECTORIO", "correos_salientes")
+MAIL_LOTE = int(os.getenv("MAIL_LOTE", "50"))
+MAIL_ESPERA_LOTE = float(os.getenv("MAIL_ESPERA_LOTE", "0.5"))
+MAIL_MAX_INTENTOS = int(os.getenv("MAIL_MAX_INTENTOS", "5"))
+MAIL_BACKOFF_BASE = float(os.getenv("MAIL_BACKOFF_BASE", "2"))
+MAIL_INACTIVIDAD = float(os.getenv("MAIL_INACTIVIDAD", "60"))
+MAIL_TIMEOUT = float(os.getenv("MAIL_TIMEOUT", "30"))
+
+
+@dataclass
+class CorreoSaliente:
+    destinatarios: List[str]
+    asunto: str
+    html: str
+    intentos: int = 0
+    ultimo_error: str = field(default="", repr=False)
+
+
+def construir_mensaje(correo: CorreoSaliente) -> EmailMessage:
+    mensaje = EmailMessage()
+    mensaje["From"] = formataddr((EMAIL_CONFIG.MAIL_FROM_NAME or "", str(EMAIL_CONFIG.MAIL_FROM)))
+    mensaje["To"] = ", ".join(correo.destinatarios)
+    mensaje["Subject"] = correo.asunto
+    mensaje["Message-ID"] = make_msgid()
+    mensaje.set_content(correo.html, subtype="html")
+    return mensaje
+
+
+def es_error_permanente(error: Exception) -> bool:
+    """Rechazos 5xx del servidor: reintentar no va a cambiar el resultado"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(codigo >= 500 for codigo, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class TransporteSMTP:
+    """Conexión SMTP persistente que se reutiliza entre mensajes y lotes"""
+
+    def __init__(self, config=EMAIL_CONFIG, inactividad: float = MAIL_INACTIVIDAD):
+        self.config = config
+        self.inactividad = inactividad
+        self._conexion = None
+        self._ultimo_uso = 0.0
+        self.conexiones_abiertas = 0
+
+    def _conectar(self):
+        config = self.config
+        contexto = ssl.create_default_context()
+        if not config.VALIDATE_CERTS:
+            contexto.check_hostname = False
+            contexto.verify_mode = ssl.CERT_NONE
+
+        if config.MAIL_SSL_TLS:
+            conexion = smtplib.SMTP_SSL(config.MAIL_SERVER, config.MAIL_PORT, timeout=MAIL_TIMEOUT, context=contexto)
+        else:
+            conexion = smtplib.SMTP(config.MAIL_SERVER, config.MAIL_PORT, timeout=MAIL_TIMEOUT)
+            if config.MAIL_STARTTLS:
+                conexion.starttls(context=contexto)
+        if config.USE_CREDENTIALS:
+            conexion.login(config.MAIL_USERNAME, config.MAIL_PASSWORD.get_secret_value())
+        self.conexiones_abiertas += 1
+        return conexion
+
+    def _obtener_conexion(self):
+        if self._conexion is not None and time.monotonic() - self._ultimo_uso > self.inactividad:
+            self.cerrar()
+        if self._conexion is None:
+            self._conexion = self._conectar()
+        return self._conexion
+
+    def enviar(self, mensaje: EmailMessage):
+        try:
+            self._obtener_conexion().send_message(mensaje)
+        except smtplib.SMTPServerDisconnected:
+            # El servidor cerró la conexión reutilizada: reabrir una vez
+            self._conexion = None
+            self._obtener_conexion().send_message(mensaje)
+        except (OSError, smtplib.SMTPException) as error:
+            if not es_error_permanente(error):
+                self.cerrar()
+            raise
+        self._ultimo_uso = time.monotonic()
+
+    def cerrar(self):
+        if self._conexion is not None:
+            try:
+                self._conexion.quit()
+            except (OSError, smtplib.SMTPException):
+                pass
+            self._conexion = None
+
+
+class TransporteMemoria:
+    """Sustituto de SMTP para pruebas: conserva los últimos mensajes enviados"""
+
+    def __init__(self, maximo: int = 1000):
+        self.enviados = deque(maxlen=maximo)
+
+    def enviar(self, mensaje: EmailMessage):
+        self.enviados.append(mensaje)
+
+    def cerrar(self):
+        pass
+
+
+class TransporteArchivo:
+    """Sustituto de SMTP para desarrollo: un archivo .eml por mensaje"""
+
+    def __init__(self, directorio: str = MAIL_DIRECTORIO):
+        self.directorio = directorio
+
+    def enviar(self, mensaje: EmailMessage):
+        os.makedirs(self.directorio, exist_ok=True)
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{mensaje['Message-ID'].strip('<>').split('@')[0]}.eml"
+        with open(os.path.join(self.directorio, nombre), "wb") as archivo:
+            archivo.write(mensaje.as_bytes())
+
+    def cerrar(self):
+        pass
+
+
+def crear_transporte(nombre: str = MAIL_BACKEND):
+    if nombre == "smtp":
+        return TransporteSMTP()
+    if nombre == "archivo":
+        return TransporteArchivo()
+    if nombre == "memoria":
+        return TransporteMemoria()
+    raise ValueError(f"MAIL_BACKEND desconocido: {nombre}")
+
+
+class ColaCorreos:
+    def __init__(self, transporte=None, lote: int = MAIL_LOTE, espera_lote: float = MAIL_ESPERA_LOTE,
+                 max_intentos: int = MAIL_MAX_INTENTOS, backoff_base: float = MAIL_BACKOFF_BASE):
+        self.transporte = transporte or crear_transporte()
+        self.lote = lote
+        self.espera_lote = espera_lote
+        self.max_intentos = max_intentos
+        self.backoff_base = backoff_base
+        self._cola = queue.Queue()
+        self._reintentos = []  # heap (momento, secuencia, correo)
+        self._secuencia = itertools.count()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self.enviados = 0
+        self.reintentados = 0
+        self.descartados = 0
+        self.lotes = 0
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._trabajar, name="cola-correos", daemon=True)
+                self._hilo.start()
+
+    def encolar(self, destinatarios: List[str], asunto: str, html: str):
+        """Dejar el correo en la cola y volver de inmediato"""
+        self.iniciar()
+        self._cola.put(CorreoSaliente(list(destinatarios), asunto, html))
+
+    def detener(self, timeout: float = 10):
+        """Enviar lo pendiente (sin esperar reintentos) y parar el trabajador"""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._cola.put(None)
+        self._hilo.join(timeout)
+        self.transporte.cerrar()
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return self._cola.qsize() + len(self._reintentos)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "transporte": type(self.transporte).__name__,
+                "en_cola": self._cola.qsize(),
+                "esperando_reintento": len(self._reintentos),
+                "enviados": self.enviados,
+                "reintentados": self.reintentados,
+                "descartados": self.descartados,
+                "lotes": self.lotes,
+            }
+
+    def _siguiente_lote(self) -> list:
+        """Bloquear hasta el primer correo (o el próximo reintento) y juntar los que lleguen enseguida"""
+        espera = None
+        if self._reintentos:
+            espera = max(self._reintentos[0][0] - time.monotonic(), 0)
+        lote = []
+        try:
+            lote.append(self._cola.get(timeout=espera))
+            limite = time.monotonic() + self.espera_lote
+            while len(lote) < self.lote:
+                lote.append(self._cola.get(timeout=max(limite - time.monotonic(), 0)))
+        except queue.Empty:
+            pass
+
+        ahora = time.monotonic()
+        with self._lock:
+            while self._reintentos and self._reintentos[0][0] <= ahora and len(lote) < self.lote:
+                lote.append(heapq.heappop(self._reintentos)[2])
+        return lote
+
+    def _trabajar(self):
+        while True:
+            lote = self._siguiente_lote()
+            detener = None in lote
+            lote = [correo for correo in lote if correo is not None]
+            if lote:
+                with self._lock:
+                    self.lotes += 1
+                for correo in lote:
+                    self._enviar(correo)
+            if detener or (self._detener.is_set() and self._cola.empty()):
+                return
+
+    def _enviar(self, correo: CorreoSaliente):
+        correo.intentos += 1
+        try:
+            self.transporte.enviar(construir_mensaje(correo))
+            with self._lock:
+                self.enviados += 1
+        except Exception as error:
+            correo.ultimo_error = str(error)
+            if es_error_permanente(error) or correo.intentos >= self.max_intentos:
+                with self._lock:
+                    self.descartados += 1
+                print(f"❌ Correo a {', '.join(correo.destinatarios)} descartado tras {correo.intentos} intentos: {error}")
+                return
+            momento = time.monotonic() + self.backoff_base ** correo.intentos
+            with self._lock:
+                self.reintentados += 1
+                heapq.heappush(self._reintentos, (momento, next(self._secuencia), correo))
+            print(f"⚠️ Error enviando correo a {', '.join(correo.destinatarios)} (intento {correo.intentos}): {error}")
+
+
+cola_correos = ColaCorreos()
+atexit.register(cola_correos.detener)
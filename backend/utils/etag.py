@@ -0,0 +1,41 @@
+"""
+Respuestas con ETag y soporte de If-None-Match (304 Not Modified).
+"""
+import hashlib
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+CACHE_CONTROL_REVALIDAR = "private, no-cache"
+
+
+def calcular_etag(contenido: bytes) -> str:
+    return '"' + hashlib.sha1(contenido).hexdigest() + '"'
+
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): ignora el prefijo W/ y acepta listas y *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == etag for candidato in if_none_match.split(","))
+
+
+def no_modificado(etag: str, cache_control: str = CACHE_CONTROL_REVALIDAR) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def responder_con_etag(request: Request, etag: str, generar: Callable[[], object],
+                       cache_control: str = CACHE_CONTROL_REVALIDAR) -> Response:
+    """
+    304 si el cliente ya tiene `etag`; si no, el JSON de `generar()` con su ETag.
+
+    `generar` sólo se llama cuando hay que enviar el cuerpo.
+    """
+    if coincide_etag(request.headers.get("if-none-match"), etag):
+        return no_modificado(etag, cache_control)
+    return JSONResponse(jsonable_encoder(generar()), headers={"ETag": etag, "Cache-Control": cache_control})
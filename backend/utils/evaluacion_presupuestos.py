@@ -0,0 +1,131 @@
+"""
+Evaluación de presupuestos: monto usado y estado de cada uno.
+
+El monto usado de un presupuesto es la suma de las transacciones del
+usuario en su categoría dentro de [fecha_inicio, fecha_fin]. Se guarda en
+presupuestos.monto_usado y se mantiene de forma incremental al escribir
+transacciones (utils/alertas_presupuesto.py), así que evaluar todos los
+presupuestos de un usuario es una sola consulta sobre `presupuestos` unida
+a categorías, sin recorrer transacciones ni cargas perezosas por fila.
+
+Estados según porcentaje usado:
+  normal            < PRESUPUESTO_UMBRAL_ALERTA
+  proximo_exceder   ≥ PRESUPUESTO_UMBRAL_ALERTA
+  excedido          > PRESUPUESTO_UMBRAL_EXCEDIDO
+"""
+import os
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.BD import Categoria, Presupuesto, Transaccion
+
+PRESUPUESTO_UMBRAL_ALERTA = float(os.getenv("PRESUPUESTO_UMBRAL_ALERTA", "80"))
+PRESUPUESTO_UMBRAL_EXCEDIDO = float(os.getenv("PRESUPUESTO_UMBRAL_EXCEDIDO", "100"))
+
+NORMAL = "normal"
+PROXIMO_EXCEDER = "proximo_exceder"
+EXCEDIDO = "excedido"
+
+
+@dataclass(frozen=True)
+class EvaluacionPresupuesto:
+    presupuesto_id: int
+    nombre: str
+    categoria_id: int
+    categoria: str
+    monto_total: Decimal
+    monto_usado: Decimal
+    porcentaje_usado: float
+    estado: str
+    fecha_inicio: date
+    fecha_fin: date
+
+    @property
+    def disponible(self) -> Decimal:
+        return self.monto_total - self.monto_usado
+
+
+def expresion_monto_usado():
+    """
+    Subconsulta correlacionada con el monto usado real de cada fila de
+    `presupuestos` (resuelta con idx_transaccion_usuario_categoria_fecha,
+    que además cubre el SUM). Sirve para recalcular monto_usado.
+    """
+    return select(func.coalesce(func.sum(Transaccion.monto), 0)).where(
+        Transaccion.usuario_id == Presupuesto.usuario_id,
+        Transaccion.categoria_id == Presupuesto.categoria_id,
+        Transaccion.fecha >= Presupuesto.fecha_inicio,
+        Transaccion.fecha <= Presupuesto.fecha_fin,
+    ).scalar_subquery()
+
+
+def consulta_consumo(usuario_id: int, vigentes_en: Optional[date] = None):
+    """
+    Select (presupuesto_id, nombre, categoria_id, categoria, monto_total,
+    fecha_inicio, fecha_fin, monto_usado) de los presupuestos del usuario.
+
+    Con `vigentes_en` sólo entran los presupuestos cuyo rango incluye esa fecha.
+    """
+    consulta = select(
+        Presupuesto.id.label("presupuesto_id"),
+        Presupuesto.nombre.label("nombre"),
+        Presupuesto.categoria_id.label("categoria_id"),
+        Categoria.nombre.label("categoria"),
+        Presupuesto.monto_total.label("monto_total"),
+        Presupuesto.fecha_inicio.label("fecha_inicio"),
+        Presupuesto.fecha_fin.label("fecha_fin"),
+        Presupuesto.monto_usado.label("monto_usado"),
+    ).select_from(Presupuesto)\
+     .outerjoin(Categoria, Categoria.id == Presupuesto.categoria_id)\
+     .where(Presupuesto.usuario_id == usuario_id)
+    if vigentes_en is not None:
+        consulta = consulta.where(Presupuesto.fecha_inicio <= vigentes_en, Presupuesto.fecha_fin >= vigentes_en)
+    return consulta.order_by(Presupuesto.id)
+
+
+def porcentaje(usado: Decimal, total: Decimal) -> float:
+    if total > 0:
+        return float(usado) / float(total) * 100
+    return 100.0 if usado > 0 else 0.0
+
+
+def clasificar(porcentaje_usado: float, umbral_alerta: float = PRESUPUESTO_UMBRAL_ALERTA,
+               umbral_excedido: float = PRESUPUESTO_UMBRAL_EXCEDIDO) -> str:
+    if porcentaje_usado > umbral_excedido:
+        return EXCEDIDO
+    if porcentaje_usado >= umbral_alerta:
+        return PROXIMO_EXCEDER
+    return NORMAL
+
+
+def evaluar_presupuestos(
+    db: Session,
+    usuario_id: int,
+    vigentes_en: Optional[date] = None,
+    umbral_alerta: float = PRESUPUESTO_UMBRAL_ALERTA,
+    umbral_excedido: float = PRESUPUESTO_UMBRAL_EXCEDIDO,
+) -> List[EvaluacionPresupuesto]:
+    """Evaluar todos los presupuestos del usuario en un solo viaje a la base de datos"""
+    evaluaciones = []
+    for fila in db.execute(consulta_consumo(usuario_id, vigentes_en)):
+        total = Decimal(fila.monto_total)
+        usado = Decimal(fila.monto_usado or 0)
+        usado_pct = porcentaje(usado, total)
+        evaluaciones.append(EvaluacionPresupuesto(
+            presupuesto_id=fila.presupuesto_id,
+            nombre=fila.nombre,
+            categoria_id=fila.categoria_id,
+            categoria=fila.categoria or "Sin categoría",
+            monto_total=total,
+            monto_usado=usado,
+            porcentaje_usado=usado_pct,
+            estado=clasificar(usado_pct, umbral_alerta, umbral_excedido),
+            fecha_inicio=fila.fecha_inicio,
+            fecha_fin=fila.fecha_fin,
+        ))
+    return evaluaciones
@@ -0,0 +1,277 @@
+"""
+Eventos en vivo para los clientes (GET /eventos, Server-Sent Events).
+
+En lugar de sondear el contador de no leídas, el balance y las transacciones
+recientes, la app abre un stream y recibe:
+
+  notificacion  {"mensaje", "fecha_creacion"}: una notificación nueva (el
+                contador de no leídas sube en 1)
+  no_leidas     {"contador"}: el contador cambió por otra causa (marcar como
+                leída, eliminar); se envía también al conectarse
+  balance       {"ingresos", "egresos", "balance"}: diferencias que dejó un
+                commit (altas, ediciones, bajas, importaciones, pagos fijos);
+                al recibirlo conviene refrescar las transacciones recientes
+  resincronizar {}: el cliente no leyó a tiempo y se descartaron eventos;
+                debe volver a consultar el estado completo
+
+Los servicios encolan los eventos en la sesión con `encolar` /
+`notificacion_nueva` / `registrar_balance` y se publican sólo después del
+commit (un rollback los descarta), agrupando las diferencias de balance por
+usuario. Los cambios que ya se confirmaron se publican con `publicar`.
+
+El bus se elige con EVENTOS_BACKEND:
+  memoria  colas por suscriptor dentro del proceso; suficiente con un worker
+  redis    cada proceso publica en un canal de Redis (EVENTOS_URL) y un hilo
+           reparte los mensajes a sus suscriptores locales, así que un
+           evento llega a la conexión abierta en cualquier worker (y desde
+           procesos fuera de la API, como procesar_pagos_fijos.py)
+"""
+import asyncio
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utils.cache import CACHE_PREFIJO, CACHE_URL, redis
+
+EVENTOS_BACKEND = os.getenv("EVENTOS_BACKEND", "memoria").lower()
+EVENTOS_URL = os.getenv("EVENTOS_URL", CACHE_URL)
+EVENTOS_CANAL = os.getenv("EVENTOS_CANAL", f"{CACHE_PREFIJO}eventos")
+# Eventos pendientes por conexión antes de pedirle que se resincronice
+EVENTOS_COLA = int(os.getenv("EVENTOS_COLA", "100"))
+EVENTOS_PING = float(os.getenv("EVENTOS_PING", "15"))
+
+RESINCRONIZAR = {"tipo": "resincronizar"}
+
+
+class Suscripcion:
+    """Cola de eventos de una conexión; se crea y se lee dentro del event loop"""
+
+    def __init__(self, usuario_id: int, maximo: int = EVENTOS_COLA):
+        self.usuario_id = usuario_id
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maximo)
+        self.descartados = 0
+
+    def entregar(self, evento: dict):
+        """Seguro desde cualquier hilo"""
+        try:
+            self.loop.call_soon_threadsafe(self._poner, evento)
+        except RuntimeError:
+            # El loop ya se cerró: la conexión terminó
+            pass
+
+    def _poner(self, evento: dict):
+        if self.cola.full():
+            # Cliente lento: mejor que vuelva a consultar que acumular memoria
+            self.descartados += self.cola.qsize()
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            evento = RESINCRONIZAR
+        self.cola.put_nowait(evento)
+
+    async def siguiente(self, timeout: float) -> Optional[dict]:
+        """Siguiente evento, o None si pasaron `timeout` segundos sin eventos"""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BusMemoria:
+    """Publicación y suscripción dentro del proceso"""
+
+    def __init__(self):
+        self._suscriptores = defaultdict(set)  # usuario_id -> {Suscripcion}
+        self._lock = threading.Lock()
+        self.publicados = 0
+        self.entregados = 0
+
+    def suscribir(self, usuario_id: int) -> Suscripcion:
+        suscripcion = Suscripcion(usuario_id)
+        with self._lock:
+            self._suscriptores[usuario_id].add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            suscripciones = self._suscriptores.get(suscripcion.usuario_id)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._suscriptores[suscripcion.usuario_id]
+
+    def publicar(self, usuario_id: int, evento: dict):
+        self.publicados += 1
+        self._repartir(usuario_id, evento)
+
+    def _repartir(self, usuario_id: int, evento: dict):
+        with self._lock:
+            suscripciones = list(self._suscriptores.get(usuario_id, ()))
+        for suscripcion in suscripciones:
+            suscripcion.entregar(evento)
+        self.entregados += len(suscripciones)
+
+    def cerrar(self):
+        pass
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            conexiones = sum(len(s) for s in self._suscriptores.values())
+            usuarios = len(self._suscriptores)
+        return {
+            "backend": "memoria",
+            "usuarios": usuarios,
+            "conexiones": conexiones,
+            "publicados": self.publicados,
+            "entregados": self.entregados,
+        }
+
+
+class BusRedis(BusMemoria):
+    """
+    Pub/sub de Redis entre procesos.
+
+    `publicar` sólo hace PUBLISH; el hilo oyente (que arranca con la primera
+    suscripción local) recibe todos los mensajes del canal y los reparte.
+    Si Redis no responde, el evento se entrega al menos a las conexiones de
+    este proceso.
+    """
+
+    def __init__(self, url: str = EVENTOS_URL, canal: str = EVENTOS_CANAL, cliente=None):
+        super().__init__()
+        if cliente is None:
+            if redis is None:
+                raise RuntimeError("EVENTOS_BACKEND=redis requiere el paquete 'redis' (pip install redis)")
+            cliente = redis.Redis.from_url(url, protocol=2, socket_timeout=1, socket_connect_timeout=1)
+        self.cliente = cliente
+        self.url = url
+        self.canal = canal
+        self.errores = 0
+        self._oyente = None
+        self._detener = threading.Event()
+        self._lock_oyente = threading.Lock()
+
+    def _error(self, operacion: str, error: Exception):
+        self.errores += 1
+        print(f"⚠️ Bus de eventos Redis no disponible ({operacion}): {str(error)}")
+
+    def suscribir(self, usuario_id: int) -> Suscripcion:
+        self._iniciar_oyente()
+        return super().suscribir(usuario_id)
+
+    def publicar(self, usuario_id: int, evento: dict):
+        self.publicados += 1
+        try:
+            self.cliente.publish(self.canal, json.dumps([usuario_id, evento]))
+        except redis.RedisError as e:
+            self._error("publicar", e)
+            self._repartir(usuario_id, evento)
+
+    def _iniciar_oyente(self):
+        with self._lock_oyente:
+            if self._oyente is None or not self._oyente.is_alive():
+                self._detener.clear()
+                self._oyente = threading.Thread(target=self._escuchar, name="bus-eventos", daemon=True)
+                self._oyente.start()
+
+    def _escuchar(self):
+        while not self._detener.is_set():
+            pubsub = self.cliente.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.canal)
+                while not self._detener.is_set():
+                    mensaje = pubsub.get_message(timeout=1)
+                    if mensaje is not None and mensaje["type"] == "message":
+                        usuario_id, evento = json.loads(mensaje["data"])
+                        self._repartir(usuario_id, evento)
+            except redis.RedisError as e:
+                self._error("escuchar", e)
+                self._detener.wait(1)
+            finally:
+                pubsub.close()
+
+    def cerrar(self):
+        self._detener.set()
+        if self._oyente is not None:
+            self._oyente.join(5)
+        self.cliente.close()
+
+    def estadisticas(self) -> dict:
+        return {
+            **super().estadisticas(),
+            "backend": "redis",
+            "url": self.url.split("@")[-1],
+            "canal": self.canal,
+            "oyente_activo": self._oyente is not None and self._oyente.is_alive(),
+            "errores": self.errores,
+        }
+
+
+def crear_bus(nombre: str = EVENTOS_BACKEND):
+    if nombre == "memoria":
+        return BusMemoria()
+    if nombre == "redis":
+        return BusRedis()
+    raise ValueError(f"EVENTOS_BACKEND desconocido: {nombre}")
+
+
+bus_eventos = crear_bus()
+
+
+def publicar(usuario_id: int, tipo: str, datos: Optional[dict] = None):
+    """Publicar un evento de algo ya confirmado en la base de datos"""
+    bus_eventos.publicar(usuario_id, {"tipo": tipo, **(datos or {})})
+
+
+def encolar(db: Session, usuario_id: int, tipo: str, datos: Optional[dict] = None):
+    """Publicar el evento cuando la sesión haga commit"""
+    db.info.setdefault("eventos_pendientes", []).append((usuario_id, tipo, datos or {}))
+
+
+def notificacion_nueva(db: Session, usuario_id: int, mensaje: str, fecha_creacion: Optional[datetime] = None):
+    encolar(db, usuario_id, "notificacion", {
+        "mensaje": mensaje,
+        "fecha_creacion": (fecha_creacion or datetime.now()).isoformat(),
+    })
+
+
+def registrar_balance(db: Session, usuario_id: int, tipo: str, monto: Decimal):
+    """Sumar `monto` (con signo) a los ingresos o egresos del usuario en el próximo commit"""
+    balances = db.info.setdefault("balances_pendientes", {})
+    ingresos, egresos = balances.get(usuario_id, (Decimal(0), Decimal(0)))
+    if tipo == "ingreso":
+        ingresos += monto
+    else:
+        egresos += monto
+    balances[usuario_id] = (ingresos, egresos)
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_tras_commit(sesion):
+    if sesion.in_nested_transaction():
+        # Se liberó un savepoint (begin_nested); la transacción sigue abierta
+        return
+    for usuario_id, tipo, datos in sesion.info.pop("eventos_pendientes", ()):
+        publicar(usuario_id, tipo, datos)
+    for usuario_id, (ingresos, egresos) in sesion.info.pop("balances_pendientes", {}).items():
+        if ingresos or egresos:
+            publicar(usuario_id, "balance", {
+                "ingresos": float(ingresos),
+                "egresos": float(egresos),
+                "balance": float(ingresos - egresos),
+            })
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_pendientes(sesion, transaccion_anterior):
+    # Un savepoint revertido (begin_nested) no descarta lo encolado fuera de él
+    if transaccion_anterior.parent is None:
+        sesion.info.pop("eventos_pendientes", None)
+        sesion.info.pop("balances_pendientes", None)
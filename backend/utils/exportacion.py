@@ -0,0 +1,60 @@
+"""
+Exportación del historial de transacciones a CSV o XLSX en streaming.
+
+Las filas llegan de un cursor del servidor (yield_per) y se escriben en
+trozos, así que la memoria no depende del número de transacciones. XLSX
+requiere openpyxl (opcional): se genera en modo write_only sobre un archivo
+temporal y se envía por partes.
+"""
+import csv
+import io
+import tempfile
+from typing import Iterable, Iterator
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+XLSX_DISPONIBLE = Workbook is not None
+ENCABEZADOS = ("id", "fecha", "tipo", "categoria", "monto", "descripcion", "presupuesto_id")
+FILAS_POR_TROZO = 500
+TAMANO_TROZO_ARCHIVO = 64 * 1024
+
+TIPOS_CONTENIDO = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def csv_en_trozos(filas: Iterable[tuple], filas_por_trozo: int = FILAS_POR_TROZO) -> Iterator[str]:
+    """CSV con BOM (para que Excel respete los acentos), emitido cada `filas_por_trozo` filas"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("\ufeff")
+    escritor.writerow(ENCABEZADOS)
+    for numero, fila in enumerate(filas, start=1):
+        escritor.writerow(fila)
+        if numero % filas_por_trozo == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def xlsx_en_trozos(filas: Iterable[tuple]) -> Iterator[bytes]:
+    """Libro XLSX de una hoja escrito en modo write_only y leído de vuelta por partes"""
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Transacciones")
+    hoja.append(ENCABEZADOS)
+    for fila in filas:
+        hoja.append(fila)
+
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            trozo = archivo.read(TAMANO_TROZO_ARCHIVO)
+            if not trozo:
+                break
+            yield trozo
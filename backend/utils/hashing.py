@@ -0,0 +1,110 @@
+"""
+Hash y verificación de contraseñas en un pool dedicado.
+
+bcrypt es deliberadamente caro (~250 ms con 12 rondas); ejecutarlo dentro
+del handler ocupa el event loop o un hilo del threadpool de FastAPI y una
+ráfaga de logins congela el resto de peticiones. Aquí se ejecuta en un pool
+acotado (hilos por defecto: bcrypt libera el GIL; procesos con
+HASH_USAR_PROCESOS=true) y, cuando hay más de HASH_MAX_PENDIENTES trabajos
+en curso o en cola, se responde 429 en lugar de encolar sin límite.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDIENTES = int(os.getenv("HASH_MAX_PENDIENTES", str(HASH_WORKERS * 8)))
+HASH_USAR_PROCESOS = os.getenv("HASH_USAR_PROCESOS", "False").lower() == "true"
+
+
+def _hash(contrasena: str, rondas: int) -> str:
+    return bcrypt.using(rounds=rondas).hash(contrasena)
+
+
+def _verificar(contrasena: str, hash_guardado: str) -> bool:
+    return bcrypt.verify(contrasena, hash_guardado)
+
+
+class PoolHashing:
+    def __init__(self, workers: int = HASH_WORKERS, max_pendientes: int = HASH_MAX_PENDIENTES,
+                 usar_procesos: bool = HASH_USAR_PROCESOS):
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self.usar_procesos = usar_procesos
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pendientes = 0
+        self.maximo_pendientes = 0
+        self.completadas = 0
+        self.rechazadas = 0
+        self.tiempo_total = 0.0
+
+    def _obtener_executor(self):
+        if self._executor is None:
+            clase = ProcessPoolExecutor if self.usar_procesos else ThreadPoolExecutor
+            self._executor = clase(max_workers=self.workers)
+        return self._executor
+
+    def _enviar(self, funcion, *argumentos):
+        """Admitir el trabajo (o rechazarlo con 429) y mandarlo al pool"""
+        with self._lock:
+            if self.pendientes >= self.max_pendientes:
+                self.rechazadas += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Demasiadas solicitudes de autenticación, intenta de nuevo en un momento",
+                    headers={"Retry-After": "1"}
+                )
+            self.pendientes += 1
+            self.maximo_pendientes = max(self.maximo_pendientes, self.pendientes)
+            executor = self._obtener_executor()
+
+        inicio = time.perf_counter()
+        futuro = executor.submit(funcion, *argumentos)
+        futuro.add_done_callback(lambda _: self._terminar(time.perf_counter() - inicio))
+        return futuro
+
+    def _terminar(self, duracion: float):
+        with self._lock:
+            self.pendientes -= 1
+            self.completadas += 1
+            self.tiempo_total += duracion
+
+    # Desde código síncrono fuera de una petición (scripts, tareas): el hilo que llama espera.
+    # En handlers usar las versiones async: un def bloquearía un hilo del threadpool por hash
+    def hashear(self, contrasena: str) -> str:
+        return self._enviar(_hash, contrasena, BCRYPT_ROUNDS).result()
+
+    def verificar(self, contrasena: str, hash_guardado: str) -> bool:
+        return self._enviar(_verificar, contrasena, hash_guardado).result()
+
+    # Desde handlers async def: no bloquea el event loop
+    async def hashear_async(self, contrasena: str) -> str:
+        return await asyncio.wrap_future(self._enviar(_hash, contrasena, BCRYPT_ROUNDS))
+
+    async def verificar_async(self, contrasena: str, hash_guardado: str) -> bool:
+        return await asyncio.wrap_future(self._enviar(_verificar, contrasena, hash_guardado))
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "tipo": "procesos" if self.usar_procesos else "hilos",
+                "workers": self.workers,
+                "rondas_bcrypt": BCRYPT_ROUNDS,
+                "pendientes": self.pendientes,
+                "en_cola": max(self.pendientes - self.workers, 0),
+                "max_pendientes": self.max_pendientes,
+                "maximo_pendientes_observado": self.maximo_pendientes,
+                "completadas": self.completadas,
+                "rechazadas": self.rechazadas,
+                "duracion_promedio_ms": (self.tiempo_total / self.completadas * 1000) if self.completadas else 0,
+            }
+
+
+pool_hashing = PoolHashing()
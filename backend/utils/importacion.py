@@ -0,0 +1,195 @@
+"""
+Importación masiva de transacciones (JSON, CSV u OFX).
+
+Todas las filas se validan contra las categorías y los presupuestos del
+usuario cargados una sola vez, y las válidas se insertan con un INSERT
+multi-fila por lote, con un commit y un solo ajuste del resumen mensual y
+del monto usado de los presupuestos por lote. Las filas inválidas no
+detienen la importación: se devuelven con su número de fila y el motivo.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+from typing import Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models.BD import Presupuesto, Transaccion
+from schemas.transacciones import TransaccionImportar
+from utils import alertas_presupuesto, resumen_mensual
+from utils.cache_categorias import catalogo_categorias
+
+TAMANO_LOTE_IMPORTACION = 1000
+
+# Alias aceptados en encabezados CSV (exportaciones de bancos)
+COLUMNAS_CSV = {
+    "fecha": "fecha", "date": "fecha", "fecha_operacion": "fecha",
+    "monto": "monto", "importe": "monto", "amount": "monto", "cantidad": "monto",
+    "descripcion": "descripcion", "concepto": "descripcion", "description": "descripcion", "memo": "descripcion",
+    "categoria": "categoria", "category": "categoria",
+    "categoria_id": "categoria_id",
+    "tipo": "tipo", "type": "tipo",
+    "presupuesto_id": "presupuesto_id",
+}
+FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+
+def _normalizar_fecha(valor: str) -> str:
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(valor, formato).date().isoformat()
+        except ValueError:
+            continue
+    return valor
+
+
+def _normalizar_monto(valor: str) -> str:
+    """Quitar símbolo de moneda y separadores de miles; "12,50" y "1.234,50" usan coma decimal"""
+    valor = valor.replace("$", "").replace(" ", "")
+    if re.fullmatch(r"-?\d{1,3}(\.\d{3})*,\d{1,2}|-?\d+,\d{1,2}", valor):
+        return valor.replace(".", "").replace(",", ".")
+    return valor.replace(",", "")
+
+
+def leer_csv(contenido: bytes) -> list:
+    """Filas del CSV como dicts con las columnas de TransaccionImportar (celdas vacías → None)"""
+    texto = contenido.decode("utf-8-sig")
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    filas = []
+    for fila in csv.DictReader(io.StringIO(texto), dialect=dialecto):
+        normalizada = {}
+        for columna, valor in fila.items():
+            if columna is None:
+                continue
+            campo = COLUMNAS_CSV.get(columna.strip().lower())
+            if campo:
+                valor = (valor or "").strip()
+                normalizada[campo] = valor or None
+        if normalizada.get("fecha"):
+            normalizada["fecha"] = _normalizar_fecha(normalizada["fecha"])
+        if normalizada.get("monto"):
+            normalizada["monto"] = _normalizar_monto(normalizada["monto"])
+        filas.append(normalizada)
+    return filas
+
+
+_TRANSACCION_OFX = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))", re.S | re.I)
+
+
+def _etiqueta_ofx(bloque: str, etiqueta: str) -> Optional[str]:
+    encontrado = re.search(rf"<{etiqueta}>([^<\r\n]*)", bloque, re.I)
+    return encontrado.group(1).strip() if encontrado else None
+
+
+def leer_ofx(contenido: bytes) -> list:
+    """Movimientos <STMTTRN> de un extracto OFX (SGML o XML); el signo de TRNAMT define el tipo"""
+    texto = contenido.decode("utf-8", errors="replace")
+    filas = []
+    for bloque in _TRANSACCION_OFX.findall(texto):
+        fecha = _etiqueta_ofx(bloque, "DTPOSTED")
+        filas.append({
+            "fecha": f"{fecha[:4]}-{fecha[4:6]}-{fecha[6:8]}" if fecha and len(fecha) >= 8 else fecha,
+            "monto": _etiqueta_ofx(bloque, "TRNAMT"),
+            "descripcion": _etiqueta_ofx(bloque, "NAME") or _etiqueta_ofx(bloque, "MEMO"),
+        })
+    return filas
+
+
+def validar_filas(db: Session, usuario_id: int, filas: list, categoria_ingreso_id: Optional[int] = None,
+                  categoria_egreso_id: Optional[int] = None):
+    """
+    Validar todas las filas con el catálogo de categorías y los presupuestos precargados.
+
+    Un monto negativo sin tipo se toma como egreso (y uno positivo sin
+    categoría ni tipo, como ingreso). Si la fila no trae
+    categoría se usa categoria_ingreso_id / categoria_egreso_id según el tipo.
+    Devuelve (validas, errores); las filas se numeran desde 1.
+    """
+    catalogo = catalogo_categorias.obtener(db)
+    categorias, por_nombre = catalogo.por_id, catalogo.por_nombre
+    presupuestos = {
+        fila.id for fila in db.query(Presupuesto.id).filter(Presupuesto.usuario_id == usuario_id)
+    }
+    por_defecto = {"ingreso": categoria_ingreso_id, "egreso": categoria_egreso_id}
+
+    validas, errores = [], []
+    for numero, fila in enumerate(filas, start=1):
+        try:
+            datos = TransaccionImportar.model_validate(fila)
+        except ValidationError as e:
+            detalle = e.errors()[0]
+            campo = ".".join(str(parte) for parte in detalle["loc"])
+            errores.append({"fila": numero, "error": f"{campo}: {detalle['msg']}" if campo else detalle["msg"]})
+            continue
+
+        monto = datos.monto
+        tipo = datos.tipo.value if datos.tipo else None
+        if monto < 0:
+            if tipo == "ingreso":
+                errores.append({"fila": numero, "error": "Monto negativo en un ingreso"})
+                continue
+            monto, tipo = -monto, "egreso"
+        if monto == 0:
+            errores.append({"fila": numero, "error": "El monto debe ser mayor que cero"})
+            continue
+
+        if datos.categoria_id is not None:
+            categoria = categorias.get(datos.categoria_id)
+        elif datos.categoria:
+            categoria = por_nombre.get(datos.categoria.strip().lower())
+        else:
+            categoria = categorias.get(por_defecto.get(tipo or "ingreso"))
+        if categoria is None:
+            errores.append({"fila": numero, "error": "Categoría no encontrada"})
+            continue
+
+        tipo = tipo or categoria.tipo
+        if categoria.tipo != tipo:
+            errores.append({"fila": numero, "error": f"La categoría es de tipo '{categoria.tipo}', pero la fila es '{tipo}'"})
+            continue
+
+        if datos.presupuesto_id is not None and datos.presupuesto_id not in presupuestos:
+            errores.append({"fila": numero, "error": "Presupuesto no válido para este usuario"})
+            continue
+
+        validas.append((numero, {
+            "usuario_id": usuario_id,
+            "presupuesto_id": datos.presupuesto_id,
+            "categoria_id": categoria.id,
+            "monto": monto,
+            "tipo": tipo,
+            "descripcion": datos.descripcion,
+            "fecha": datos.fecha,
+        }))
+    return validas, errores
+
+
+def insertar_lotes(db: Session, validas: list, tamano_lote: int = TAMANO_LOTE_IMPORTACION):
+    """
+    Insertar las filas validadas en lotes, cada uno en su propia transacción.
+
+    Devuelve (insertadas, errores); si un lote falla en la base de datos se
+    revierte sólo ese lote y sus filas se reportan como error.
+    """
+    insertadas, errores = 0, []
+    for inicio in range(0, len(validas), tamano_lote):
+        lote = validas[inicio:inicio + tamano_lote]
+        filas = [fila for _, fila in lote]
+        try:
+            db.execute(insert(Transaccion), filas)
+            resumen_mensual.registrar_lote(db, filas)
+            alertas_presupuesto.registrar_lote(db, filas)
+            db.commit()
+            insertadas += len(filas)
+        except SQLAlchemyError as e:
+            db.rollback()
+            print(f"❌ Error insertando lote de importación: {str(e)}")
+            errores.extend({"fila": numero, "error": "Error al guardar el lote"} for numero, _ in lote)
+    return insertadas, errores
@@ -5,6 +5,9 @@ from jose import JWTError, jwt
 SECRET_KEY = "tu_clave_super_secreta"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# Tokens de un solo propósito (claim "uso"): vida corta, sólo sirven donde se piden
+EVENTOS_TOKEN_EXPIRE_SECONDS = 60
+USO_EVENTOS = "eventos"
 
 def crear_token(data: dict):
     to_encode = data.copy()
@@ -12,9 +15,17 @@ def crear_token(data: dict):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verificar_token(token: str):
+def crear_token_eventos(usuario_id: int):
+    """Token para abrir GET /eventos?token=...; no vale como token de acceso"""
+    expire = datetime.utcnow() + timedelta(seconds=EVENTOS_TOKEN_EXPIRE_SECONDS)
+    return jwt.encode({"sub": str(usuario_id), "uso": USO_EVENTOS, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
+def verificar_token(token: str, uso: str = None):
+    """Claims del token, o None si es inválido o su propósito ("uso") no es el pedido"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    if payload.get("uso") != uso:
+        return None
+    return payload
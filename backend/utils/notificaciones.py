@@ -0,0 +1,228 @@
+"""
+Servicio de notificaciones: creación en lote y contador de no leídas.
+
+`notificar` crea la misma notificación para muchos usuarios (avisos del
+sistema, recordatorios) con un INSERT multi-fila por cada NOTIF_LOTE
+destinatarios. Los ids que no existen y las preferencias de
+ConfiguracionNotificacion se resuelven con una sola consulta por lote, no una
+por usuario; los ids desconocidos se informan en lugar de hacer fallar el
+lote por la clave foránea. `anunciar` recorre todos los usuarios por keyset
+con el mismo procedimiento, sin cargarlos todos en memoria.
+
+El contador de no leídas se guarda en utils.cache con la clave
+(usuario, versión de datos). Toda escritura sobre las notificaciones de un
+usuario incrementa su versión (utils.version_datos) después del commit, así
+que el siguiente sondeo recalcula el COUNT una sola vez con
+idx_notificacion_usuario_leido_fecha y los demás lo leen de la caché. Un COUNT
+que empezó antes de la escritura queda guardado con la versión anterior y
+nunca se vuelve a servir.
+
+Cada cambio se publica además en utils.eventos después del commit: las
+notificaciones nuevas como evento `notificacion` y los demás cambios del
+contador como `no_leidas` con el valor ya recalculado.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from sqlalchemy import func, insert, select, true
+from sqlalchemy.orm import Session
+
+from models.BD import ConfiguracionNotificacion, Notificacion, NotificacionArchivada, Usuario
+from utils import eventos
+from utils.cache import cache
+from utils.version_datos import versiones_datos
+
+NOTIF_LOTE = int(os.getenv("NOTIF_LOTE", "1000"))
+NOTIF_CONTADOR_TTL = float(os.getenv("NOTIF_CONTADOR_TTL", "3600"))
+
+# Columnas de ConfiguracionNotificacion que un envío puede exigir
+PREFERENCIAS = ("email", "sms", "recordatorios")
+
+
+class ContadorNoLeidas:
+    def __init__(self, backend=cache, ttl: float = NOTIF_CONTADOR_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, db: Session, usuario_id: int) -> int:
+        version = versiones_datos.actual(usuario_id)
+        clave = f"no_leidas:{usuario_id}:{version}"
+        if version is not None:
+            contador = self.backend.obtener(clave)
+            if contador is not None:
+                self.aciertos += 1
+                return contador
+        self.fallos += 1
+        contador = db.query(func.count(Notificacion.id))\
+            .filter(Notificacion.usuario_id == usuario_id, Notificacion.leido == False)\
+            .scalar()
+        if version is not None:
+            self.backend.guardar(clave, contador, ttl=self.ttl)
+        return contador
+
+    def invalidar(self, usuario_ids: Iterable[int]):
+        """Llamar después del commit de cualquier cambio en las notificaciones de estos usuarios"""
+        for usuario_id in set(usuario_ids):
+            versiones_datos.incrementar(usuario_id)
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0,
+        }
+
+
+contador_no_leidas = ContadorNoLeidas()
+
+
+def _publicar_contador(db: Session, usuario_id: int):
+    """Invalidar y publicar el contador recalculado (una consulta, que queda en caché para los sondeos)"""
+    contador_no_leidas.invalidar([usuario_id])
+    eventos.publicar(usuario_id, "no_leidas", {"contador": contador_no_leidas.obtener(db, usuario_id)})
+
+
+def _consulta_destinatarios(preferencia: Optional[str]):
+    """
+    (usuario_id, acepta) de usuarios existentes; `acepta` es False sólo si el
+    usuario desactivó `preferencia`. Una consulta por lote sirve a la vez para
+    descartar ids desconocidos y para aplicar las preferencias.
+    """
+    if preferencia is None:
+        return select(Usuario.id, true())
+    if preferencia not in PREFERENCIAS:
+        raise ValueError(f"Preferencia desconocida: {preferencia}")
+    columna = getattr(ConfiguracionNotificacion, preferencia)
+    return select(Usuario.id, func.coalesce(columna, True))\
+        .outerjoin(ConfiguracionNotificacion, ConfiguracionNotificacion.usuario_id == Usuario.id)
+
+
+def _aceptan(filas) -> dict:
+    """usuario_id -> acepta, para las filas de `_consulta_destinatarios`"""
+    aceptan = {}
+    for usuario_id, acepta in filas:
+        aceptan[usuario_id] = aceptan.get(usuario_id, True) and bool(acepta)
+    return aceptan
+
+
+def _insertar_lote(db: Session, destinatarios: list, mensaje: str) -> list:
+    if destinatarios:
+        db.execute(insert(Notificacion), [
+            {"usuario_id": usuario_id, "mensaje": mensaje, "leido": False} for usuario_id in destinatarios
+        ])
+        for usuario_id in destinatarios:
+            eventos.notificacion_nueva(db, usuario_id, mensaje)
+    db.commit()
+    contador_no_leidas.invalidar(destinatarios)
+    return destinatarios
+
+
+@dataclass
+class ResultadoEnvio:
+    creadas: int = 0
+    desconocidos: list = field(default_factory=list)  # ids sin usuario; no se les envió nada
+
+
+def notificar(db: Session, usuario_ids: Iterable[int], mensaje: str, preferencia: Optional[str] = None,
+              lote: int = NOTIF_LOTE) -> ResultadoEnvio:
+    """
+    Crear `mensaje` para cada usuario (sin repetir), omitiendo a quienes tengan
+    `preferencia` desactivada y a los ids que no corresponden a ningún usuario.
+    """
+    usuario_ids = list(dict.fromkeys(usuario_ids))
+    consulta = _consulta_destinatarios(preferencia)
+    resultado = ResultadoEnvio()
+    for inicio in range(0, len(usuario_ids), lote):
+        ids = usuario_ids[inicio:inicio + lote]
+        aceptan = _aceptan(db.execute(consulta.where(Usuario.id.in_(ids))).all())
+        resultado.desconocidos += [usuario_id for usuario_id in ids if usuario_id not in aceptan]
+        destinatarios = [usuario_id for usuario_id in ids if aceptan.get(usuario_id)]
+        resultado.creadas += len(_insertar_lote(db, destinatarios, mensaje))
+    return resultado
+
+
+def anunciar(db: Session, mensaje: str, preferencia: Optional[str] = None, lote: int = NOTIF_LOTE) -> int:
+    """Crear `mensaje` para todos los usuarios, recorriéndolos por id en lotes"""
+    consulta = _consulta_destinatarios(preferencia)
+    creadas, ultimo = 0, 0
+    while True:
+        usuario_ids = list(db.scalars(
+            select(Usuario.id).where(Usuario.id > ultimo).order_by(Usuario.id).limit(lote)
+        ))
+        if not usuario_ids:
+            return creadas
+        ultimo = usuario_ids[-1]
+        if preferencia is not None:
+            aceptan = _aceptan(db.execute(consulta.where(Usuario.id.in_(usuario_ids))).all())
+            usuario_ids = [usuario_id for usuario_id in usuario_ids if aceptan.get(usuario_id)]
+        creadas += len(_insertar_lote(db, usuario_ids, mensaje))
+
+
+def crear(db: Session, usuario_id: int, mensaje: str) -> Notificacion:
+    notificacion = Notificacion(usuario_id=usuario_id, mensaje=mensaje, leido=False)
+    db.add(notificacion)
+    eventos.notificacion_nueva(db, usuario_id, mensaje)
+    db.commit()
+    db.refresh(notificacion)
+    contador_no_leidas.invalidar([usuario_id])
+    return notificacion
+
+
+def marcar_leida(db: Session, usuario_id: int, notificacion_id: int) -> bool:
+    """False si la notificación no existe o no es del usuario"""
+    notificacion = db.query(Notificacion)\
+        .filter(Notificacion.id == notificacion_id, Notificacion.usuario_id == usuario_id).first()
+    if not notificacion:
+        return False
+    if not notificacion.leido:
+        notificacion.leido = True
+        db.commit()
+        _publicar_contador(db, usuario_id)
+    return True
+
+
+def marcar_todas_leidas(db: Session, usuario_id: int) -> int:
+    marcadas = db.query(Notificacion)\
+        .filter(Notificacion.usuario_id == usuario_id, Notificacion.leido == False)\
+        .update({"leido": True}, synchronize_session=False)
+    db.commit()
+    if marcadas:
+        contador_no_leidas.invalidar([usuario_id])
+        eventos.publicar(usuario_id, "no_leidas", {"contador": 0})
+    return marcadas
+
+
+def eliminar(db: Session, usuario_id: int, notificacion_id: int) -> bool:
+    """False si la notificación no existe o no es del usuario"""
+    notificacion = db.query(Notificacion)\
+        .filter(Notificacion.id == notificacion_id, Notificacion.usuario_id == usuario_id).first()
+    if not notificacion:
+        return False
+    leida = notificacion.leido
+    db.delete(notificacion)
+    db.commit()
+    if leida:
+        contador_no_leidas.invalidar([usuario_id])
+    else:
+        _publicar_contador(db, usuario_id)
+    return True
+
+
+def eliminar_leidas(db: Session, usuario_id: int) -> int:
+    """Elimina las leídas, también las ya archivadas"""
+    eliminadas = db.query(Notificacion)\
+        .filter(Notificacion.usuario_id == usuario_id, Notificacion.leido == True)\
+        .delete(synchronize_session=False)
+    eliminadas += db.query(NotificacionArchivada)\
+        .filter(NotificacionArchivada.usuario_id == usuario_id)\
+        .delete(synchronize_session=False)
+    db.commit()
+    # Las leídas no cuentan en el contador, pero sí en las respuestas cacheadas
+    if eliminadas:
+        contador_no_leidas.invalidar([usuario_id])
+    return eliminadas
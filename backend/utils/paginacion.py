@@ -0,0 +1,83 @@
+"""
+Paginación por keyset con cursores opacos.
+
+El cursor codifica los valores de las columnas de orden de la última fila
+entregada; la página siguiente se pide con un filtro de rango sobre esas
+columnas en lugar de OFFSET, así que el costo no crece con la profundidad.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+HEADER_SIGUIENTE_CURSOR = "X-Siguiente-Cursor"
+
+
+def _a_json(valor):
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    return valor
+
+
+def _desde_json(valor):
+    """Valor de columna de un cursor; ValueError si no es uno de los que produce `_a_json`"""
+    if isinstance(valor, dict):
+        if list(valor) == ["dt"] and isinstance(valor["dt"], str):
+            return datetime.fromisoformat(valor["dt"])
+        if list(valor) == ["d"] and isinstance(valor["d"], str):
+            return date.fromisoformat(valor["d"])
+        raise ValueError
+    if valor is None or (isinstance(valor, (str, int, float)) and not isinstance(valor, bool)):
+        return valor
+    raise ValueError
+
+
+def codificar_cursor(*valores) -> str:
+    texto = json.dumps([_a_json(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, columnas: int) -> list:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != columnas:
+            raise ValueError
+        return [_desde_json(v) for v in valores]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def despues_de(columnas, valores):
+    """
+    Filtro "fila posterior al cursor" para un orden descendente en todas las columnas.
+
+    Para (fecha, id) genera: fecha < :f OR (fecha = :f AND id < :id)
+    """
+    condiciones = []
+    for i, columna in enumerate(columnas):
+        iguales = [c == v for c, v in zip(columnas[:i], valores[:i])]
+        condiciones.append(and_(*iguales, columna < valores[i]))
+    return or_(*condiciones)
+
+
+def paginar(query, columnas, limite: int, cursor: str = None):
+    """
+    Ejecutar una página de `query` ordenada descendentemente por `columnas`.
+
+    Devuelve (filas, siguiente_cursor); siguiente_cursor es None en la última página.
+    """
+    if cursor:
+        query = query.filter(despues_de(columnas, decodificar_cursor(cursor, len(columnas))))
+    filas = query.order_by(*[c.desc() for c in columnas]).limit(limite + 1).all()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(*[getattr(ultima, c.key) for c in columnas])
+    return filas, siguiente
@@ -0,0 +1,67 @@
+"""
+Plantillas de correo (Jinja2) compiladas una sola vez.
+
+Todas las plantillas de templates/correos se compilan al importar el módulo
+y comparten el layout y el CSS de base.html. Los fragmentos sin variables
+por destinatario (archivos que empiezan con "_", como el CSS y el pie) se
+renderizan una vez y se reutilizan como texto ya escapado. Para envíos
+masivos, `renderizar_lote` recorre muchos destinatarios con la misma
+plantilla compilada.
+"""
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+from markupsafe import Markup
+
+LAYOUT = "base.html"
+DIRECTORIO_PLANTILLAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "correos")
+
+entorno = Environment(
+    loader=FileSystemLoader(DIRECTORIO_PLANTILLAS),
+    autoescape=select_autoescape(["html"]),
+    undefined=StrictUndefined,
+    auto_reload=False,
+    cache_size=-1,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+
+@lru_cache(maxsize=None)
+def _fragmento(nombre: str, anio: int) -> Markup:
+    return Markup(entorno.get_template(nombre).render(anio=anio))
+
+
+def estatico(nombre: str) -> Markup:
+    """Fragmento sin variables por destinatario, renderizado una vez (por año, por el pie)"""
+    return _fragmento(nombre, datetime.now().year)
+
+
+entorno.globals["estatico"] = estatico
+
+
+def cargar_plantillas() -> dict:
+    """Compilar todas las plantillas de correo (se llama al importar el módulo)"""
+    return {
+        nombre: entorno.get_template(nombre)
+        for nombre in entorno.list_templates(extensions=["html"])
+        if not nombre.startswith("_") and nombre != LAYOUT
+    }
+
+
+PLANTILLAS = cargar_plantillas()
+
+
+def renderizar(nombre: str, **contexto) -> str:
+    return PLANTILLAS[nombre].render(contexto)
+
+
+def renderizar_lote(nombre: str, contextos: Iterable[dict], comunes: Optional[dict] = None) -> Iterator[str]:
+    """Renderizar la misma plantilla para muchos destinatarios (`comunes` se comparte entre todos)"""
+    plantilla = PLANTILLAS[nombre]
+    comunes = comunes or {}
+    for contexto in contextos:
+        yield plantilla.render({**comunes, **contexto})
@@ -0,0 +1,270 @@
+"""
+Procesador programado de pagos fijos.
+
+Convierte cada cobro vencido de un pago fijo (activo, 'Pendiente',
+proxima_fecha <= hoy) en una Transaccion de egreso y avisa al usuario con una
+Notificacion (salvo que tenga los recordatorios desactivados). Después de un
+tiempo sin ejecutarse se ponen al día todas las ocurrencias atrasadas, hasta
+PAGOS_MAX_OCURRENCIAS por pago y ejecución. Los pagos sin monto o sin una
+categoría de egreso se cuentan (sin_monto, sin_categoria) y quedan vencidos
+sin frenar al resto del lote.
+
+Los pagos vencidos se leen en lotes de PAGOS_LOTE por keyset sobre
+(proxima_fecha, id) usando idx_pago_fijo_vencimiento, sin cargar todos en
+memoria. Cada lote es una transacción de base de datos: se insertan las
+transacciones y notificaciones con INSERT multi-fila, se ajustan el resumen
+mensual y los presupuestos, y se avanza proxima_fecha con un UPDATE
+condicionado a la fecha leída. Si otro proceso ya avanzó el pago, el UPDATE
+no encuentra la fila y el pago se omite, así que volver a ejecutar (o
+ejecutar dos procesos a la vez) nunca duplica cobros. En MySQL/PostgreSQL
+los lotes además se bloquean con FOR UPDATE SKIP LOCKED.
+
+Se ejecuta con `python procesar_pagos_fijos.py` (cron) o dentro de la API con
+PAGOS_PROGRAMADOR=true, que corre `procesar_vencidos` cada PAGOS_INTERVALO
+segundos en un hilo.
+"""
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from itertools import islice
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.BD import ConfiguracionNotificacion, Notificacion, PagoFijo, Transaccion
+from utils import alertas_presupuesto, eventos, recurrencia, resumen_mensual
+from utils.cache_categorias import catalogo_categorias
+from utils.version_datos import versiones_datos
+
+PAGOS_PROGRAMADOR = os.getenv("PAGOS_PROGRAMADOR", "false").lower() == "true"
+PAGOS_INTERVALO = float(os.getenv("PAGOS_INTERVALO", "3600"))
+PAGOS_LOTE = int(os.getenv("PAGOS_LOTE", "500"))
+PAGOS_MAX_OCURRENCIAS = int(os.getenv("PAGOS_MAX_OCURRENCIAS", "400"))
+# Categoría (por nombre) para pagos cuya categoría no existe en el catálogo
+PAGOS_CATEGORIA_DEFECTO = os.getenv("PAGOS_CATEGORIA_DEFECTO", "")
+
+
+@dataclass
+class ResultadoProcesamiento:
+    fecha: date
+    lotes: int = 0
+    pagos: int = 0
+    transacciones: int = 0
+    notificaciones: int = 0
+    sin_categoria: int = 0
+    sin_monto: int = 0
+    omitidos: int = 0
+
+
+def consulta_vencidos(hoy: date, lote: int, despues_de: Optional[tuple] = None):
+    """Siguiente lote de pagos vencidos en orden (proxima_fecha, id)"""
+    consulta = select(
+        PagoFijo.id, PagoFijo.usuario_id, PagoFijo.nombre, PagoFijo.monto, PagoFijo.categoria,
+        PagoFijo.frecuencia, PagoFijo.fecha_inicio, PagoFijo.proxima_fecha
+    ).where(
+        PagoFijo.activo == True,
+        PagoFijo.estado == "Pendiente",
+        PagoFijo.proxima_fecha <= hoy,
+    )
+    if despues_de is not None:
+        fecha, pago_id = despues_de
+        consulta = consulta.where(or_(
+            PagoFijo.proxima_fecha > fecha,
+            and_(PagoFijo.proxima_fecha == fecha, PagoFijo.id > pago_id),
+        ))
+    return consulta.order_by(PagoFijo.proxima_fecha, PagoFijo.id).limit(lote).with_for_update(skip_locked=True)
+
+
+def _categoria_egreso(catalogo, nombre: Optional[str]):
+    for candidato in (nombre, PAGOS_CATEGORIA_DEFECTO):
+        categoria = catalogo.por_nombre.get((candidato or "").strip().lower())
+        if categoria is not None and categoria.tipo == "egreso":
+            return categoria
+    return None
+
+
+def mensaje_cobro(nombre: str, monto, fechas: list) -> str:
+    if len(fechas) == 1:
+        return f"Se registró el pago fijo '{nombre}' por ${monto:,.2f} del {fechas[0].isoformat()}"
+    return (f"Se registraron {len(fechas)} cobros atrasados del pago fijo '{nombre}' "
+            f"(${monto:,.2f} c/u, del {fechas[0].isoformat()} al {fechas[-1].isoformat()})")
+
+
+def _avanzar(db: Session, avances: list) -> set:
+    """
+    Mover proxima_fecha de cada pago sólo si sigue siendo la leída. Devuelve los ids avanzados.
+
+    Un solo UPDATE ejecutado en lote; si el total de filas no coincide (otro
+    proceso avanzó alguno) se revierte y se repite pago por pago para saber cuáles.
+    """
+    if not avances:
+        return set()
+    tabla = PagoFijo.__table__
+    sentencia = update(tabla).where(
+        tabla.c.id == bindparam("p_id"), tabla.c.proxima_fecha == bindparam("p_anterior")
+    ).values(proxima_fecha=bindparam("p_siguiente"))
+
+    if db.get_bind().dialect.supports_sane_multi_rowcount:
+        if db.connection().execute(sentencia, avances).rowcount == len(avances):
+            return {avance["p_id"] for avance in avances}
+        db.rollback()
+    return {avance["p_id"] for avance in avances if db.connection().execute(sentencia, avance).rowcount == 1}
+
+
+def procesar_lote(db: Session, pagos: list, hoy: date, resultado: ResultadoProcesamiento) -> set:
+    """Materializar un lote de pagos vencidos y confirmar. Devuelve los usuarios afectados"""
+    catalogo = catalogo_categorias.obtener(db)
+    sin_recordatorios = set(db.scalars(select(ConfiguracionNotificacion.usuario_id).where(
+        ConfiguracionNotificacion.usuario_id.in_({p.usuario_id for p in pagos}),
+        ConfiguracionNotificacion.recordatorios == False,
+    )))
+
+    plan, avances = [], []
+    for pago in pagos:
+        if pago.monto is None:
+            # Sin monto no hay cobro que registrar; queda vencido hasta que el usuario lo complete
+            resultado.sin_monto += 1
+            continue
+        categoria = _categoria_egreso(catalogo, pago.categoria)
+        if categoria is None:
+            # Queda vencido y se reintenta en la próxima ejecución
+            resultado.sin_categoria += 1
+            continue
+        fechas = list(islice(
+            recurrencia.ocurrencias(pago.fecha_inicio, pago.frecuencia, pago.proxima_fecha, hoy),
+            PAGOS_MAX_OCURRENCIAS
+        ))
+        desde = fechas[-1] + timedelta(days=1) if fechas else hoy + timedelta(days=1)
+        plan.append((pago, categoria, fechas))
+        avances.append({
+            "p_id": pago.id,
+            "p_anterior": pago.proxima_fecha,
+            "p_siguiente": recurrencia.proxima_fecha(pago.fecha_inicio, pago.frecuencia, desde),
+        })
+
+    avanzados = _avanzar(db, avances)
+    resultado.pagos += len(avanzados)
+    resultado.omitidos += len(avances) - len(avanzados)
+
+    transacciones, notificaciones, usuarios = [], [], set()
+    for pago, categoria, fechas in plan:
+        if pago.id not in avanzados or not fechas:
+            continue
+        usuarios.add(pago.usuario_id)
+        transacciones.extend({
+            "usuario_id": pago.usuario_id,
+            "presupuesto_id": None,
+            "categoria_id": categoria.id,
+            "monto": pago.monto,
+            "tipo": "egreso",
+            "descripcion": f"Pago fijo: {pago.nombre}",
+            "fecha": fecha,
+        } for fecha in fechas)
+        if pago.usuario_id not in sin_recordatorios:
+            notificaciones.append({
+                "usuario_id": pago.usuario_id,
+                "mensaje": mensaje_cobro(pago.nombre, pago.monto, fechas),
+                "leido": False,
+            })
+
+    if transacciones:
+        db.execute(insert(Transaccion), transacciones)
+        resumen_mensual.registrar_lote(db, transacciones)
+        alertas_presupuesto.registrar_lote(db, transacciones)
+    if notificaciones:
+        db.execute(insert(Notificacion), notificaciones)
+        for notificacion in notificaciones:
+            eventos.notificacion_nueva(db, notificacion["usuario_id"], notificacion["mensaje"])
+    db.commit()
+
+    resultado.transacciones += len(transacciones)
+    resultado.notificaciones += len(notificaciones)
+    return usuarios
+
+
+_ejecucion = threading.Lock()
+
+
+def procesar_vencidos(hoy: Optional[date] = None, lote: int = PAGOS_LOTE,
+                      fabrica_sesiones=SessionLocal) -> Optional[ResultadoProcesamiento]:
+    """
+    Procesar todos los pagos vencidos hasta `hoy`, lote por lote.
+
+    Devuelve None si ya hay una ejecución en curso en este proceso.
+    """
+    if not _ejecucion.acquire(blocking=False):
+        return None
+    try:
+        resultado = ResultadoProcesamiento(fecha=hoy or date.today())
+        ultimo = None
+        with fabrica_sesiones() as db:
+            while True:
+                pagos = db.execute(consulta_vencidos(resultado.fecha, lote, ultimo)).all()
+                if not pagos:
+                    break
+                resultado.lotes += 1
+                ultimo = (pagos[-1].proxima_fecha, pagos[-1].id)
+                try:
+                    usuarios = procesar_lote(db, pagos, resultado.fecha, resultado)
+                except Exception:
+                    db.rollback()
+                    raise
+                # Escrituras fuera de una petición HTTP: invalidar las respuestas cacheadas
+                for usuario_id in usuarios:
+                    versiones_datos.incrementar(usuario_id)
+        return resultado
+    finally:
+        _ejecucion.release()
+
+
+class ProgramadorPagos:
+    """Hilo que ejecuta procesar_vencidos al iniciar y luego cada `intervalo` segundos"""
+
+    def __init__(self, intervalo: float = PAGOS_INTERVALO):
+        self.intervalo = intervalo
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self.ejecuciones = 0
+        self.errores = 0
+        self.ultimo_resultado = None
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._trabajar, name="programador-pagos", daemon=True)
+                self._hilo.start()
+
+    def detener(self, timeout: float = 30):
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join(timeout)
+
+    def _trabajar(self):
+        while not self._detener.is_set():
+            try:
+                resultado = procesar_vencidos()
+                if resultado is not None:
+                    self.ejecuciones += 1
+                    self.ultimo_resultado = resultado
+            except Exception as e:
+                self.errores += 1
+                print(f"❌ Error procesando pagos fijos: {str(e)}")
+            self._detener.wait(self.intervalo)
+
+    def estadisticas(self) -> dict:
+        return {
+            "activo": self._hilo is not None and self._hilo.is_alive(),
+            "intervalo_segundos": self.intervalo,
+            "ejecuciones": self.ejecuciones,
+            "errores": self.errores,
+            "ultimo_resultado": asdict(self.ultimo_resultado) if self.ultimo_resultado else None,
+        }
+
+
+programador_pagos = ProgramadorPagos()
@@ -0,0 +1,133 @@
+"""
+Motor de recurrencia de pagos fijos.
+
+Un pago fijo se repite desde su fecha_inicio con una de las frecuencias de
+FRECUENCIAS. La n-ésima ocurrencia se calcula directamente (sin recorrer
+día por día ni ocurrencia por ocurrencia):
+
+  - frecuencias en días (diario, semanal, quincenal): inicio + n * paso
+  - frecuencias en meses (mensual ... anual): inicio + n * meses, anclada al
+    día de inicio y recortada al último día del mes (un pago del 31 cae el
+    28/29 de febrero y vuelve al 31 en marzo)
+
+La próxima fecha de cobro se guarda en pagos_fijos.proxima_fecha para que
+las consultas de pagos próximos usen el índice
+idx_pago_fijo_usuario_proxima; `sincronizar` la recalcula al crear, editar o
+reanudar un pago.
+"""
+import calendar
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from models.BD import PagoFijo
+
+TAMANO_LOTE = 5000
+
+# frecuencia -> (días, meses) entre ocurrencias
+FRECUENCIAS = {
+    "diario": (1, 0),
+    "semanal": (7, 0),
+    "quincenal": (15, 0),
+    "mensual": (0, 1),
+    "bimestral": (0, 2),
+    "trimestral": (0, 3),
+    "semestral": (0, 6),
+    "anual": (0, 12),
+}
+
+
+def _paso(frecuencia: str):
+    try:
+        return FRECUENCIAS[frecuencia.lower()]
+    except KeyError:
+        raise ValueError(f"Frecuencia no soportada: {frecuencia}")
+
+
+def desplazar_meses(fecha: date, meses: int) -> date:
+    """
+    `fecha` + `meses`, recortando el día al último del mes destino.
+
+    No confundir con resumen_mensual.sumar_meses, que devuelve el día 1.
+    """
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    anio, mes = divmod(indice, 12)
+    mes += 1
+    return date(anio, mes, min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+
+def ocurrencia(fecha_inicio: date, frecuencia: str, n: int) -> date:
+    """Fecha de la n-ésima ocurrencia (la 0 es fecha_inicio)"""
+    dias, meses = _paso(frecuencia)
+    if dias:
+        return fecha_inicio + timedelta(days=dias * n)
+    return desplazar_meses(fecha_inicio, meses * n)
+
+
+def indice_desde(fecha_inicio: date, frecuencia: str, fecha: date) -> int:
+    """Número de la primera ocurrencia en o después de `fecha`"""
+    if fecha <= fecha_inicio:
+        return 0
+    dias, meses = _paso(frecuencia)
+    if dias:
+        return -(-(fecha - fecha_inicio).days // dias)
+    # Meses completos transcurridos; el recorte a fin de mes puede dejar la
+    # ocurrencia un paso antes de `fecha`, nunca más
+    transcurridos = (fecha.year - fecha_inicio.year) * 12 + fecha.month - fecha_inicio.month
+    n = transcurridos // meses
+    if ocurrencia(fecha_inicio, frecuencia, n) < fecha:
+        n += 1
+    return n
+
+
+def proxima_fecha(fecha_inicio: Optional[date], frecuencia: str, desde: date) -> Optional[date]:
+    """Primera ocurrencia en o después de `desde`"""
+    if fecha_inicio is None:
+        return None
+    return ocurrencia(fecha_inicio, frecuencia, indice_desde(fecha_inicio, frecuencia, desde))
+
+
+def ocurrencias(fecha_inicio: date, frecuencia: str, desde: date, hasta: date) -> Iterator[date]:
+    """Ocurrencias dentro de [desde, hasta]"""
+    n = indice_desde(fecha_inicio, frecuencia, desde)
+    fecha = ocurrencia(fecha_inicio, frecuencia, n)
+    while fecha <= hasta:
+        yield fecha
+        n += 1
+        fecha = ocurrencia(fecha_inicio, frecuencia, n)
+
+
+def sincronizar(pago, hoy: Optional[date] = None):
+    """Recalcular pago.proxima_fecha (primer cobro desde hoy) tras crear, editar o reanudar"""
+    pago.proxima_fecha = proxima_fecha(pago.fecha_inicio, pago.frecuencia, hoy or date.today())
+
+
+def reconstruir(db: Session, usuario_id: Optional[int] = None, hoy: Optional[date] = None) -> int:
+    """
+    Recalcular proxima_fecha de todos los pagos fijos (o de un usuario). Devuelve las filas.
+
+    Una proxima_fecha ya vencida (anterior a `hoy`) se conserva: es un cobro
+    que el procesador de pagos fijos todavía no generó, y recalcularla a la
+    próxima ocurrencia lo perdería. Sólo se recalculan las vacías (recién
+    migradas) y las que aún no vencieron.
+    """
+    hoy = hoy or date.today()
+    consulta = select(PagoFijo.id, PagoFijo.fecha_inicio, PagoFijo.frecuencia, PagoFijo.proxima_fecha)
+    if usuario_id is not None:
+        consulta = consulta.where(PagoFijo.usuario_id == usuario_id)
+    tabla = PagoFijo.__table__
+    actualizar = update(tabla).where(tabla.c.id == bindparam("p_id")).values(proxima_fecha=bindparam("p_fecha"))
+
+    filas = 0
+    for lote in db.execute(consulta).partitions(TAMANO_LOTE):
+        cambios = [
+            {"p_id": pago.id, "p_fecha": proxima_fecha(pago.fecha_inicio, pago.frecuencia, hoy)}
+            for pago in lote if pago.proxima_fecha is None or pago.proxima_fecha >= hoy
+        ]
+        if cambios:
+            db.connection().execute(actualizar, cambios)
+        filas += len(cambios)
+    db.commit()
+    return filas
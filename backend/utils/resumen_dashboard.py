@@ -0,0 +1,147 @@
+"""
+Motor de agregación del dashboard.
+
+Calcula todo lo que necesita GET /dashboard con dos sentencias:
+
+1. Un UNION ALL con una columna "seccion" que junta los totales por
+   categoría (resumen mensual unido una sola vez a categorías), el monto
+   usado de cada presupuesto y el contador de notificaciones no leídas.
+2. Los pagos fijos pendientes (se necesitan las filas completas).
+
+Los totales generales se obtienen en Python sumando las filas por
+categoría, así que no hace falta una consulta extra ni GROUPING SETS
+(SQLite no los soporta y MySQL sólo ofrece WITH ROLLUP).
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Integer, Numeric, String, func, literal, null, select, union_all, cast
+from sqlalchemy.orm import Session
+
+from models.BD import PagoFijo, Notificacion, Categoria
+from schemas.dashboard import DashboardResponse, CategoriaResumen, PresupuestoResumen
+from utils.resumen_mensual import fuente_agregados
+from utils.evaluacion_presupuestos import EXCEDIDO, clasificar, consulta_consumo, porcentaje
+
+CERO = Decimal("0")
+
+
+def consulta_agregados(usuario_id: int, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None):
+    """Sentencia única con los agregados del dashboard, etiquetados por sección"""
+    fuente = fuente_agregados(usuario_id, fecha_inicio, fecha_fin)
+    por_categoria = select(
+        literal("categoria").label("seccion"),
+        cast(fuente.c.tipo, String(10)).label("tipo_transaccion"),
+        Categoria.id.label("categoria_id"),
+        Categoria.nombre.label("nombre"),
+        cast(Categoria.tipo, String(10)).label("tipo_categoria"),
+        cast(null(), Integer).label("presupuesto_id"),
+        cast(func.coalesce(func.sum(fuente.c.total), 0), Numeric(14, 2)).label("monto"),
+        cast(null(), Numeric(14, 2)).label("limite"),
+    ).select_from(fuente)\
+     .outerjoin(Categoria, fuente.c.categoria_id == Categoria.id)\
+     .group_by(fuente.c.tipo, Categoria.id, Categoria.nombre, Categoria.tipo)
+
+    # Presupuestos (sin filtro de fechas, porque el presupuesto tiene rango propio);
+    # mismo monto usado que /presupuestos/resumen y /presupuestos/alertas
+    consumo = consulta_consumo(usuario_id).order_by(None).subquery("consumo")
+    presupuestos = select(
+        literal("presupuesto"),
+        null(),
+        consumo.c.categoria_id,
+        consumo.c.categoria,
+        null(),
+        consumo.c.presupuesto_id,
+        consumo.c.monto_usado,
+        consumo.c.monto_total,
+    ).where(consumo.c.categoria.isnot(None))
+
+    # Notificaciones no leídas (sin filtro de fechas)
+    notificaciones = select(
+        literal("notificaciones"),
+        null(),
+        null(),
+        null(),
+        null(),
+        null(),
+        func.count(Notificacion.id),
+        null(),
+    ).where(Notificacion.usuario_id == usuario_id, Notificacion.leido == False)
+
+    return union_all(por_categoria, presupuestos, notificaciones)
+
+
+def _resumen_categorias(filas: dict, total: Decimal):
+    divisor = float(total) or 1
+    return [
+        CategoriaResumen(
+            categoria_id=categoria_id,
+            nombre=nombre,
+            tipo=tipo,
+            monto_total=monto,
+            porcentaje=float(monto) / divisor * 100
+        )
+        for (categoria_id, nombre, tipo), monto in filas.items()
+    ]
+
+
+def calcular_dashboard(
+    db: Session,
+    usuario_id: int,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    limite_pagos: int = 5
+) -> DashboardResponse:
+    """Construir el DashboardResponse completo con dos viajes a la base de datos"""
+    totales = {"ingreso": CERO, "egreso": CERO}
+    categorias = {"ingreso": {}, "egreso": {}}
+    presupuestos = []
+    notificaciones_no_leidas = 0
+
+    for fila in db.execute(consulta_agregados(usuario_id, fecha_inicio, fecha_fin)):
+        monto = Decimal(fila.monto or 0)
+        if fila.seccion == "categoria":
+            totales[fila.tipo_transaccion] += monto
+            if fila.categoria_id is not None and fila.tipo_categoria in categorias:
+                clave = (fila.categoria_id, fila.nombre, fila.tipo_categoria)
+                grupo = categorias[fila.tipo_categoria]
+                grupo[clave] = grupo.get(clave, CERO) + monto
+        elif fila.seccion == "presupuesto":
+            limite = Decimal(fila.limite)
+            presupuestos.append(PresupuestoResumen(
+                presupuesto_id=fila.presupuesto_id,
+                categoria_id=fila.categoria_id,
+                categoria_nombre=fila.nombre,
+                monto_total=limite,
+                monto_usado=monto,
+                porcentaje_usado=porcentaje(monto, limite),
+                excedido=clasificar(porcentaje(monto, limite)) == EXCEDIDO
+            ))
+        else:
+            notificaciones_no_leidas = int(monto)
+
+    # Pagos fijos activos y pendientes (filtramos por próximo cobro dentro del rango si se pasa)
+    pagos_query = db.query(PagoFijo).filter(
+        PagoFijo.usuario_id == usuario_id,
+        PagoFijo.activo == True,
+        PagoFijo.estado == 'Pendiente',
+    )
+    if fecha_inicio:
+        pagos_query = pagos_query.filter(PagoFijo.proxima_fecha >= fecha_inicio)
+    if fecha_fin:
+        pagos_query = pagos_query.filter(PagoFijo.proxima_fecha <= fecha_fin)
+    pagos_pendientes = pagos_query.order_by(PagoFijo.proxima_fecha.asc()).limit(limite_pagos).all()
+
+    total_ingresos = totales["ingreso"]
+    total_egresos = totales["egreso"]
+    return DashboardResponse(
+        total_ingresos=total_ingresos,
+        total_egresos=total_egresos,
+        saldo=total_ingresos - total_egresos,
+        ingresos_por_categoria=_resumen_categorias(categorias["ingreso"], sum(categorias["ingreso"].values(), CERO)),
+        egresos_por_categoria=_resumen_categorias(categorias["egreso"], sum(categorias["egreso"].values(), CERO)),
+        presupuestos=presupuestos,
+        pagos_pendientes=pagos_pendientes,
+        notificaciones_no_leidas=notificaciones_no_leidas
+    )
@@ -0,0 +1,332 @@
+"""
+Resumen mensual materializado de transacciones (usuario × mes × categoría × tipo).
+
+Las rutas de escritura de transacciones ajustan el resumen dentro de la
+misma transacción de base de datos, y las gráficas y el dashboard leen de
+aquí en lugar de recorrer todo el historial. Para rangos que no empiezan o
+terminan en un borde de mes, los días sueltos se leen de `transacciones`.
+Cada ajuste también deja encolada la diferencia de balance del usuario, que
+utils.eventos publica a sus conexiones abiertas después del commit.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Date, bindparam, delete, false, func, insert, literal, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.BD import Categoria, ResumenMensual, Transaccion
+from utils import eventos
+
+CERO = Decimal("0")
+
+
+def inicio_mes(fecha: date) -> date:
+    return fecha.replace(day=1)
+
+
+def siguiente_mes(fecha: date) -> date:
+    return (fecha.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def fin_mes(fecha: date) -> date:
+    return siguiente_mes(fecha) - timedelta(days=1)
+
+
+def expresion_inicio_mes(columna, dialecto: str):
+    """Expresión SQL que trunca una fecha al primer día de su mes"""
+    if dialecto == "sqlite":
+        return func.date(columna, "start of month")
+    if dialecto == "mysql":
+        return func.date_format(columna, "%Y-%m-01")
+    return func.date_trunc("month", columna)
+
+
+def _valor_tipo(tipo) -> str:
+    return getattr(tipo, "value", tipo)
+
+
+def _ajustar(db: Session, usuario_id: int, mes: date, categoria_id: int, tipo: str, monto: Decimal, cantidad: int):
+    """Sumar monto/cantidad a una fila del resumen, creándola si no existe"""
+    filtro = (
+        ResumenMensual.usuario_id == usuario_id,
+        ResumenMensual.mes == mes,
+        ResumenMensual.categoria_id == categoria_id,
+        ResumenMensual.tipo == tipo,
+    )
+    cambios = {
+        ResumenMensual.total: ResumenMensual.total + monto,
+        ResumenMensual.cantidad: ResumenMensual.cantidad + cantidad,
+    }
+
+    if not db.query(ResumenMensual).filter(*filtro).update(cambios, synchronize_session=False):
+        try:
+            with db.begin_nested():
+                db.add(ResumenMensual(
+                    usuario_id=usuario_id, mes=mes, categoria_id=categoria_id,
+                    tipo=tipo, total=monto, cantidad=cantidad
+                ))
+        except IntegrityError:
+            # Otra petición creó la fila al mismo tiempo
+            db.query(ResumenMensual).filter(*filtro).update(cambios, synchronize_session=False)
+
+    if cantidad < 0:
+        db.query(ResumenMensual).filter(*filtro, ResumenMensual.cantidad <= 0).delete(synchronize_session=False)
+
+
+def valores_resumen(transaccion) -> dict:
+    """Campos de una transacción que afectan al resumen (para comparar antes/después de editar)"""
+    return {
+        "usuario_id": transaccion.usuario_id,
+        "fecha": transaccion.fecha,
+        "categoria_id": transaccion.categoria_id,
+        "tipo": _valor_tipo(transaccion.tipo),
+        "monto": Decimal(str(transaccion.monto)),
+    }
+
+
+def registrar(db: Session, valores: dict, signo: int = 1):
+    """Aplicar (signo=1) o revertir (signo=-1) una transacción en el resumen"""
+    _ajustar(
+        db,
+        valores["usuario_id"],
+        inicio_mes(valores["fecha"]),
+        valores["categoria_id"],
+        valores["tipo"],
+        valores["monto"] * signo,
+        signo,
+    )
+    eventos.registrar_balance(db, valores["usuario_id"], valores["tipo"], valores["monto"] * signo)
+
+
+def registrar_alta(db: Session, transaccion):
+    registrar(db, valores_resumen(transaccion), 1)
+
+
+def registrar_baja(db: Session, transaccion):
+    registrar(db, valores_resumen(transaccion), -1)
+
+
+def registrar_edicion(db: Session, anteriores: dict, transaccion):
+    nuevos = valores_resumen(transaccion)
+    if nuevos == anteriores:
+        return
+    registrar(db, anteriores, -1)
+    registrar(db, nuevos, 1)
+
+
+def registrar_lote(db: Session, filas: list):
+    """
+    Aplicar muchas transacciones nuevas con un ajuste por (usuario, mes, categoría, tipo).
+
+    Una consulta averigua qué filas del resumen ya existen; esas se ajustan
+    con un solo UPDATE ejecutado en lote y las nuevas con un INSERT multi-fila.
+    """
+    grupos = {}
+    for fila in filas:
+        clave = (fila["usuario_id"], inicio_mes(fila["fecha"]), fila["categoria_id"], _valor_tipo(fila["tipo"]))
+        total, cantidad = grupos.get(clave, (CERO, 0))
+        grupos[clave] = (total + Decimal(str(fila["monto"])), cantidad + 1)
+    if not grupos:
+        return
+    for (usuario_id, _, _, tipo), (total, _) in grupos.items():
+        eventos.registrar_balance(db, usuario_id, tipo, total)
+
+    meses = [mes for _, mes, _, _ in grupos]
+    existentes = {tuple(fila) for fila in db.execute(select(
+        ResumenMensual.usuario_id, ResumenMensual.mes, ResumenMensual.categoria_id, ResumenMensual.tipo
+    ).where(
+        ResumenMensual.usuario_id.in_({usuario_id for usuario_id, _, _, _ in grupos}),
+        ResumenMensual.mes >= min(meses),
+        ResumenMensual.mes <= max(meses),
+        ResumenMensual.categoria_id.in_({categoria_id for _, _, categoria_id, _ in grupos}),
+    ))}
+
+    ajustes, nuevas = [], []
+    for (usuario_id, mes, categoria_id, tipo), (total, cantidad) in grupos.items():
+        if (usuario_id, mes, categoria_id, tipo) in existentes:
+            ajustes.append({"r_usuario": usuario_id, "r_mes": mes, "r_categoria": categoria_id,
+                            "r_tipo": tipo, "r_total": total, "r_cantidad": cantidad})
+        else:
+            nuevas.append({"usuario_id": usuario_id, "mes": mes, "categoria_id": categoria_id,
+                           "tipo": tipo, "total": total, "cantidad": cantidad})
+
+    if ajustes:
+        tabla = ResumenMensual.__table__
+        db.connection().execute(
+            update(tabla).where(
+                tabla.c.usuario_id == bindparam("r_usuario"),
+                tabla.c.mes == bindparam("r_mes"),
+                tabla.c.categoria_id == bindparam("r_categoria"),
+                tabla.c.tipo == bindparam("r_tipo"),
+            ).values(total=tabla.c.total + bindparam("r_total"), cantidad=tabla.c.cantidad + bindparam("r_cantidad")),
+            ajustes
+        )
+    if nuevas:
+        try:
+            with db.begin_nested():
+                db.execute(insert(ResumenMensual), nuevas)
+        except IntegrityError:
+            # Otra escritura creó alguna de las filas al mismo tiempo: ajustar una por una
+            for fila in nuevas:
+                _ajustar(db, fila["usuario_id"], fila["mes"], fila["categoria_id"], fila["tipo"],
+                         fila["total"], fila["cantidad"])
+
+
+def reconstruir(db: Session, usuario_id: Optional[int] = None) -> int:
+    """Recalcular el resumen desde `transacciones` (todo o un usuario). Devuelve las filas generadas"""
+    borrar = delete(ResumenMensual)
+    if usuario_id is not None:
+        borrar = borrar.where(ResumenMensual.usuario_id == usuario_id)
+    db.execute(borrar)
+
+    mes = expresion_inicio_mes(Transaccion.fecha, db.get_bind().dialect.name)
+    origen = select(
+        Transaccion.usuario_id,
+        mes,
+        Transaccion.categoria_id,
+        Transaccion.tipo,
+        func.sum(Transaccion.monto),
+        func.count(Transaccion.id),
+    ).where(Transaccion.fecha.isnot(None))
+    if usuario_id is not None:
+        origen = origen.where(Transaccion.usuario_id == usuario_id)
+    origen = origen.group_by(Transaccion.usuario_id, mes, Transaccion.categoria_id, Transaccion.tipo)
+
+    resultado = db.execute(insert(ResumenMensual).from_select(
+        ["usuario_id", "mes", "categoria_id", "tipo", "total", "cantidad"], origen
+    ))
+    db.commit()
+    return resultado.rowcount
+
+
+def fuente_agregados(usuario_id: int, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None):
+    """
+    Subconsulta (mes, categoria_id, tipo, total, cantidad) para un rango de fechas.
+
+    Los meses completos salen del resumen; los días sueltos al inicio o al
+    final del rango se agregan directamente desde `transacciones`.
+    """
+    if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+        vacio = select(
+            ResumenMensual.mes, ResumenMensual.categoria_id, ResumenMensual.tipo,
+            ResumenMensual.total, ResumenMensual.cantidad
+        ).where(false())
+        return vacio.subquery("fuente")
+
+    # Meses completos: [desde, hasta)
+    desde = None
+    if fecha_inicio:
+        desde = fecha_inicio if fecha_inicio.day == 1 else siguiente_mes(fecha_inicio)
+    hasta = None
+    if fecha_fin:
+        hasta = fecha_fin + timedelta(days=1) if fecha_fin == fin_mes(fecha_fin) else inicio_mes(fecha_fin)
+
+    resumen = select(
+        ResumenMensual.mes,
+        ResumenMensual.categoria_id,
+        ResumenMensual.tipo,
+        ResumenMensual.total,
+        ResumenMensual.cantidad,
+    ).where(ResumenMensual.usuario_id == usuario_id)
+    if desde:
+        resumen = resumen.where(ResumenMensual.mes >= desde)
+    if hasta:
+        resumen = resumen.where(ResumenMensual.mes < hasta)
+    # Sin meses completos en el rango: todo sale de los días sueltos
+    partes = [] if desde and hasta and desde >= hasta else [resumen]
+
+    # Días sueltos (cada tramo cae dentro de un solo mes)
+    tramos = []
+    if fecha_inicio and fecha_inicio.day != 1:
+        tramos.append((fecha_inicio, min(fin_mes(fecha_inicio), fecha_fin) if fecha_fin else fin_mes(fecha_inicio)))
+    if fecha_fin and fecha_fin != fin_mes(fecha_fin):
+        tramo = (max(inicio_mes(fecha_fin), fecha_inicio) if fecha_inicio else inicio_mes(fecha_fin), fecha_fin)
+        if tramo not in tramos:
+            tramos.append(tramo)
+
+    for inicio, fin in tramos:
+        partes.append(
+            select(
+                literal(inicio_mes(inicio), Date).label("mes"),
+                Transaccion.categoria_id,
+                Transaccion.tipo,
+                func.sum(Transaccion.monto).label("total"),
+                func.count(Transaccion.id).label("cantidad"),
+            ).where(
+                Transaccion.usuario_id == usuario_id,
+                Transaccion.fecha >= inicio,
+                Transaccion.fecha <= fin,
+            ).group_by(Transaccion.categoria_id, Transaccion.tipo)
+        )
+
+    consulta = partes[0] if len(partes) == 1 else union_all(*partes)
+    return consulta.subquery("fuente")
+
+
+def totales_por_tipo(db: Session, usuario_id: int, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None) -> dict:
+    """Ingresos, egresos y número de transacciones de un rango en una sola consulta"""
+    fuente = fuente_agregados(usuario_id, fecha_inicio, fecha_fin)
+    totales = {"ingreso": CERO, "egreso": CERO, "cantidad": 0}
+    filas = db.query(
+        fuente.c.tipo,
+        func.coalesce(func.sum(fuente.c.total), 0),
+        func.coalesce(func.sum(fuente.c.cantidad), 0),
+    ).group_by(fuente.c.tipo).all()
+    for tipo, total, cantidad in filas:
+        totales[_valor_tipo(tipo)] = Decimal(total)
+        totales["cantidad"] += int(cantidad)
+    return totales
+
+
+def totales_por_categoria(db: Session, usuario_id: int, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None):
+    """Filas (categoria, tipo_categoria, tipo, total) de un rango, agrupadas por nombre de categoría"""
+    fuente = fuente_agregados(usuario_id, fecha_inicio, fecha_fin)
+    return db.query(
+        Categoria.nombre.label("categoria"),
+        Categoria.tipo.label("tipo_categoria"),
+        fuente.c.tipo.label("tipo"),
+        func.coalesce(func.sum(fuente.c.total), 0).label("total"),
+    ).select_from(fuente)\
+     .join(Categoria, Categoria.id == fuente.c.categoria_id)\
+     .group_by(Categoria.nombre, Categoria.tipo, fuente.c.tipo).all()
+
+
+def sumar_meses(fecha: date, meses: int) -> date:
+    """Primer día del mes desplazado `meses` meses (negativo hacia atrás)"""
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def series_mensuales(db: Session, usuario_id: int, desde: date, hasta: date) -> list:
+    """
+    Ingresos/egresos por mes calendario entre dos fechas (ambos meses incluidos).
+
+    Una sola consulta agrupada por mes sobre el resumen; los meses sin
+    movimientos se devuelven en cero. Orden: del más antiguo al más reciente.
+    """
+    primero = inicio_mes(desde)
+    ultimo = inicio_mes(hasta)
+    filas = db.query(
+        ResumenMensual.mes,
+        ResumenMensual.tipo,
+        func.sum(ResumenMensual.total),
+        func.sum(ResumenMensual.cantidad),
+    ).filter(
+        ResumenMensual.usuario_id == usuario_id,
+        ResumenMensual.mes >= primero,
+        ResumenMensual.mes <= ultimo,
+    ).group_by(ResumenMensual.mes, ResumenMensual.tipo).all()
+
+    meses = {}
+    mes = primero
+    while mes <= ultimo:
+        meses[mes] = {"mes": mes, "ingresos": CERO, "egresos": CERO, "cantidad": 0}
+        mes = siguiente_mes(mes)
+
+    for mes, tipo, total, cantidad in filas:
+        serie = meses[mes]
+        serie["ingresos" if _valor_tipo(tipo) == "ingreso" else "egresos"] += Decimal(total)
+        serie["cantidad"] += int(cantidad)
+    return list(meses.values())
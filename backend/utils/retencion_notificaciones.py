@@ -0,0 +1,102 @@
+"""
+Retención de notificaciones: mueve las leídas antiguas a notificaciones_archivadas.
+
+`notificaciones` es la tabla que más crece y casi todo lo que se consulta
+de ella es reciente o no leído. Las notificaciones leídas con más de
+NOTIF_RETENCION_DIAS días se copian a notificaciones_archivadas (sin la
+columna leido, conservando su id) y se borran de la tabla principal.
+
+Se recorren los usuarios por keyset en grupos de NOTIF_ARCHIVO_USUARIOS y,
+para cada grupo, las notificaciones a archivar se leen con
+idx_notificacion_usuario_leido_fecha (usuario_id, leido, fecha_creacion):
+sólo se tocan las filas que se van a mover, nunca las recientes ni las no
+leídas. Cada lote de NOTIF_ARCHIVO_LOTE filas es una transacción (INSERT
+multi-fila en el archivo + DELETE por id), así que interrumpir el proceso
+no pierde ni duplica nada; en MySQL/PostgreSQL las filas se bloquean con
+FOR UPDATE SKIP LOCKED para no esperar a escrituras concurrentes.
+
+Se ejecuta con `python archivar_notificaciones.py` (cron).
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.BD import Notificacion, NotificacionArchivada, Usuario
+from utils.version_datos import versiones_datos
+
+NOTIF_RETENCION_DIAS = int(os.getenv("NOTIF_RETENCION_DIAS", "90"))
+NOTIF_ARCHIVO_LOTE = int(os.getenv("NOTIF_ARCHIVO_LOTE", "1000"))
+NOTIF_ARCHIVO_USUARIOS = int(os.getenv("NOTIF_ARCHIVO_USUARIOS", "500"))
+
+
+@dataclass
+class ResultadoArchivo:
+    corte: datetime
+    lotes: int = 0
+    archivadas: int = 0
+    usuarios: int = 0
+
+
+def archivar_lote(db: Session, usuario_ids: list, corte: datetime, lote: int = NOTIF_ARCHIVO_LOTE) -> list:
+    """
+    Mover hasta `lote` notificaciones leídas anteriores a `corte` de estos
+    usuarios y confirmar. Devuelve el usuario de cada fila movida (vacío si no quedaba ninguna).
+    """
+    filas = db.execute(select(
+        Notificacion.id, Notificacion.usuario_id, Notificacion.mensaje, Notificacion.fecha_creacion
+    ).where(
+        Notificacion.usuario_id.in_(usuario_ids),
+        Notificacion.leido == True,
+        Notificacion.fecha_creacion < corte,
+    ).limit(lote).with_for_update(skip_locked=True)).all()
+    if not filas:
+        return []
+
+    ahora = datetime.utcnow()
+    db.execute(insert(NotificacionArchivada), [{
+        "id": fila.id,
+        "usuario_id": fila.usuario_id,
+        "mensaje": fila.mensaje,
+        "fecha_creacion": fila.fecha_creacion,
+        "fecha_archivo": ahora,
+    } for fila in filas])
+    db.execute(delete(Notificacion).where(Notificacion.id.in_([fila.id for fila in filas])))
+    db.commit()
+    return [fila.usuario_id for fila in filas]
+
+
+def archivar(dias: int = NOTIF_RETENCION_DIAS, lote: int = NOTIF_ARCHIVO_LOTE,
+             ahora: Optional[datetime] = None, fabrica_sesiones=SessionLocal) -> ResultadoArchivo:
+    """Archivar las notificaciones leídas con más de `dias` días de todos los usuarios"""
+    resultado = ResultadoArchivo(corte=(ahora or datetime.utcnow()) - timedelta(days=dias))
+    ultimo = 0
+    with fabrica_sesiones() as db:
+        while True:
+            usuario_ids = list(db.scalars(
+                select(Usuario.id).where(Usuario.id > ultimo).order_by(Usuario.id).limit(NOTIF_ARCHIVO_USUARIOS)
+            ))
+            if not usuario_ids:
+                return resultado
+            ultimo = usuario_ids[-1]
+
+            afectados = set()
+            while True:
+                try:
+                    movidos = archivar_lote(db, usuario_ids, resultado.corte, lote)
+                except Exception:
+                    db.rollback()
+                    raise
+                if not movidos:
+                    break
+                resultado.lotes += 1
+                resultado.archivadas += len(movidos)
+                afectados.update(movidos)
+            # Escrituras fuera de una petición HTTP: invalidar las respuestas cacheadas
+            for usuario_id in afectados:
+                versiones_datos.incrementar(usuario_id)
+            resultado.usuarios += len(afectados)
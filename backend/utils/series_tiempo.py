@@ -0,0 +1,288 @@
+"""
+Series de tiempo de ingresos y egresos agrupadas en cubetas de fecha.
+
+Granularidades: dia, semana (lunes a domingo), mes, trimestre y anio. El
+rango pedido se amplía a cubetas completas y se resuelve con una sola
+consulta agrupada por (usuario, cubeta, tipo):
+
+  - dia / semana salen de `transacciones`
+  - mes / trimestre / anio salen de `resumen_mensual` (una fila por mes)
+
+La cubeta se calcula con una expresión propia de cada motor
+(`expresion_cubeta`: SQLite, MySQL y PostgreSQL), pero el filtro siempre es
+un rango sobre la columna sin funciones (fecha >= :desde AND fecha < :hasta),
+así que los índices que empiezan con (usuario_id, ...) siguen sirviendo.
+
+Las cubetas sin movimientos se rellenan en cero: la lista completa de
+cubetas se genera con numpy y cada fila de la consulta se ubica con
+searchsorted, sin recorrer día por día. Los totales quedan en matrices
+usuarios × cubetas, listas para cálculos vectorizados (acumulados,
+promedios móviles, tendencias).
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import Date, Integer, cast, func, select
+from sqlalchemy.orm import Session
+
+from models.BD import ResumenMensual, Transaccion
+from utils.resumen_mensual import inicio_mes
+
+GRANULARIDADES = ("dia", "semana", "mes", "trimestre", "anio")
+# Límite de cubetas por serie (p. ej. ~3 años por día)
+MAX_CUBETAS = 1200
+
+_UNIDAD_POSTGRES = {"dia": "day", "semana": "week", "mes": "month", "trimestre": "quarter", "anio": "year"}
+
+
+def _validar(granularidad: str):
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad no soportada: {granularidad}")
+
+
+def inicio_cubeta(fecha: date, granularidad: str) -> date:
+    _validar(granularidad)
+    if granularidad == "dia":
+        return fecha
+    if granularidad == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == "mes":
+        return fecha.replace(day=1)
+    if granularidad == "trimestre":
+        return date(fecha.year, (fecha.month - 1) // 3 * 3 + 1, 1)
+    return date(fecha.year, 1, 1)
+
+
+def cubetas(desde: date, hasta: date, granularidad: str) -> np.ndarray:
+    """Inicio de cada cubeta que toca [desde, hasta], como datetime64[D] ordenado"""
+    primero = np.datetime64(inicio_cubeta(desde, granularidad))
+    ultimo = np.datetime64(inicio_cubeta(hasta, granularidad))
+    if granularidad == "dia":
+        inicios = np.arange(primero, ultimo + 1, dtype="datetime64[D]")
+    elif granularidad == "semana":
+        inicios = np.arange(primero, ultimo + 1, 7, dtype="datetime64[D]")
+    elif granularidad == "anio":
+        inicios = np.arange(primero.astype("datetime64[Y]"), ultimo.astype("datetime64[Y]") + 1).astype("datetime64[D]")
+    else:
+        paso = 1 if granularidad == "mes" else 3
+        meses = np.arange(primero.astype("datetime64[M]"), ultimo.astype("datetime64[M]") + 1, paso)
+        inicios = meses.astype("datetime64[D]")
+    if len(inicios) > MAX_CUBETAS:
+        raise ValueError(f"Demasiadas cubetas ({len(inicios)}); usa una granularidad mayor")
+    return inicios
+
+
+def desplazar_cubeta(inicio: date, granularidad: str, cantidad: int) -> date:
+    """Inicio de la cubeta `cantidad` cubetas antes (negativo) o después de la que empieza en `inicio`"""
+    inicio = np.datetime64(inicio_cubeta(inicio, granularidad))
+    if granularidad == "dia":
+        return (inicio + cantidad).astype(object)
+    if granularidad == "semana":
+        return (inicio + 7 * cantidad).astype(object)
+    meses = {"mes": 1, "trimestre": 3, "anio": 12}[granularidad] * cantidad
+    return (inicio.astype("datetime64[M]") + meses).astype("datetime64[D]").astype(object)
+
+
+def ultimas_cubetas(hoy: date, granularidad: str, cantidad: int):
+    """(desde, hasta) de las últimas `cantidad` cubetas completas antes de la que contiene `hoy`"""
+    actual = inicio_cubeta(hoy, granularidad)
+    return desplazar_cubeta(actual, granularidad, -cantidad), actual - timedelta(days=1)
+
+
+def fin_cubetas(inicios: np.ndarray, granularidad: str) -> np.ndarray:
+    """Día siguiente al final de cada cubeta (límite exclusivo)"""
+    if granularidad == "dia":
+        return inicios + 1
+    if granularidad == "semana":
+        return inicios + 7
+    if granularidad == "anio":
+        return (inicios.astype("datetime64[Y]") + 1).astype("datetime64[D]")
+    paso = 1 if granularidad == "mes" else 3
+    return (inicios.astype("datetime64[M]") + paso).astype("datetime64[D]")
+
+
+def expresion_cubeta(columna, granularidad: str, dialecto: str):
+    """Expresión SQL con el primer día de la cubeta de `columna` (date o texto AAAA-MM-DD)"""
+    _validar(granularidad)
+    if dialecto == "sqlite":
+        if granularidad == "dia":
+            return func.date(columna)
+        if granularidad == "semana":
+            # 'weekday 0' avanza al domingo (o lo deja si ya lo es); 6 días antes es el lunes
+            return func.date(columna, "weekday 0", "-6 days")
+        if granularidad == "mes":
+            return func.date(columna, "start of month")
+        if granularidad == "trimestre":
+            mes = cast(func.strftime("%m", columna), Integer)
+            return func.printf("%04d-%02d-01", func.strftime("%Y", columna), (mes - 1) // 3 * 3 + 1)
+        return func.date(columna, "start of year")
+    if dialecto == "mysql":
+        if granularidad == "dia":
+            return func.date(columna)
+        if granularidad == "semana":
+            # WEEKDAY: lunes = 0
+            return func.subdate(func.date(columna), func.weekday(columna))
+        if granularidad == "mes":
+            return func.date_format(columna, "%Y-%m-01")
+        if granularidad == "trimestre":
+            mes = (cast(func.quarter(columna), Integer) - 1) * 3 + 1
+            return func.concat(func.year(columna), "-", func.lpad(mes, 2, "0"), "-01")
+        return func.date_format(columna, "%Y-01-01")
+    return cast(func.date_trunc(_UNIDAD_POSTGRES[granularidad], columna), Date)
+
+
+def _a_fecha(valor) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _tipo(valor) -> str:
+    return getattr(valor, "value", valor)
+
+
+@dataclass
+class SeriesTemporales:
+    """Totales por usuario (filas) y cubeta (columnas); las cubetas vacías valen 0"""
+    granularidad: str
+    inicios: np.ndarray      # datetime64[D], una por columna
+    usuario_ids: np.ndarray  # una por fila
+    ingresos: np.ndarray     # float64, usuarios × cubetas
+    egresos: np.ndarray
+    saldo_inicial: Optional[np.ndarray] = None  # balance antes de la primera cubeta, por usuario
+
+    @property
+    def balance(self) -> np.ndarray:
+        return self.ingresos - self.egresos
+
+    def metrica(self, nombre: str) -> np.ndarray:
+        """ingresos, egresos (o gastos) o balance"""
+        if nombre == "ingresos":
+            return self.ingresos
+        if nombre in ("egresos", "gastos"):
+            return self.egresos
+        if nombre == "balance":
+            return self.balance
+        raise ValueError(f"Métrica no soportada: {nombre}")
+
+    def balance_acumulado(self) -> np.ndarray:
+        """Saldo al cierre de cada cubeta (suma acumulada, desde saldo_inicial si se cargó)"""
+        acumulado = np.cumsum(self.balance, axis=1)
+        if self.saldo_inicial is not None:
+            acumulado += self.saldo_inicial[:, None]
+        return acumulado
+
+    def fila(self, usuario_id: int) -> int:
+        posicion = int(np.searchsorted(self.usuario_ids, usuario_id))
+        if posicion >= len(self.usuario_ids) or self.usuario_ids[posicion] != usuario_id:
+            raise KeyError(usuario_id)
+        return posicion
+
+    def etiquetas(self) -> list:
+        return [etiqueta_cubeta(inicio, self.granularidad) for inicio in self.inicios.astype(object)]
+
+
+def etiqueta_cubeta(inicio: date, granularidad: str) -> str:
+    if granularidad in ("dia", "semana"):
+        return inicio.isoformat()
+    if granularidad == "mes":
+        return inicio.strftime("%Y-%m")
+    if granularidad == "trimestre":
+        return f"{inicio.year}-T{(inicio.month - 1) // 3 + 1}"
+    return str(inicio.year)
+
+
+def _consulta(granularidad: str, dialecto: str, desde: date, hasta_exclusivo: date):
+    """(usuario_id, cubeta, tipo, total) de un rango ya alineado a cubetas"""
+    if granularidad in ("dia", "semana"):
+        cubeta = expresion_cubeta(Transaccion.fecha, granularidad, dialecto).label("cubeta")
+        return select(Transaccion.usuario_id, cubeta, Transaccion.tipo, func.sum(Transaccion.monto)).where(
+            # tipo IN (...) deja usar idx_transaccion_usuario_tipo_fecha como índice de cobertura
+            Transaccion.tipo.in_(("ingreso", "egreso")),
+            Transaccion.fecha >= desde,
+            Transaccion.fecha < hasta_exclusivo,
+        ).group_by(Transaccion.usuario_id, cubeta, Transaccion.tipo), Transaccion.usuario_id
+
+    cubeta = expresion_cubeta(ResumenMensual.mes, granularidad, dialecto).label("cubeta")
+    return select(ResumenMensual.usuario_id, cubeta, ResumenMensual.tipo, func.sum(ResumenMensual.total)).where(
+        ResumenMensual.mes >= desde,
+        ResumenMensual.mes < hasta_exclusivo,
+    ).group_by(ResumenMensual.usuario_id, cubeta, ResumenMensual.tipo), ResumenMensual.usuario_id
+
+
+def agrupar(db: Session, usuario_ids: Optional[Iterable[int]], desde: date, hasta: date,
+            granularidad: str = "mes") -> SeriesTemporales:
+    """
+    Ingresos y egresos por cubeta entre `desde` y `hasta` (cubetas completas).
+
+    `usuario_ids=None` agrupa a todos los usuarios con movimientos en el rango
+    (modo por lotes); con una lista, cada usuario pedido tiene su fila aunque
+    no tenga movimientos.
+    """
+    inicios = cubetas(desde, hasta, granularidad)
+    limite = fin_cubetas(inicios[-1:], granularidad)[0]
+    consulta, columna_usuario = _consulta(
+        granularidad, db.get_bind().dialect.name, inicios[0].astype(object), limite.astype(object)
+    )
+    if usuario_ids is not None:
+        usuario_ids = sorted(set(usuario_ids))
+        consulta = consulta.where(columna_usuario.in_(usuario_ids))
+    filas = db.execute(consulta).all()
+
+    if usuario_ids is None:
+        ids = np.unique(np.fromiter((fila[0] for fila in filas), dtype=np.int64, count=len(filas)))
+    else:
+        ids = np.array(usuario_ids, dtype=np.int64)
+    ingresos = np.zeros((len(ids), len(inicios)))
+    egresos = np.zeros((len(ids), len(inicios)))
+    if filas:
+        usuarios_fila = np.fromiter((fila[0] for fila in filas), dtype=np.int64, count=len(filas))
+        cubetas_fila = np.array([_a_fecha(fila[1]) for fila in filas], dtype="datetime64[D]")
+        es_ingreso = np.array([_tipo(fila[2]) == "ingreso" for fila in filas])
+        totales = np.fromiter((float(fila[3] or 0) for fila in filas), dtype=np.float64, count=len(filas))
+
+        filas_idx = np.searchsorted(ids, usuarios_fila)
+        columnas_idx = np.searchsorted(inicios, cubetas_fila)
+        np.add.at(ingresos, (filas_idx[es_ingreso], columnas_idx[es_ingreso]), totales[es_ingreso])
+        np.add.at(egresos, (filas_idx[~es_ingreso], columnas_idx[~es_ingreso]), totales[~es_ingreso])
+
+    return SeriesTemporales(granularidad, inicios, ids, ingresos, egresos)
+
+
+def cargar_saldo_inicial(db: Session, series: SeriesTemporales) -> SeriesTemporales:
+    """
+    Balance de cada usuario antes de la primera cubeta: meses completos desde
+    el resumen y, si la cubeta empieza a mitad de mes, los días sueltos desde
+    transacciones (dos consultas agrupadas por usuario).
+    """
+    inicio = series.inicios[0].astype(object)
+    ids = [int(usuario_id) for usuario_id in series.usuario_ids]
+    saldo = np.zeros(len(ids))
+    if not ids:
+        series.saldo_inicial = saldo
+        return series
+
+    consultas = [select(ResumenMensual.usuario_id, ResumenMensual.tipo, func.sum(ResumenMensual.total)).where(
+        ResumenMensual.usuario_id.in_(ids),
+        ResumenMensual.mes < inicio_mes(inicio),
+    ).group_by(ResumenMensual.usuario_id, ResumenMensual.tipo)]
+    if inicio.day != 1:
+        consultas.append(select(Transaccion.usuario_id, Transaccion.tipo, func.sum(Transaccion.monto)).where(
+            Transaccion.usuario_id.in_(ids),
+            Transaccion.fecha >= inicio_mes(inicio),
+            Transaccion.fecha < inicio,
+        ).group_by(Transaccion.usuario_id, Transaccion.tipo))
+
+    for consulta in consultas:
+        filas = db.execute(consulta).all()
+        if not filas:
+            continue
+        posiciones = np.searchsorted(series.usuario_ids, [fila[0] for fila in filas])
+        signos = np.array([1.0 if _tipo(fila[1]) == "ingreso" else -1.0 for fila in filas])
+        np.add.at(saldo, posiciones, signos * np.array([float(fila[2] or 0) for fila in filas]))
+    series.saldo_inicial = saldo
+    return series
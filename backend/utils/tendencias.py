@@ -0,0 +1,202 @@
+"""
+Tendencias de ingresos, gastos o balance sobre las series de `series_tiempo`.
+
+Todo se calcula sobre la matriz usuarios × cubetas de una sola consulta
+agrupada, sin recorrer filas en Python:
+
+  promedio_movil  media de las últimas `ventana` cubetas (suma acumulada);
+                  NaN mientras no hay `ventana` cubetas
+  crecimiento     % de variación respecto a la cubeta anterior (mes contra
+                  mes con granularidad mes); NaN si la anterior vale 0
+  tendencia       recta de mínimos cuadrados de cada fila (forma cerrada:
+                  un producto matriz-vector para todas las pendientes)
+
+`calcular_lote` recorre a todos los usuarios por keyset en grupos de
+TENDENCIAS_LOTE, con una consulta y un cálculo vectorizado por grupo; lo usa
+generar_tendencias.py para los análisis nocturnos.
+"""
+import math
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.BD import Usuario
+from utils import series_tiempo
+
+METRICAS = ("ingresos", "gastos", "balance")
+TENDENCIAS_LOTE = int(os.getenv("TENDENCIAS_LOTE", "2000"))
+# Variación de la recta (relativa al valor medio) por debajo de la cual la tendencia es "estable"
+TENDENCIAS_UMBRAL = float(os.getenv("TENDENCIAS_UMBRAL", "0.05"))
+
+
+@dataclass
+class Tendencias:
+    """Resultado por usuario (filas) y cubeta (columnas)"""
+    series: series_tiempo.SeriesTemporales
+    metrica: str
+    ventana: int
+    valores: np.ndarray
+    promedio_movil: np.ndarray
+    crecimiento: np.ndarray
+    pendiente: np.ndarray   # por usuario, unidades por cubeta
+    intercepto: np.ndarray  # valor de la recta en la primera cubeta
+    r2: np.ndarray
+    variacion: np.ndarray   # cambio de la recta en el rango, relativo al valor medio
+    crecimiento_promedio: np.ndarray
+
+    @property
+    def tendencia(self) -> np.ndarray:
+        """Valores de la recta en cada cubeta"""
+        x = np.arange(self.valores.shape[1])
+        return self.intercepto[:, None] + self.pendiente[:, None] * x
+
+    def resumen(self, fila: int) -> dict:
+        """Indicadores de un usuario, listos para JSON"""
+        ultima = self.valores.shape[1] - 1
+        return {
+            "pendiente": _numero(self.pendiente[fila]),
+            "intercepto": _numero(self.intercepto[fila]),
+            "r2": _numero(self.r2[fila]),
+            "direccion": direccion(self.variacion[fila]),
+            "variacion_porcentual": _numero(self.variacion[fila] * 100),
+            "crecimiento_promedio": _numero(self.crecimiento_promedio[fila]),
+            "ultimo_valor": _numero(self.valores[fila, ultima]) if ultima >= 0 else None,
+            "ultimo_promedio_movil": _numero(self.promedio_movil[fila, ultima]) if ultima >= 0 else None,
+            "ultimo_crecimiento": _numero(self.crecimiento[fila, ultima]) if ultima >= 0 else None,
+        }
+
+    def datos(self, fila: int) -> list:
+        """Una entrada por cubeta para las gráficas"""
+        return [
+            {
+                "fecha": fecha,
+                "valor": valor,
+                "promedio_movil": _numero(promedio),
+                "crecimiento": _numero(variacion),
+                "tendencia": tendencia,
+            }
+            for fecha, valor, promedio, variacion, tendencia in zip(
+                self.series.etiquetas(), self.valores[fila].tolist(), self.promedio_movil[fila].tolist(),
+                self.crecimiento[fila].tolist(), self.tendencia[fila].tolist()
+            )
+        ]
+
+
+def _numero(valor) -> Optional[float]:
+    """float, o None para NaN (JSON no admite NaN)"""
+    valor = float(valor)
+    return None if math.isnan(valor) else valor
+
+
+def direccion(variacion: float) -> str:
+    """sube, baja o estable según la variación relativa de la recta"""
+    if math.isnan(variacion) or abs(variacion) < TENDENCIAS_UMBRAL:
+        return "estable"
+    return "sube" if variacion > 0 else "baja"
+
+
+def _media_sin_nan(valores: np.ndarray) -> np.ndarray:
+    """Media de cada fila ignorando NaN (NaN si no queda ninguno), sin los avisos de np.nanmean"""
+    validos = ~np.isnan(valores)
+    cantidad = validos.sum(axis=1)
+    suma = np.where(validos, valores, 0).sum(axis=1)
+    return np.divide(suma, cantidad, out=np.full(len(valores), np.nan), where=cantidad != 0)
+
+
+def promedio_movil(valores: np.ndarray, ventana: int) -> np.ndarray:
+    """Media de las últimas `ventana` columnas de cada fila; NaN en las primeras ventana-1"""
+    if ventana < 1:
+        raise ValueError("La ventana debe ser de al menos 1 cubeta")
+    resultado = np.full(valores.shape, np.nan)
+    if ventana <= valores.shape[1]:
+        acumulado = np.cumsum(np.pad(valores, ((0, 0), (1, 0))), axis=1)
+        resultado[:, ventana - 1:] = (acumulado[:, ventana:] - acumulado[:, :-ventana]) / ventana
+    return resultado
+
+
+def crecimiento(valores: np.ndarray) -> np.ndarray:
+    """% de variación de cada columna respecto a la anterior; NaN en la primera y si la anterior es 0"""
+    resultado = np.full(valores.shape, np.nan)
+    anterior, actual = valores[:, :-1], valores[:, 1:]
+    np.divide((actual - anterior) * 100, np.abs(anterior), out=resultado[:, 1:], where=anterior != 0)
+    return resultado
+
+
+def regresion_lineal(valores: np.ndarray):
+    """(pendiente, intercepto, r2) de la recta de mínimos cuadrados de cada fila contra 0..n-1"""
+    usuarios, n = valores.shape
+    if n < 2:
+        media = valores.mean(axis=1) if n else np.zeros(usuarios)
+        return np.zeros(usuarios), media, np.full(usuarios, np.nan)
+
+    x = np.arange(n) - (n - 1) / 2
+    media = valores.mean(axis=1)
+    centrados = valores - media[:, None]
+    pendiente = centrados @ x / (x @ x)
+    intercepto = media - pendiente * (n - 1) / 2
+
+    residuos = centrados - pendiente[:, None] * x
+    total = (centrados ** 2).sum(axis=1)
+    # r2 indefinido para series constantes
+    r2 = np.divide(total - (residuos ** 2).sum(axis=1), total, out=np.full(usuarios, np.nan), where=total != 0)
+    return pendiente, intercepto, r2
+
+
+def calcular(series: series_tiempo.SeriesTemporales, metrica: str = "gastos", ventana: int = 3) -> Tendencias:
+    """Promedio móvil, crecimiento y tendencia de `metrica` para todas las filas de `series`"""
+    valores = series.metrica(metrica)
+    pendiente, intercepto, r2 = regresion_lineal(valores)
+    variaciones = crecimiento(valores)
+    media = np.abs(valores).mean(axis=1) if valores.shape[1] else np.zeros(len(valores))
+    cambio = pendiente * max(valores.shape[1] - 1, 0)
+    return Tendencias(
+        series=series,
+        metrica=metrica,
+        ventana=ventana,
+        valores=valores,
+        promedio_movil=promedio_movil(valores, ventana),
+        crecimiento=variaciones,
+        pendiente=pendiente,
+        intercepto=intercepto,
+        r2=r2,
+        variacion=np.divide(cambio, media, out=np.full_like(cambio, np.nan), where=media != 0),
+        crecimiento_promedio=_media_sin_nan(variaciones),
+    )
+
+
+def calcular_lote(db: Session, desde: date, hasta: date, granularidad: str = "mes",
+                  metricas: Iterable[str] = METRICAS, ventana: int = 3,
+                  lote: int = TENDENCIAS_LOTE) -> Iterator[dict]:
+    """
+    Resumen de tendencias de todos los usuarios (modo por lotes), un dict
+    por usuario y métrica.
+
+    Una consulta agrupada por cada grupo de `lote` usuarios, y sobre ella un
+    cálculo vectorizado por métrica; los usuarios sin movimientos salen con
+    la serie en cero.
+    """
+    metricas = list(metricas)
+    ultimo = 0
+    while True:
+        usuario_ids = list(db.scalars(
+            select(Usuario.id).where(Usuario.id > ultimo).order_by(Usuario.id).limit(lote)
+        ))
+        if not usuario_ids:
+            return
+        ultimo = usuario_ids[-1]
+
+        series = series_tiempo.agrupar(db, usuario_ids, desde, hasta, granularidad)
+        for metrica in metricas:
+            tendencias = calcular(series, metrica, ventana)
+            for fila, usuario_id in enumerate(series.usuario_ids.tolist()):
+                yield {
+                    "usuario_id": usuario_id,
+                    "metrica": metrica,
+                    "granularidad": granularidad,
+                    **tendencias.resumen(fila),
+                }
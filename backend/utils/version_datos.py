@@ -0,0 +1,52 @@
+"""
+Versión de los datos de cada usuario.
+
+Un contador por usuario que sube con cada escritura que cambia sus datos
+(transacciones, presupuestos, pagos fijos, notificaciones...). Las
+respuestas cacheadas y los ETags se calculan sobre esta versión, así que
+después de una escritura nunca se sirve una respuesta anterior a ella.
+
+Las peticiones HTTP de escritura a rutas de datos la incrementan desde
+utils.cache_respuestas (RUTAS_ESCRITURA); los procesos que escriben fuera de una petición
+(tareas programadas, servicios) deben llamar a `incrementar` ellos mismos.
+
+Los contadores viven en utils.cache (compartidos entre workers con Redis).
+Un contador que no existe (primer uso, reinicio, expulsión del LRU) arranca
+en un valor aleatorio, para no repetir versiones ya entregadas como ETag.
+"""
+import secrets
+from typing import Optional
+
+from utils.cache import cache
+
+
+def etiqueta_usuario(usuario_id: int) -> str:
+    """Etiqueta de las respuestas cacheadas de un usuario"""
+    return f"respuestas:{usuario_id}"
+
+
+class VersionesDatos:
+    def __init__(self, backend=cache):
+        self.backend = backend
+
+    @staticmethod
+    def _clave(usuario_id: int) -> str:
+        return f"version:{usuario_id}"
+
+    def actual(self, usuario_id: int) -> Optional[str]:
+        """Versión vigente, o None si la caché no está disponible (no se debe cachear)"""
+        version = self.backend.obtener(self._clave(usuario_id))
+        if version is None:
+            version = self.backend.incrementar(self._clave(usuario_id), secrets.randbelow(2 ** 31) + 1)
+        return None if version is None else str(version)
+
+    def incrementar(self, usuario_id: int) -> Optional[str]:
+        """Nueva versión para el usuario; sus respuestas cacheadas dejan de servirse"""
+        self.actual(usuario_id)
+        version = self.backend.incrementar(self._clave(usuario_id))
+        # Las entradas de la versión anterior ya no se alcanzan: liberarlas de inmediato
+        self.backend.invalidar_etiqueta(etiqueta_usuario(usuario_id))
+        return None if version is None else str(version)
+
+
+versiones_datos = VersionesDatos()